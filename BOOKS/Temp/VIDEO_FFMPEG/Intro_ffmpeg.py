@@ -10,6 +10,10 @@ import sys
 import json
 from pathlib import Path
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -67,15 +71,7 @@ def check_dependencies():
 
 def get_audio_duration(file_path):
     """Get the duration of an audio file in seconds."""
-    cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        str(file_path)
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    return float(result.stdout.strip())
+    return media_probe.duration(file_path)
 
 def main():
     """Construct and run the ffmpeg command."""
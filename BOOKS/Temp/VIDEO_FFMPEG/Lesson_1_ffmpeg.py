@@ -8,6 +8,10 @@ import shutil
 import sys
 import json
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -88,12 +92,7 @@ def check_dependencies():
 
 def get_audio_duration(file_path):
     """Gets the duration of an audio file using ffprobe."""
-    command = [
-        "ffprobe", "-v", "error", "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1", file_path
-    ]
-    result = subprocess.run(command, capture_output=True, text=True, check=True)
-    return float(result.stdout.strip())
+    return media_probe.duration(file_path)
 
 def build_ffmpeg_command(total_duration):
     """Constructs the full ffmpeg command."""
@@ -260,7 +259,7 @@ def main():
         print("\nVideo generation successful!")
         print(f"Output file: {OUTPUT_FILE}")
 
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+    except (media_probe.ProbeError, subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"\nAn error occurred: {e}", file=sys.stderr)
         if hasattr(e, 'stderr') and e.stderr:
             print(f"ffmpeg stderr:\n{e.stderr}", file=sys.stderr)
@@ -9,6 +9,10 @@ import shutil
 import sys
 import json
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -99,15 +103,7 @@ def check_dependencies():
 
 def get_audio_duration(filepath):
     """Gets the duration of an audio file in seconds."""
-    command = [
-        'ffprobe',
-        '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        filepath
-    ]
-    result = subprocess.run(command, capture_output=True, text=True, check=True)
-    return float(result.stdout)
+    return media_probe.duration(filepath)
 
 def build_scene_filter(scene_idx, start_time, duration, layers, technique, image_map):
     """Builds the filter string for a single scene."""
@@ -211,7 +207,7 @@ def main():
 
     try:
         total_duration = get_audio_duration(AUDIO_PATH)
-    except (subprocess.CalledProcessError, ValueError) as e:
+    except (media_probe.ProbeError, subprocess.CalledProcessError, ValueError) as e:
         print(f"Error getting audio duration: {e}", file=sys.stderr)
         sys.exit(1)
         
@@ -6,6 +6,10 @@ import subprocess
 import sys
 import os
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -48,9 +52,7 @@ def check_requirements():
 
 def get_audio_duration(file_path):
     """Gets the duration of an audio file using ffprobe."""
-    command = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', file_path]
-    result = subprocess.run(command, capture_output=True, text=True, check=True)
-    return float(result.stdout)
+    return media_probe.duration(file_path)
 
 def build_ffmpeg_command(total_duration):
     """Constructs the full ffmpeg command."""
@@ -173,7 +175,7 @@ def main():
     
     try:
         total_duration = get_audio_duration(AUDIO_FILE)
-    except (subprocess.CalledProcessError, ValueError) as e:
+    except (media_probe.ProbeError, subprocess.CalledProcessError, ValueError) as e:
         print(f"ERROR: Could not get audio duration. {e}", file=sys.stderr)
         sys.exit(1)
         
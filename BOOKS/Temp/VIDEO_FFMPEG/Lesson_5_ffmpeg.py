@@ -8,6 +8,10 @@ import os
 import subprocess
 import json
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -99,14 +103,7 @@ def check_dependencies():
 
 def get_audio_duration(audio_path):
     """Gets the duration of the audio file in seconds."""
-    command = [
-        'ffprobe', '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        audio_path
-    ]
-    result = subprocess.run(command, capture_output=True, text=True, check=True)
-    return float(result.stdout.strip())
+    return media_probe.duration(audio_path)
 
 def construct_ffmpeg_command(total_duration):
     """Constructs the full ffmpeg command."""
@@ -214,7 +211,7 @@ def main():
     try:
         total_duration = get_audio_duration(AUDIO_PATH)
         print(f"Audio duration: {total_duration:.2f} seconds.")
-    except (subprocess.CalledProcessError, ValueError) as e:
+    except (media_probe.ProbeError, subprocess.CalledProcessError, ValueError) as e:
         print(f"ERROR: Could not get audio duration from {AUDIO_PATH}. Details: {e}", file=sys.stderr)
         sys.exit(1)
 
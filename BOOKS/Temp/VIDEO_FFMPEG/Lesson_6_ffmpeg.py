@@ -10,6 +10,10 @@ import sys
 import shutil
 import json
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -74,17 +78,9 @@ def check_requirements():
 
 def get_audio_duration(file_path):
     """Gets the duration of an audio file in seconds using ffprobe."""
-    command = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        file_path,
-    ]
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    except (subprocess.CalledProcessError, ValueError) as e:
+        return media_probe.duration(file_path)
+    except media_probe.ProbeError as e:
         sys.exit(f"Error getting audio duration: {e}")
 
 def main():
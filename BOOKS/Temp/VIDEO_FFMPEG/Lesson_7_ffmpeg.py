@@ -9,6 +9,10 @@ import shutil
 import sys
 import json
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -70,17 +74,9 @@ def check_requirements():
 
 def get_audio_duration(filepath):
     """Gets the duration of an audio file in seconds using ffprobe."""
-    command = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        filepath
-    ]
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return float(result.stdout)
-    except (subprocess.CalledProcessError, ValueError) as e:
+        return media_probe.duration(filepath)
+    except media_probe.ProbeError as e:
         sys.exit(f"Error getting audio duration: {e}")
 
 def main():
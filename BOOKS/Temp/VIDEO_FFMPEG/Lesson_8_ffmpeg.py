@@ -9,6 +9,10 @@ import os
 import json
 import shutil
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 # --- Configuration ---
 WIDTH = 3840
 HEIGHT = 2160
@@ -40,17 +44,9 @@ def check_requirements(required_files, required_commands):
 
 def get_audio_duration(file_path):
     """Gets the duration of an audio file using ffprobe."""
-    command = [
-        'ffprobe',
-        '-v', 'error',
-        '-show_entries', 'format=duration',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        file_path
-    ]
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        return float(result.stdout.strip())
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        return media_probe.duration(file_path)
+    except media_probe.ProbeError as e:
         print(f"Error getting duration for {file_path}: {e}", file=sys.stderr)
         sys.exit(1)
 
@@ -8,6 +8,10 @@ import os
 import sys
 import shutil
 
+# Shared cached ffprobe (media_probe.py lives at the repo root)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
+import media_probe
+
 def main():
     """
     Constructs and executes a single ffmpeg command to generate a parallax video
@@ -50,13 +54,8 @@ def main():
 
     # --- Get Audio Duration ---
     try:
-        duration_cmd = [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", AUDIO_PATH
-        ]
-        result = subprocess.run(duration_cmd, capture_output=True, text=True, check=True)
-        total_duration = float(result.stdout.strip())
-    except (subprocess.CalledProcessError, ValueError) as e:
+        total_duration = media_probe.duration(AUDIO_PATH)
+    except media_probe.ProbeError as e:
         print(f"Error getting audio duration: {e}", file=sys.stderr)
         sys.exit(1)
 
@@ -3,8 +3,12 @@ import os
 import time
 import json
 import datetime
+import sys
 from google import genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_cache import cached_generate_text
+
 # === Configuration ===
 BOOK_PATH = "BOOKS/WEALTH/BIO/COMPANY_BIO"
 HALAL_PATH = "BOOKS/Temp/COMPANY_BIO"
@@ -54,11 +58,10 @@ def ask_is_book_haram(book):
     for i, key in enumerate(API_KEYS):
         try:
             client = genai.Client(api_key=key)
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=[{"role": "user", "parts": [{"text": prompt}]}]
+            text = cached_generate_text(
+                client, MODEL, [{"role": "user", "parts": [{"text": prompt}]}]
             )
-            answer = response.text.strip()
+            answer = text.strip()
             print(f"✅ Checked with API#{i + 1} for: {title}", flush=True)
             print(f"🧠 Gemini Response: \"{answer}\"\n", flush=True)
             return answer
@@ -3,8 +3,12 @@ import os
 import json
 import time
 import re
+import sys
 from google import genai  # Make sure google-genai is installed
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_cache import cached_generate_text
+
 # === Configuration ===
 BOOK_PATH = "BOOKS/WEALTH/BIO/COMPANY_BIO"
 CHAPTERS_PATH = "BOOKS/Temp/CHAPTERS"
@@ -58,12 +62,11 @@ def generate_chapters(book):
     for i, key in enumerate(API_KEYS):
         try:
             client = genai.Client(api_key=key)
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=[{"role": "user", "parts": [{"text": prompt}]}]
+            text = cached_generate_text(
+                client, MODEL, [{"role": "user", "parts": [{"text": prompt}]}]
             )
             print(f"✅ Chapters generated using API#{i + 1} for: {title}", flush=True)
-            return response.text.strip()
+            return text.strip()
         except Exception as e:
             print(f"⚠️ API#{i + 1} failed. Error: {e}", flush=True)
             time.sleep(1)
@@ -1,8 +1,12 @@
 import os
 import time
 import json
+import sys
 from google import genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_cache import cached_generate_text
+
 # === Paths ===
 COMPANY_BIO_PATH = "BOOKS/Temp/COMPANY_BIO"
 SCRIPT_OUTPUT_PATH = "BOOKS/Temp/SCRIPT/COMPANY_BIO"
@@ -70,15 +74,10 @@ def generate_script(prompt, api_index):
         try:
             client = genai.Client(api_key=key)
 
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=[{"role": "user", "parts": [{"text": prompt}]}]
+            text = cached_generate_text(
+                client, MODEL, [{"role": "user", "parts": [{"text": prompt}]}]
             )
 
-            text = getattr(response, "text", None)
-            if not text:
-                text = str(response)
-
             print(f"✅ Generated script using API key #{(api_index + i) % attempts + 1}")
             return text, (api_index + i + 1) % attempts
 
@@ -1,17 +1,23 @@
 import os
 import re
-import struct
-import mimetypes
+import sys
 import time
 from google import genai
 from google.genai import types
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+import wav_io
+import tts_scheduler
+import tts_cache
+
 # ===============================
 # Paths
 # ===============================
 SCRIPT_DIR = "BOOKS/Temp/SCRIPT/COMPANY_BIO"
 OUTPUT_DIR = "BOOKS/Temp/TTS"
 TONE_INSTRUCTION = "Read like you are telling a story to a friend:\n\n"
+VOICE_NAME = "Enceladus"
+TTS_MODEL = "gemini-2.5-flash-preview-tts"
 
 # ===============================
 # API Key from environment variable (GitHub Secret)
@@ -20,7 +26,7 @@ API_KEY = os.getenv("KABAJU7")  # GitHub Actions secret should be mapped to env
 if not API_KEY:
     raise ValueError("API key not found. Make sure KABAJU7 secret is set in GitHub Actions.")
 
-API_KEYS = [API_KEY]  # kept as list for retry compatibility
+API_KEYS = [API_KEY]  # one key; tts_scheduler runs TTS_PER_KEY requests on it
 
 # ===============================
 # Helpers
@@ -62,75 +68,14 @@ def split_into_sections(script_text):
     return sections
 
 
-def save_binary_file(file_name, data):
-    with open(file_name, "wb") as f:
-        f.write(data)
-    print(f"💾 Audio saved to: {file_name}")
-
-
-def parse_audio_mime_type(mime_type: str) -> dict:
-    bits_per_sample = 16
-    rate = 24000
-
-    parts = mime_type.split(";")
-    for part in parts:
-        part = part.strip()
-        if part.lower().startswith("rate="):
-            try:
-                rate = int(part.split("=", 1)[1])
-            except Exception:
-                pass
-        elif part.startswith("audio/L"):
-            try:
-                bits_per_sample = int(part.split("L", 1)[1])
-            except Exception:
-                pass
-
-    return {"bits_per_sample": bits_per_sample, "rate": rate}
-
-
-def convert_to_wav(audio_data: bytes, mime_type: str) -> bytes:
-    params = parse_audio_mime_type(mime_type)
-
-    bits_per_sample = params["bits_per_sample"]
-    sample_rate = params["rate"]
-    num_channels = 1
-
-    bytes_per_sample = bits_per_sample // 8
-    block_align = num_channels * bytes_per_sample
-    byte_rate = sample_rate * block_align
-    data_size = len(audio_data)
-    chunk_size = 36 + data_size
-
-    header = struct.pack(
-        "<4sI4s4sIHHIIHH4sI",
-        b"RIFF",
-        chunk_size,
-        b"WAVE",
-        b"fmt ",
-        16,
-        1,
-        num_channels,
-        sample_rate,
-        byte_rate,
-        block_align,
-        bits_per_sample,
-        b"data",
-        data_size,
-    )
-
-    return header + audio_data
 
 
 # ===============================
 # TTS with Retry Logic
 # ===============================
 
-def generate_tts(api_keys, combined_script, output_filename, delay=10):
-    max_attempts = 2
-
+def generate_tts(api_key, combined_script, output_filename, delay=10, max_attempts=2):
     for attempt in range(max_attempts):
-        api_key = api_keys[0]
         print(f"🔁 Attempt {attempt + 1}/{max_attempts} using GitHub Secret")
 
         try:
@@ -148,37 +93,32 @@ def generate_tts(api_keys, combined_script, output_filename, delay=10):
                 speech_config=types.SpeechConfig(
                     voice_config=types.VoiceConfig(
                         prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name="Enceladus"
+                            voice_name=VOICE_NAME
                         )
                     )
                 ),
             )
 
-            for chunk in client.models.generate_content_stream(
-                model="gemini-2.5-flash-preview-tts",
-                contents=contents,
-                config=config,
-            ):
-                if (
-                    chunk.candidates
-                    and chunk.candidates[0].content
-                    and chunk.candidates[0].content.parts
+            # Every PCM part goes straight to disk; sizes are patched when the stream ends
+            with wav_io.WavSink(output_filename) as sink:
+                for chunk in client.models.generate_content_stream(
+                    model=TTS_MODEL,
+                    contents=contents,
+                    config=config,
                 ):
-                    part = chunk.candidates[0].content.parts[0]
-                    if part.inline_data and part.inline_data.data:
-                        audio_data = part.inline_data.data
-                        ext = mimetypes.guess_extension(
-                            part.inline_data.mime_type
-                        )
-
-                        if ext is None:
-                            audio_data = convert_to_wav(
-                                audio_data, part.inline_data.mime_type
-                            )
-                            ext = ".wav"
-
-                        save_binary_file(output_filename, audio_data)
-                        return True
+                    if (
+                        chunk.candidates
+                        and chunk.candidates[0].content
+                        and chunk.candidates[0].content.parts
+                    ):
+                        part = chunk.candidates[0].content.parts[0]
+                        if part.inline_data and part.inline_data.data:
+                            sink.write(part.inline_data.data, part.inline_data.mime_type)
+                            print(f"🔊 {sink.seconds:.1f}s synthesized", flush=True)
+
+            if sink.seconds:
+                print(f"💾 Audio saved to: {output_filename} ({sink.seconds:.1f}s)")
+                return True
 
             print("⚠️ No audio returned from model")
 
@@ -197,6 +137,15 @@ def generate_tts(api_keys, combined_script, output_filename, delay=10):
 # Main
 # ===============================
 
+def synth_chunk(api_key, text, chunk_wav):
+    # One attempt per call: tts_scheduler retries failed chunks itself.
+    # Sections unchanged since an earlier run (or shared with another book) come from tts_cache.
+    return tts_cache.cached(
+        chunk_wav, lambda: generate_tts(api_key, TONE_INSTRUCTION + text, chunk_wav, max_attempts=1),
+        text, TONE_INSTRUCTION, VOICE_NAME, TTS_MODEL,
+    )
+
+
 def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -211,20 +160,21 @@ def main():
     script_text = parse_script(os.path.join(SCRIPT_DIR, selected_file))
     sections = split_into_sections(script_text)
 
-    section_num = 1
+    # All sentence chunks of all sections are synthesized in parallel, then joined per section
+    chunks = tts_scheduler.synthesize(sections, synth_chunk, API_KEYS,
+                                      os.path.join(OUTPUT_DIR, ".chunks"))
 
-    for heading, body in sections.items():
+    for section_num, heading in enumerate(sections, start=1):
         safe_heading = heading.replace(" ", "_")
         output_filename = os.path.join(
             OUTPUT_DIR, f"{section_num}_{safe_heading}.wav"
         )
 
-        combined_script = TONE_INSTRUCTION + body.strip()
-
         print(f"\n🎤 Section {section_num}: {heading}")
-        generate_tts(API_KEYS, combined_script, output_filename)
+        offsets = tts_scheduler.join([heading], chunks, output_filename)
+        print(f"💾 Audio saved to: {output_filename} ({offsets['docs'][0]['end']:.1f}s)")
 
-        section_num += 1
+    tts_scheduler.cleanup(chunks)
 
 
 if __name__ == "__main__":
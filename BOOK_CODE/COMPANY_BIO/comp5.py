@@ -1,27 +1,17 @@
 
 import os
 import re
-import time
-from google import genai
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_pool import GeminiPool
 
 # === Paths ===
 SCRIPT_PATH = "BOOKS/Temp/STT"        # Transcript input folder
 PROMPTS_PATH = "BOOKS/Temp/PROMPTS"   # Output folder
 MODEL = "gemini-2.5-pro"
 
-# === Load API Keys ===
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5"),
-]
-API_KEYS = [k for k in API_KEYS if k]
-
-if not API_KEYS:
-    raise ValueError("❌ No GEMINI_API keys found.")
-
 # === Helper Functions ===
 def list_txt_files(directory):
     return [f for f in os.listdir(directory) if f.endswith(".txt")]
@@ -34,7 +24,7 @@ def sanitize_filename(n):
     return re.sub(r"[^\w\d\-_. ]+", "", n).replace(" ", "_")
 
 # === Generate prompt ===
-def generate_prompts(text, api_index, filename):
+async def generate_prompts(pool, text, filename):
     prompt = f"""
 This is a full transcript from the file "{filename}".
 
@@ -80,22 +70,14 @@ Start immediately with prompts. No intro.
 Begin:
 """
 
-    attempts = len(API_KEYS)
-    for attempt in range(attempts):
-        key = API_KEYS[(api_index + attempt) % attempts]
-        try:
-            client = genai.Client(api_key=key)
-            res = client.models.generate_content(
-                model=MODEL,
-                contents=[{"role": "user", "parts": [{"text": prompt}]}]
-            )
-            print(f"✅ Transcript '{filename}' processed with API#{(api_index + attempt) % attempts + 1}")
-            return res.text.strip(), (api_index + attempt + 1) % attempts
-        except Exception as e:
-            print(f"⚠️ API failed for '{filename}': {e}")
-            time.sleep(1)
-
-    raise RuntimeError(f"❌ All API keys failed for: {filename}")
+    try:
+        text = await pool.generate_text(
+            MODEL, [{"role": "user", "parts": [{"text": prompt}]}], label=filename
+        )
+    except Exception as e:
+        raise RuntimeError(f"❌ All API keys failed for: {filename}") from e
+    print(f"✅ Transcript '{filename}' processed")
+    return text.strip()
 
 # === Save output ===
 def save_output(filename, text):
@@ -107,25 +89,26 @@ def save_output(filename, text):
     print(f"💾 Saved → {out_path}")
 
 # === Main ===
-def main():
+async def process_transcript(pool, file):
+    print(f"\n📄 Processing transcript: {file}")
+    text = read_file(os.path.join(SCRIPT_PATH, file))
+    try:
+        out = await generate_prompts(pool, text, file)
+        save_output(file, out)
+    except Exception as e:
+        print(f"❌ Failed processing '{file}': {e}")
+
+async def main():
     files = list_txt_files(SCRIPT_PATH)
 
     if not files:
         print("❌ No transcript .txt files found in STT folder.")
         return
 
-    api_index = 0
-
-    for file in files:
-        print(f"\n📄 Processing transcript: {file}")
-        text = read_file(os.path.join(SCRIPT_PATH, file))
-        try:
-            out, api_index = generate_prompts(text, api_index, file)
-            save_output(file, out)
-        except Exception as e:
-            print(f"❌ Failed processing '{file}': {e}")
+    pool = GeminiPool()
+    await asyncio.gather(*(process_transcript(pool, file) for file in files))
 
     print("\n🎉 Finished processing all transcripts!")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -2,8 +2,12 @@
 import os
 import re
 import time
+import sys
 from google import genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_cache import cached_generate_text
+
 # === Paths ===
 SCRIPT_PATH = "BOOKS/Temp/STT"        # Transcript input folder
 PROMPTS_PATH = "BOOKS/Temp/PROMPTS"   # Output folder
@@ -73,12 +77,11 @@ Begin:
         key = API_KEYS[(api_index + attempt) % attempts]
         try:
             client = genai.Client(api_key=key)
-            res = client.models.generate_content(
-                model=MODEL,
-                contents=[{"role": "user", "parts": [{"text": prompt}]}]
+            text = cached_generate_text(
+                client, MODEL, [{"role": "user", "parts": [{"text": prompt}]}]
             )
             print(f"✅ Transcript '{filename}' processed with API#{(api_index + attempt) % attempts + 1}")
-            return res.text.strip(), (api_index + attempt + 1) % attempts
+            return text.strip(), (api_index + attempt + 1) % attempts
         except Exception as e:
             print(f"⚠️ API failed for '{filename}': {e}")
             time.sleep(1)
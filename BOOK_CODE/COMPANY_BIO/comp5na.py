@@ -1,8 +1,12 @@
 import os
 import time
 import re
+import sys
 from google import genai
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_cache import cached_generate_text
+
 # ================= CONFIG =================
 
 STT_PATH = "BOOKS/Temp/STT"
@@ -111,12 +115,11 @@ Follow the structure EXACTLY.
 """
 
     client = genai.Client(api_key=API_KEY)
-    response = client.models.generate_content(
-        model=MODEL,
-        contents=[{"role": "user", "parts": [{"text": prompt}]}]
+    text = cached_generate_text(
+        client, MODEL, [{"role": "user", "parts": [{"text": prompt}]}]
     )
 
-    return response.text.strip()
+    return text.strip()
 
 
 # ================= MAIN =================
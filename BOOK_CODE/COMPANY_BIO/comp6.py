@@ -1,6 +1,9 @@
 
 import os
-import whisper
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+import whisper_service
 
 # --- Directories ---
 BASE_DIR = "BOOKS/Temp"
@@ -8,32 +11,21 @@ TTS_DIR = os.path.join(BASE_DIR, "TTS")     # Original WAV files
 STT_DIR = os.path.join(BASE_DIR, "STT")     # Transcripts will go here
 os.makedirs(STT_DIR, exist_ok=True)
 
-# --- Load Whisper model ---
-model = whisper.load_model("base")
-
 # --- Process all WAV files in TTS_DIR ---
 wav_files = [f for f in os.listdir(TTS_DIR) if f.lower().endswith(".wav")]
 if not wav_files:
     print("❌ No TTS WAV files found.")
     exit()
 
-for wav_file in wav_files:
-    print(f"📄 Processing WAV file: {wav_file}")
-    file_name_no_ext = os.path.splitext(wav_file)[0]
-    wav_path = os.path.join(TTS_DIR, wav_file)
-
-    # --- Transcribe with word timestamps ---
-    result = model.transcribe(wav_path, word_timestamps=True)
+# --- Transcribe with word timestamps (one model, several files at a time) ---
+wav_paths = [os.path.join(TTS_DIR, wav_file) for wav_file in wav_files]
+for wav_path, words in whisper_service.transcribe_many(wav_paths):
+    file_name_no_ext = os.path.splitext(os.path.basename(wav_path))[0]
+    print(f"📄 Processed WAV file: {os.path.basename(wav_path)}")
 
     # --- Save timeline to TXT in STT directory ---
     txt_path = os.path.join(STT_DIR, f"{file_name_no_ext}_timeline.txt")
-    with open(txt_path, "w", encoding="utf-8") as f:
-        for segment in result['segments']:
-            for word in segment.get('words', []):
-                start = word['start']
-                end = word['end']
-                text = word['word']
-                f.write(f"{start:.2f} --> {end:.2f} : {text}\n")
+    whisper_service.write_transcript(words, txt_path, whisper_service.arrow_line)
 
     print(f"✅ Timeline saved: {txt_path}")
 
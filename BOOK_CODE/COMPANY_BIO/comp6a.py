@@ -1,8 +1,11 @@
 
 import os
 import re
-import time
-from google import genai
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))  # repo root
+from gemini_pool import GeminiPool
 
 # === Configuration ===
 STT_PATH = "BOOKS/Temp/STT"
@@ -10,18 +13,6 @@ IMAGES_DIR = "assets/images"
 TXT_OUTPUT_PATH = "BOOKS/Temp/TXT"  # Output folder for plain TXT
 MODEL = "gemini-2.5-flash"
 
-# === Load Gemini API keys from environment variables ===
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5"),
-]
-API_KEYS = [key for key in API_KEYS if key]
-if not API_KEYS:
-    raise ValueError("❌ No valid GEMINI_API keys found in environment variables.")
-
 # === Helpers ===
 def list_files(directory, ext):
     if not os.path.exists(directory):
@@ -126,56 +117,33 @@ fy
 """
     return prompt
 
-def generate_txt_from_ai(prompt, api_index):
+async def generate_txt_from_ai(pool, prompt, label):
     """One API call per file."""
     while True:
-        for attempt in range(len(API_KEYS)):
-            key = API_KEYS[(api_index + attempt) % len(API_KEYS)]
-            try:
-                client = genai.Client(api_key=key)
-                response = client.models.generate_content(
-                    model=MODEL,
-                    contents=[{"role": "user", "parts": [{"text": prompt}]}]
-                )
-                text = getattr(response, "text", None)
-                if text is None:
-                    try:
-                        text = response.output[0].content[0].text
-                    except Exception:
-                        text = str(response)
-                print(f"✅ Success with API#{(api_index + attempt) % len(API_KEYS) + 1}")
-                return text.strip(), (api_index + attempt + 1) % len(API_KEYS)
-            except Exception as e:
-                print(f"⚠️ API#{(api_index + attempt) % len(API_KEYS) + 1} failed: {e}")
-                time.sleep(2)
-        print("🔄 All keys failed, retrying...")
-
-# === Main Execution ===
-os.makedirs(TXT_OUTPUT_PATH, exist_ok=True)
-
-txt_files = list_files(STT_PATH, ".txt")
-if not txt_files:
-    print("❌ No TXT files found in STT folder.")
-    exit(1)
-
-image_files = list_files(IMAGES_DIR, ".jpg") + list_files(IMAGES_DIR, ".png")
-api_index = 0
-
-for txt_file in txt_files:
+        try:
+            text = await pool.generate_text(
+                MODEL, [{"role": "user", "parts": [{"text": prompt}]}], label=label
+            )
+            print(f"✅ Success for {label}")
+            return text.strip()
+        except Exception as e:
+            print(f"🔄 All keys failed for {label}, retrying... ({e})")
+
+async def process_txt_file(pool, txt_file, image_files):
     txt_path = os.path.join(STT_PATH, txt_file)
     sentences = parse_timeline(txt_path)
     if not sentences:
         print(f"⚠️ Skipping {txt_file}, no sentences found.")
-        continue
+        return
 
     # Build one big prompt for this file
     prompt = build_file_prompt(sentences, image_files)
 
     try:
-        file_txt, api_index = generate_txt_from_ai(prompt, api_index)
+        file_txt = await generate_txt_from_ai(pool, prompt, txt_file)
     except Exception as e:
         print(f"❌ Failed for file {txt_file}: {e}")
-        continue
+        return
 
     # Save plain TXT file
     base_name = os.path.splitext(txt_file)[0]
@@ -184,3 +152,20 @@ for txt_file in txt_files:
     with open(out_path, "w", encoding="utf-8") as f:
         f.write(file_txt + "\n")
     print(f"✅ TXT scene file saved: {out_path}")
+
+# === Main Execution ===
+async def main():
+    os.makedirs(TXT_OUTPUT_PATH, exist_ok=True)
+
+    txt_files = list_files(STT_PATH, ".txt")
+    if not txt_files:
+        print("❌ No TXT files found in STT folder.")
+        exit(1)
+
+    image_files = list_files(IMAGES_DIR, ".jpg") + list_files(IMAGES_DIR, ".png")
+
+    pool = GeminiPool()
+    await asyncio.gather(*(process_txt_file(pool, f, image_files) for f in txt_files))
+
+if __name__ == "__main__":
+    asyncio.run(main())
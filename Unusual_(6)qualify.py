@@ -3,6 +3,8 @@ import os
 import re
 import subprocess
 
+import download_sections
+
 BASE_DIR = "Unuusual_memory"
 QUALIFY_FILE = os.path.join(BASE_DIR, "QUALIFY", "qualified.txt")
 RELEVANT_DIR = os.path.join(BASE_DIR, "Relevant_links")
@@ -10,10 +12,10 @@ DOWNLOAD_DIR = os.path.join(BASE_DIR, "best_video")
 
 os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
-def download_video(url, output_path):
+def download_video(url, output_path, group_num=None):
     print(f"Downloading: {url} -> {output_path}")
     result = subprocess.run(
-        ["yt-dlp", "-o", output_path, url],
+        ["yt-dlp", *download_sections.ytdlp_args(group_num), "-o", output_path, url],
         capture_output=True, text=True
     )
     if result.returncode != 0:
@@ -58,7 +60,7 @@ def main():
         output_path = os.path.join(DOWNLOAD_DIR, output_filename)
 
         try:
-            download_video(url_to_download, output_path)
+            download_video(url_to_download, output_path, group_num)
         except Exception as e:
             print(f"[!] Failed to download {url_to_download}: {e}")
 
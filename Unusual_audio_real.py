@@ -1,24 +1,39 @@
+"""
+Cut each group's voice-over out of the merged batch WAV (group_X_to_Y.wav)
+using the chapter range in Unuusual_memory/TIMELINE/group_N.txt.
+
+Every batch WAV is opened once (wav_io.WavFile) and all of its groups are
+written from it at sample accuracy; timeline ranges may carry
+milliseconds ("00:12.480-00:49.120") as well as whole seconds ("00:12-00:49").
+
+Env:
+  AUDIO_REAL_FADE_MS   linear fade-in/out at each cut in ms (default: 0 = off;
+                       fades need numpy, plain cuts are byte copies)
+"""
 
 import os
 import re
-import subprocess
+from pipeline import want_file
+import wav_io
 
 audio_dir = "Unuusual_memory/AUDIO"
 timeline_dir = "Unuusual_memory/TIMELINE"
 output_dir = "Unuusual_memory/AUDIO_REAL"
+FADE_MS = float(os.environ.get("AUDIO_REAL_FADE_MS", "0"))
 
-os.makedirs(output_dir, exist_ok=True)
+if FADE_MS > 0 and wav_io.np is None:
+    raise SystemExit("❌ AUDIO_REAL_FADE_MS needs numpy: pip install numpy (or set it to 0)")
 
-def extract_audio(source_wav, start_time, end_time, output_wav):
-    subprocess.run([
-        "ffmpeg", "-y", "-i", source_wav,
-        "-ss", start_time, "-to", end_time,
-        "-c", "copy", output_wav
-    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+os.makedirs(output_dir, exist_ok=True)
 
-def time_to_seconds(time_str):
-    parts = time_str.split(':')
-    return int(parts[0]) * 60 + int(parts[1])
+def read_range(timeline_path):
+    """(start_sec, end_sec) from the first line of a timeline file, or None."""
+    with open(timeline_path) as f:
+        line = f.readline().strip()
+    match = re.match(r"^\s*([\d:.,]+)\s*-\s*([\d:.,]+)", line)
+    if not match:
+        return None
+    return wav_io.parse_time(match.group(1)), wav_io.parse_time(match.group(2))
 
 # Parse merged wav files and their ranges
 wav_files = {}
@@ -30,9 +45,10 @@ for filename in os.listdir(audio_dir):
             end = int(match.group(2))
             wav_files[(start, end)] = os.path.join(audio_dir, filename)
 
-# Process timeline files
+# Collect the groups to cut, per source wav
+jobs = {}
 for filename in os.listdir(timeline_dir):
-    if filename.endswith(".txt"):
+    if filename.endswith(".txt") and want_file(filename):
         match = re.search(r"group_(\d+)\.txt", filename)
         if match:
             group_number = int(match.group(1))
@@ -41,11 +57,25 @@ for filename in os.listdir(timeline_dir):
             # Find matching wav
             for (start, end), wav_path in wav_files.items():
                 if start <= group_number <= end:
-                    with open(timeline_path) as f:
-                        line = f.readline().strip()
-                        if '-' in line:
-                            start_time, end_time = line.split('-')
-                            output_wav = os.path.join(output_dir, f"group_{group_number}.wav")
-                            extract_audio(wav_path, start_time, end_time, output_wav)
-                            print(f"Extracted group {group_number} from {wav_path}")
+                    cut = read_range(timeline_path)
+                    if cut:
+                        jobs.setdefault(wav_path, []).append((group_number, cut))
                     break
+
+# Open each batch wav once and write all of its groups
+for wav_path, groups in sorted(jobs.items()):
+    try:
+        wav = wav_io.WavFile(wav_path)
+    except (OSError, wav_io.WavError) as e:
+        print(f"Could not open {wav_path}: {e}")
+        continue
+    with wav:
+        for group_number, (start_sec, end_sec) in sorted(groups):
+            output_wav = os.path.join(output_dir, f"group_{group_number}.wav")
+            try:
+                wav.write_slice(output_wav, start_sec, end_sec, fade_ms=FADE_MS)
+            except wav_io.WavError as e:
+                print(f"Skipped group {group_number}: {e}")
+                continue
+            print(f"Extracted group {group_number} from {wav_path} "
+                  f"({wav_io.format_time(start_sec)}-{wav_io.format_time(min(end_sec, wav.duration))})")
@@ -2,6 +2,10 @@
 import os
 import subprocess
 import random
+import smart_cut
+import media_probe
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pipeline import want_file
 
 # Folders
 video_folder = "No_Face_Videos"
@@ -12,79 +16,57 @@ intro_outro_folder = "Unuusual_memory/Intro,ourto_audio"
 final_folder = "Final_Videos"
 os.makedirs(final_folder, exist_ok=True)
 
+# Groups assembled concurrently (each is one stream-copy ffmpeg)
+ASSEMBLE_JOBS = int(os.environ.get("AUDIOCONC_JOBS", "0")) or os.cpu_count() or 1
+
 # Intro and Outro audio
 intro_audio = os.path.join(intro_outro_folder, "Intro.wav")
 outro_audio = os.path.join(intro_outro_folder, "Outro.wav")
 
 # List all valid audio files (.wav)
-audio_files = [f for f in os.listdir(audio_folder) if f.endswith(".wav")]
+audio_files = [f for f in os.listdir(audio_folder) if f.endswith(".wav") and want_file(f)]
 
-# Helper function to get duration of a media file
+# Duration of a media file (cached ffprobe, see media_probe.py)
 def get_duration(file_path):
-    result = subprocess.run([
-        "ffprobe", "-v", "error", "-show_entries",
-        "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", file_path
-    ], capture_output=True, text=True)
-    return float(result.stdout.strip())
-
-# Step 1: Process each group video and merge with its own audio
-for audio_file in audio_files:
+    return media_probe.duration(file_path)
+
+# Step 1: Process each group video and merge with its own audio.
+# One ffmpeg per group: the muted video (-an via -map 0:v) is looped
+# (-stream_loop -1) or cut to the audio length (-t) and muxed with the
+# audio in the same run - no Temp_/Looped_/Trimmed_ files, one ffprobe.
+def assemble_cmd(video_file, audio_path, audio_duration, merged_video):
+    return [
+        "ffmpeg", "-y", "-v", "error",
+        "-stream_loop", "-1", "-i", video_file,
+        "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-t", f"{audio_duration:.3f}",
+        "-c:v", "copy", "-c:a", "aac",
+        merged_video
+    ]
+
+def assemble_group(audio_file):
     group_name = os.path.splitext(audio_file)[0]  # e.g., "group_1"
     video_file = os.path.join(video_folder, f"{group_name}_noface.mp4")
     audio_path = os.path.join(audio_folder, audio_file)
 
     if not os.path.exists(video_file):
-        print(f"Skipping {group_name}, video not found.")
-        continue
-
-    # Remove video audio (mute original video)
-    muted_video = f"Temp_{group_name}.mp4"
-    subprocess.run([
-        "ffmpeg", "-y", "-i", video_file, "-an", "-c", "copy", muted_video
-    ], check=True)
-
-    audio_duration = get_duration(audio_path)
-    video_duration = get_duration(muted_video)
-
-    # Adjust video duration to match audio duration by trimming or looping
-    looped_video = f"Looped_{group_name}.mp4"
-    if video_duration >= audio_duration:
-        # Trim video
-        subprocess.run([
-            "ffmpeg", "-y", "-ss", "0", "-t", str(audio_duration),
-            "-i", muted_video, "-c", "copy", looped_video
-        ], check=True)
-    else:
-        # Loop video to extend duration
-        loops = int(audio_duration // video_duration) + 1
-        concat_list = f"{group_name}_concat.txt"
-        with open(concat_list, "w") as f:
-            for _ in range(loops):
-                f.write(f"file '{muted_video}'\n")
-        subprocess.run([
-            "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-            "-i", concat_list, "-c", "copy", looped_video
-        ], check=True)
-        # Trim to exact audio duration
-        trimmed_video = f"Trimmed_{group_name}.mp4"
-        subprocess.run([
-            "ffmpeg", "-y", "-ss", "0", "-t", str(audio_duration),
-            "-i", looped_video, "-c", "copy", trimmed_video
-        ], check=True)
-        os.replace(trimmed_video, looped_video)
-        os.remove(concat_list)
+        return f"Skipping {group_name}, video not found."
 
-    # Merge muted video with corresponding audio
     merged_video = os.path.join(final_folder, f"{group_name}.mp4")
-    subprocess.run([
-        "ffmpeg", "-y", "-i", looped_video, "-i", audio_path,
-        "-c:v", "copy", "-c:a", "aac", "-shortest", merged_video
-    ], check=True)
+    subprocess.run(assemble_cmd(video_file, audio_path, get_duration(audio_path), merged_video), check=True)
+    return f"✅ Created {merged_video}"
+
+# Probe the selected group audio in parallel up front (memoized for get_duration)
+media_probe.probe_files([os.path.join(audio_folder, f) for f in audio_files])
 
-    # Cleanup temp files
-    os.remove(muted_video)
-    os.remove(looped_video)
-    print(f"✅ Created {merged_video}")
+with ThreadPoolExecutor(max_workers=ASSEMBLE_JOBS) as pool:
+    futures = {pool.submit(assemble_group, f): f for f in sorted(audio_files)}
+    for fut in as_completed(futures):
+        try:
+            print(fut.result())
+        except (subprocess.CalledProcessError, media_probe.ProbeError, OSError) as e:
+            print(f"❌ Failed on {futures[fut]}: {e}")
 
 # Step 2: Create intro & outro video from middle parts of random group videos
 def create_middle_clip(video_path, duration=5):
@@ -93,10 +75,7 @@ def create_middle_clip(video_path, duration=5):
         return None  # Skip too-short videos
     start_time = total_duration / 2 - duration / 2
     temp_clip = f"Clip_{os.path.basename(video_path)}"
-    subprocess.run([
-        "ffmpeg", "-y", "-ss", str(start_time), "-t", str(duration),
-        "-i", video_path, "-c", "copy", temp_clip
-    ], check=True)
+    smart_cut.cut(video_path, start_time, start_time + duration, temp_clip)
     return temp_clip
 
 # Concatenate clips (try stream copy, fallback to re-encoding)
@@ -164,6 +143,7 @@ print(f"✅ Created final outro video with Outro.wav audio: {outro_final}")
 for clip in intro_clips + outro_clips:
     if clip and clip.startswith("Clip_") and os.path.exists(clip):
         os.remove(clip)
+        smart_cut.drop_index(clip)
 if os.path.exists(intro_video):
     os.remove(intro_video)
 if os.path.exists(outro_video):
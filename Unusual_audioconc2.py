@@ -3,6 +3,7 @@ import os
 import subprocess
 import random
 import shutil
+import media_probe
 
 # Folders
 video_folder = "No_Face_Videos"
@@ -37,12 +38,7 @@ for audio_file in audio_files:
 
     # Step 2: Get durations
     def get_duration(file_path):
-        result = subprocess.run([
-            "ffprobe", "-v", "error", "-show_entries",
-            "format=duration", "-of",
-            "default=noprint_wrappers=1:nokey=1", file_path
-        ], capture_output=True, text=True)
-        return float(result.stdout.strip())
+        return media_probe.duration(file_path)
 
     audio_duration = get_duration(audio_path)
     video_duration = get_duration(muted_video)
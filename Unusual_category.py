@@ -61,9 +61,10 @@ def call_gemini_api(prompt):
         model = "gemini-2.5-flash"
         contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
         config = types.GenerateContentConfig(response_mime_type="text/plain")
+        # Not cached: the same category must still yield fresh gadgets
         full_response = ""
         for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
-            full_response += chunk.text
+            full_response += chunk.text or ""
         return full_response.strip()
     except Exception as e:
         print(f"❌ Gemini API failed: {e}")
@@ -1,69 +1,110 @@
+"""
+Unusual_conc.py
+---------------
+Cut the NO_FACE intervals (Unuusual_memory/NO_FACE/group_N.txt, "MM:SS-MM:SS"
+per line) out of Processed_Vid/group_N.mp4 and join them into
+No_Face_Videos/group_N_noface.mp4 - ONE ffmpeg invocation per video, no
+per-interval processes and no Temp_Segments/ files.
+
+Modes (smart_cut.py, CUT_MODE):
+  * copy (default): a concat-demuxer list that names the same source once
+    per interval with inpoint/outpoint, fed to ffmpeg on stdin. Cuts snap
+    to keyframes exactly like the old per-segment `-ss/-to -c copy`.
+  * smart: re-encode only the partial GOPs at each cut, stream-copy the
+    rest (keyframe index cached beside the video) - frame-accurate, near
+    copy speed.
+  * accurate: a select/aselect filter graph keeps exactly the frames inside
+    the intervals and re-encodes once (libx264).
+
+Back-to-back intervals (00:20-00:23, 00:23-00:24) are merged first.
+
+Env:
+  CUT_MODE       copy | smart | accurate (default: copy)
+  CUT_PRESET / CUT_CRF / CUT_JOBS   see smart_cut.py
+"""
 
 import os
 import subprocess
+import smart_cut
+from pipeline import want_file
 
-os.makedirs("No_Face_Videos", exist_ok=True)
-os.makedirs("Temp_Segments", exist_ok=True)
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+NO_FACE_DIR = "Unuusual_memory/NO_FACE"
+VIDEO_DIR   = "Processed_Vid"
+OUTPUT_DIR  = "No_Face_Videos"
 
-for noface in os.listdir("Unuusual_memory/NO_FACE"):
-    if not noface.endswith(".txt"):
-        continue
 
-    base = noface[:-4]
-    video = f"Processed_Vid/{base}.mp4"
-    noface_path = f"Unuusual_memory/NO_FACE/{noface}"
+# ------------------------------------------------------------------
+# Intervals
+# ------------------------------------------------------------------
+def to_seconds(stamp):
+    """'MM:SS' / 'HH:MM:SS' (optionally fractional) -> seconds."""
+    total = 0.0
+    for part in stamp.strip().split(":"):
+        total = total * 60 + float(part)
+    return total
 
-    if not os.path.exists(video):
-        print(f"⚠️ Skipping {base} - video not found.")
-        continue
+def read_intervals(path):
+    """Sorted, merged [(start, end), ...] in seconds; invalid / empty lines skipped."""
+    spans = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for rawline in f:
+            line = rawline.strip().replace('\r', '')
+            if not line or not (":" in line and "-" in line):
+                if line:
+                    print(f"⏭️ Skipping invalid line: '{line}'")
+                continue
+            try:
+                start, end = (to_seconds(x) for x in line.split('-'))
+            except ValueError:
+                print(f"⏭️ Skipping invalid line: '{line}'")
+                continue
+            if end <= start:
+                print(f"⏭️ Skipping zero-duration segment: {line}")
+                continue
+            spans.append((start, end))
 
-    print(f"🎬 Processing {base}")
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
 
-    seg_num = 1
-    concat_list = f"Temp_Segments/{base}_concat_list.txt"
-    with open(concat_list, "w") as cl:
-        with open(noface_path, "r", encoding="utf-8-sig") as f:
-            for rawline in f:
-                line = rawline.strip().replace('\r', '')
-                print(f"📄 Raw line: [{line}]")
 
-                if not line or not (":" in line and "-" in line):
-                    print(f"⏭️ Skipping invalid line: '{line}'")
-                    continue
-
-                start, end = line.split('-')
-
-                if start == end:
-                    print(f"⏭️ Skipping zero-duration segment: {start} to {end}")
-                    continue
-
-                print(f"✂️ Cutting segment from '{start}' to '{end}'")
-                seg_file = f"Temp_Segments/{base}_seg_{seg_num}.mp4"
-
-                try:
-                    subprocess.run([
-                        "ffmpeg", "-y",
-                        "-ss", start,
-                        "-to", end,
-                        "-i", video,
-                        "-c", "copy",
-                        seg_file
-                    ], check=True)
-                    cl.write(f"file '{os.path.basename(seg_file)}'\n")
-                    seg_num += 1
-                except subprocess.CalledProcessError as e:
-                    print(f"❌ FFmpeg error on segment {start} to {end}: {e}")
-                    continue
-
-    if os.path.getsize(concat_list) > 0:
-        print(f"🔗 Concatenating segments for {base}...")
-        subprocess.run([
-            "ffmpeg", "-y",
-            "-f", "concat", "-safe", "0",
-            "-i", concat_list,
-            "-c", "copy",
-            f"No_Face_Videos/{base}_noface.mp4"
-        ], check=True)
-        print(f"✅ Finished processing {base}")
-    else:
-        print(f"⚠️ No valid segments for {base}, skipping.")
+# ------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    for noface in sorted(os.listdir(NO_FACE_DIR)):
+        if not noface.endswith(".txt") or not want_file(noface):
+            continue
+
+        base = noface[:-4]
+        video = os.path.join(VIDEO_DIR, f"{base}.mp4")
+
+        if not os.path.exists(video):
+            print(f"⚠️ Skipping {base} - video not found.")
+            continue
+
+        intervals = read_intervals(os.path.join(NO_FACE_DIR, noface))
+        if not intervals:
+            print(f"⚠️ No valid segments for {base}, skipping.")
+            continue
+
+        output = os.path.join(OUTPUT_DIR, f"{base}_noface.mp4")
+        print(f"🎬 Processing {base}: {len(intervals)} segment(s), {smart_cut.CUT_MODE} cut")
+        try:
+            smart_cut.cut_many(video, intervals, output)
+            print(f"✅ Finished processing {base}")
+        except subprocess.CalledProcessError as e:
+            print(f"❌ FFmpeg error on {base}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 import os
 import re
 import sys
-import requests
+from youtube_api import MetadataService, collect_video_ids
 
 # === CONFIGURATION ===
 LINKS_DIR = "Unuusual_memory/Links"
@@ -15,30 +15,16 @@ if not API_KEY:
     print("[✘] YOUTUBE_API environment variable not set.")
     sys.exit(1)
 
+META = MetadataService(API_KEY)
+
 def extract_video_id(url):
     """Extract YouTube video ID from a URL."""
     match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11})", url)
     return match.group(1) if match else None
 
 def fetch_video_info(video_id):
-    """Fetch video title and description from YouTube Data API."""
-    api_url = "https://www.googleapis.com/youtube/v3/videos"
-    params = {
-        "id": video_id,
-        "key": API_KEY,
-        "part": "snippet"
-    }
-    try:
-        response = requests.get(api_url, params=params, timeout=10)
-        response.raise_for_status()
-        items = response.json().get("items", [])
-        if not items:
-            return None, None
-        snippet = items[0]["snippet"]
-        return snippet["title"], snippet["description"]
-    except Exception as e:
-        print(f"[ERROR] Failed to fetch video info: {e}")
-        return None, None
+    """Title and description from the shared metadata table (see youtube_api.py)."""
+    return META.video_info(video_id)
 
 def index_to_letter(index):
     """Convert index (0–25) to letter (a–z)."""
@@ -68,6 +54,12 @@ def main():
         print("[✘] No valid numbered .txt files found in range 1–33.")
         return
 
+    # One batched metadata pass for every link we are about to save
+    META.ensure(collect_video_ids(
+        [LINKS_DIR], per_file=12,
+        names=[txt_file for _, txt_file in valid_txt_files],
+    ))
+
     for number, txt_file in valid_txt_files:
         file_path = os.path.join(LINKS_DIR, txt_file)
         print(f"[•] Processing: {txt_file}")
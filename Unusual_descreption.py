@@ -2,11 +2,11 @@
 import os
 import re
 import sys
-import requests
+from youtube_api import MetadataService, collect_video_ids
 
 # === CONFIGURATION ===
 QUALIFY_PATH = "Unuusual_memory/QUALIFY/qualified.txt"
-LINKS_DIR = "Unuusual_memory/Relevant_links"
+LINKS_DIR = "Unuusual_memory/Links"  # slot letters index the Links files
 OUTPUT_DIR = "Unuusual_memory/DESCREPTION"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -16,30 +16,16 @@ if not API_KEY:
     print("[✘] YOUTUBE_API environment variable not set.")
     sys.exit(1)
 
+META = MetadataService(API_KEY)
+
 def extract_video_id(url):
     """Extract YouTube video ID from URL."""
     match = re.search(r"(?:v=|\/)([0-9A-Za-z_-]{11})", url)
     return match.group(1) if match else None
 
 def fetch_video_info(video_id):
-    """Fetch title and description via YouTube Data API."""
-    api_url = "https://www.googleapis.com/youtube/v3/videos"
-    params = {
-        "id": video_id,
-        "key": API_KEY,
-        "part": "snippet"
-    }
-    try:
-        response = requests.get(api_url, params=params, timeout=10)
-        response.raise_for_status()
-        items = response.json().get("items", [])
-        if not items:
-            return None, None
-        snippet = items[0]["snippet"]
-        return snippet["title"], snippet["description"]
-    except Exception as e:
-        print(f"[ERROR] Failed to fetch video info: {e}")
-        return None, None
+    """Title and description from the shared metadata table (see youtube_api.py)."""
+    return META.video_info(video_id)
 
 def letter_to_index(letter):
     """Convert alphabetical letter (a-z) to zero-based index."""
@@ -47,6 +33,9 @@ def letter_to_index(letter):
 
 # === MAIN ===
 def main():
+    # One batched metadata pass for all qualified candidates
+    META.ensure(collect_video_ids([LINKS_DIR]))
+
     try:
         with open(QUALIFY_PATH, encoding="utf-8") as f:
             for line in f:
@@ -3,33 +3,62 @@
 """
 face_timeline.py
 ----------------
-Scan each *.mp4 in VIDEO_DIR (default: Final_Videos/), detect faces per second (0..N),
+Scan each video in VIDEO_DIR (default: Processed_Vid/), detect faces per second (0..N),
 cap at MAX_ANALYZE_SECONDS (default 180), and save output videos with no-face frames
-into Timeline/ folder.
+into NOFACE_OUTPUT_DIR (default: No_Face_Videos/, as <name>_noface.mp4).
+
+This is the pipeline's "noface" stage (pipeline.py, PIPELINE_FACE=local): it
+replaces the Unusual_face.py -> NO_FACE -> Unusual_conc.py chain, so every
+downloaded video is decoded exactly once. Honours PIPELINE_GROUPS.
 
 MediaPipe Face Detection is used with configurable confidence (MIN_CONFIDENCE).
 
 If SKIP_EXISTING=1 and output video already exists, that video is skipped.
+
+Each video is decoded ONCE by an ffmpeg pipe (frame_source.py): downscaled RGB
+for detection (FACE_DETECT_WIDTH) and full-size BGR frames, which are streamed
+into an ffmpeg libx264 encoder over stdin when they have no face. The source
+audio of the kept frames is muxed back in. The same pass also writes, as
+by-products:
+  * TIMELINE_DIR/<name>.txt  per-second face / no_face timeline (Unusual_faces.py format)
+  * NO_FACE_DIR/<name>.txt   "MM:SS-MM:SS" no-face intervals (Unusual_conc.py format;
+                              also read by download_sections.py)
+
+Env:
+  VIDEO_DIR          (default: Processed_Vid)
+  NOFACE_OUTPUT_DIR  (default: No_Face_Videos)
+  TIMELINE_DIR   (default: Timeline)
+  NO_FACE_DIR    (default: Unuusual_memory/NO_FACE)
+  NOFACE_PRESET  libx264 preset (default: veryfast)
+  NOFACE_CRF     libx264 CRF (default: 20)
 """
 
 import os
 import sys
 import math
-import cv2
+import subprocess
 import mediapipe as mp
+import frame_source
+import media_probe
+from pipeline import selected_groups, want_file
 
 # ---------------- ENV ----------------
 def _truthy(x): 
     return str(x).strip().lower() in ("1", "true", "yes", "on")
 
-VIDEO_DIR       = os.environ.get("VIDEO_DIR", "Final_Videos")
-OUTPUT_DIR      = "Timeline"       # Save output videos here
+VIDEO_DIR       = os.environ.get("VIDEO_DIR", "Processed_Vid")
+OUTPUT_DIR      = os.environ.get("NOFACE_OUTPUT_DIR", "No_Face_Videos")   # Save output videos here
+TIMELINE_DIR    = os.environ.get("TIMELINE_DIR", "Timeline")
+NO_FACE_DIR     = os.environ.get("NO_FACE_DIR", "Unuusual_memory/NO_FACE")
+PRESET          = os.environ.get("NOFACE_PRESET", "veryfast")
+CRF             = os.environ.get("NOFACE_CRF", "20")
 MAX_ANALYZE_SEC = int(os.environ.get("MAX_ANALYZE_SECONDS", "180"))
 MIN_CONF        = float(os.environ.get("MIN_CONFIDENCE", "0.5"))
 SKIP_EXISTING   = _truthy(os.environ.get("SKIP_EXISTING", "1"))
 VERBOSE         = _truthy(os.environ.get("VERBOSE", "1"))
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+for _d in (OUTPUT_DIR, TIMELINE_DIR, NO_FACE_DIR):
+    os.makedirs(_d, exist_ok=True)
 
 def vlog(msg):
     if VERBOSE:
@@ -41,13 +70,11 @@ def err(msg):
 # ---------------- FACE DETECTOR ----------------
 mp_face = mp.solutions.face_detection
 
-def detect_faces_bgr(image_bgr, detector):
+def detect_faces_rgb(image_rgb, detector):
     """
-    Run mediapipe face detector on a single BGR frame.
+    Run mediapipe face detector on a single RGB frame (from the frame_source pipe).
     Returns number of detections meeting MIN_CONF.
     """
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    image_rgb.flags.writeable = False
     results = detector.process(image_rgb)
     count = 0
     if results.detections:
@@ -56,30 +83,88 @@ def detect_faces_bgr(image_bgr, detector):
                 count += 1
     return count
 
+# ---------------- OUTPUTS ----------------
+def open_encoder(output_path, width, height, fps):
+    """ffmpeg libx264 encoder fed raw BGR frames on stdin."""
+    return subprocess.Popen([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", f"{fps!r}",
+        "-i", "pipe:0",
+        "-c:v", "libx264", "-preset", PRESET, "-crf", CRF, "-pix_fmt", "yuv420p",
+        "-movflags", "+faststart", output_path
+    ], stdin=subprocess.PIPE)
+
+def mux_audio(video_only, source, kept, fps, output_path):
+    """Copy the encoded video and add the source audio of the kept frame runs."""
+    keep = "+".join(f"between(t,{f0 / fps:.6f},{f1 / fps:.6f})" for f0, f1 in kept)
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error", "-i", video_only, "-i", source,
+        "-filter_complex", f"[1:a:0]aselect='{keep}',asetpts=N/SR/TB[a]",
+        "-map", "0:v:0", "-map", "[a]", "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+        "-shortest", "-movflags", "+faststart", output_path
+    ], check=True)
+
+def mmss(sec):
+    return f"{sec // 60:02d}:{sec % 60:02d}"
+
+def write_timeline(timeline_path, sec_results, max_seconds_int, duration_sec_est):
+    """Same format as Unusual_faces.py."""
+    with open(timeline_path, "w", encoding="utf-8") as f:
+        f.write(f"total_seconds_analyzed: {max_seconds_int + 1}\n")
+        if duration_sec_est is not None:
+            f.write(f"video_duration_est: {int(duration_sec_est)}\n")
+        f.write(f"seconds_truncated_to: {max_seconds_int}\n")
+        f.write("---\n")
+        for s in range(0, max_seconds_int + 1):
+            f.write(f"{s}: {'face' if sec_results.get(s) else 'no_face'}\n")
+    vlog(f"[write] {timeline_path}")
+
+def write_no_face(no_face_path, sec_results, n_seconds):
+    """NO_FACE interval file ("MM:SS-MM:SS" per run of no_face seconds) for Unusual_conc.py."""
+    spans, start = [], None
+    for s in range(n_seconds + 1):
+        clear = s < n_seconds and not sec_results.get(s, False)
+        if clear and start is None:
+            start = s
+        elif not clear and start is not None:
+            spans.append(f"{mmss(start)}-{mmss(s)}")
+            start = None
+    with open(no_face_path, "w", encoding="utf-8") as f:
+        f.write("".join(span + "\n" for span in spans))
+    vlog(f"[write] {no_face_path} ({len(spans)} interval(s))")
+
 # ---------------- PER-VIDEO ANALYSIS ----------------
 def analyze_video(video_path):
+    """
+    One decode per video: detect faces on small RGB frames, stream the
+    full-size face-free frames into libx264, and record the per-second
+    timeline + NO_FACE intervals along the way.
+    """
     base = os.path.splitext(os.path.basename(video_path))[0]
     output_path = os.path.join(OUTPUT_DIR, base + "_noface.mp4")
+    timeline_path = os.path.join(TIMELINE_DIR, base + ".txt")
+    no_face_path = os.path.join(NO_FACE_DIR, base + ".txt")
 
     vlog(f"\n[video] {video_path}")
 
-    if SKIP_EXISTING and os.path.isfile(output_path):
+    # A group the pipeline asked for is rebuilt even if its output exists
+    if SKIP_EXISTING and selected_groups() is None and os.path.isfile(output_path):
         vlog(f"[skip] output video exists: {output_path}")
         return True
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        err(f"[!] cannot open video: {video_path}")
+    try:
+        meta = frame_source.probe(video_path)
+    except Exception as e:
+        err(f"[!] cannot open video: {video_path} ({e})")
         return False
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = meta["fps"]
     if not fps or fps <= 0:
         fps = 30.0
         vlog(f"[warn] invalid FPS -> fallback to {fps}")
 
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    width, height = meta["width"], meta["height"]
+    frame_count = meta["frames"]
     duration_sec_est = frame_count / fps if frame_count else None
 
     if duration_sec_est is not None:
@@ -90,32 +175,67 @@ def analyze_video(video_path):
     max_seconds_int = int(math.floor(max_seconds))
     vlog(f"  fps={fps:.3f} frames={frame_count} dur_est={duration_sec_est} analyze<= {max_seconds_int}s")
 
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-    out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-    with mp_face.FaceDetection(model_selection=0, min_detection_confidence=MIN_CONF) as detector:
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                break
-
-            pos_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
-            if pos_msec is None:
-                pos_frames = cap.get(cv2.CAP_PROP_POS_FRAMES)
-                pos_msec = (pos_frames / fps) * 1000.0
-
-            cur_sec = int(pos_msec / 1000.0)
-            if cur_sec > max_seconds_int:
-                break
-
-            n_faces = detect_faces_bgr(frame, detector)
-            # Keep frame only if no faces detected
-            if n_faces == 0:
-                out.write(frame)
-
-    cap.release()
-    out.release()
-    vlog(f"[output] saved no-face video: {output_path}")
+    audio = media_probe.has_audio(video_path)
+    video_only = output_path + ".video.mp4" if audio else output_path
+    encoder = open_encoder(video_only, width, height, fps)
+
+    sec_results = {}
+    kept = []          # [first, end) source frame runs written to the encoder
+    last_sec = -1
+    # One decode: small RGB frames for detection + full-size BGR frames for the encoder
+    src = frame_source.FrameSource(video_path, fps=fps, duration=max_seconds_int + 1,
+                                   full_bgr=True, info=meta)
+    try:
+        with mp_face.FaceDetection(model_selection=0, min_detection_confidence=MIN_CONF) as detector:
+            while src.read():
+                cur_sec = int(src.index / fps)
+                if cur_sec > max_seconds_int:
+                    break
+                last_sec = cur_sec
+
+                n_faces = detect_faces_rgb(src.frame, detector)
+                if n_faces > 0:
+                    sec_results[cur_sec] = True
+                    continue
+
+                # Keep frame only if no faces detected
+                encoder.stdin.write(src.full)
+                if kept and kept[-1][1] == src.index:
+                    kept[-1][1] += 1
+                else:
+                    kept.append([src.index, src.index + 1])
+    except BrokenPipeError:
+        pass  # encoder died; reported below
+    finally:
+        src.close()
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:
+            pass
+        encoder.wait()
+
+    if last_sec < 0:
+        err(f"[!] no frames read: {video_path}")
+        return False
+    if not kept:
+        vlog(f"[output] every frame has a face, no video written: {output_path}")
+        for path in (video_only, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+    elif encoder.returncode != 0:
+        err(f"[!] encoder failed ({encoder.returncode}): {output_path}")
+        return False
+    elif audio:
+        try:
+            mux_audio(video_only, video_path, kept, fps, output_path)
+        finally:
+            if os.path.exists(video_only):
+                os.remove(video_only)
+    if kept:
+        vlog(f"[output] saved no-face video: {output_path} ({sum(f1 - f0 for f0, f1 in kept)} frame(s))")
+
+    write_timeline(timeline_path, sec_results, max_seconds_int, duration_sec_est)
+    write_no_face(no_face_path, sec_results, last_sec + 1)
     return True
 
 # ---------------- SCAN VIDEO DIR ----------------
@@ -123,6 +243,8 @@ def main():
     print("=== face_timeline.py ===")
     print(f"VIDEO_DIR       = {VIDEO_DIR}")
     print(f"OUTPUT_DIR      = {OUTPUT_DIR}")
+    print(f"TIMELINE_DIR    = {TIMELINE_DIR}")
+    print(f"NO_FACE_DIR     = {NO_FACE_DIR}")
     print(f"MAX_ANALYZE_SEC = {MAX_ANALYZE_SEC}")
     print(f"MIN_CONF        = {MIN_CONF}")
     print(f"SKIP_EXISTING   = {SKIP_EXISTING}")
@@ -133,7 +255,7 @@ def main():
         sys.exit(1)
 
     videos = [fn for fn in os.listdir(VIDEO_DIR)
-              if fn.lower().endswith((".mp4", ".mov", ".m4v", ".mkv", ".webm"))]
+              if fn.lower().endswith((".mp4", ".mov", ".m4v", ".mkv", ".webm")) and want_file(fn)]
 
     if not videos:
         err("[!] No video files found.")
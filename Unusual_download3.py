@@ -1,62 +1,52 @@
-
+"""
+Download every qualified video (Unuusual_memory/QUALIFY/qualified.txt) into
+Vid/group_N.<ext> with yt-dlp, DOWNLOAD_JOBS at a time.
+
+Each job borrows its own Tor SOCKS port / circuit from tor_pool.TorPool; a
+failed attempt rotates that slot's circuit over the control port and
+retries, without restarting the daemon or touching the other jobs.
+Videos already in Vid/ are skipped.
+
+Only the part of each video the pipeline uses is fetched: the time range up
+to the last no-face second (or MAX_ANALYZE_SECONDS), the lowest format that
+meets DOWNLOAD_MIN_RES, no audio (see download_sections.py). Section
+downloads run through ffmpeg, so on Tor yt-dlp runs under torsocks on the
+slot's circuit, and they are NOT resumable: a failed attempt starts the
+section over. Whole-video downloads (DOWNLOAD_SECTIONS=full, or a section
+that would skip less than DOWNLOAD_SECTION_MIN_SAVING of the video) use
+yt-dlp's own downloader, which keeps .part files, so a retried or re-run
+download resumes where it stopped.
+
+Env:
+  DOWNLOAD_JOBS        concurrent downloads / Tor circuits (default: 4)
+  DOWNLOAD_RETRIES     attempts per video (default: 3)
+  DOWNLOAD_FRAGMENTS   concurrent fragments per download (default: 4)
+  DOWNLOAD_TOR         "0" downloads directly without Tor (default 1)
+"""
 
 import os
-import subprocess
 import re
 import sys
+import glob
 import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import download_sections
+from tor_pool import TorPool
 
 # === CONFIGURATION ===
 QUALIFY_PATH = "Unuusual_memory/QUALIFY/qualified.txt"
-LINKS_DIR = "Unuusual_memory/Relevant_links"
+LINKS_DIR = "Unuusual_memory/Links"  # slot letters index the Links files
 OUTPUT_DIR = "Vid"
 FILTER_RESULT_PATH = os.path.join(OUTPUT_DIR, "filter_result.txt")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# === UTILITIES ===
-def restart_tor():
-    print("[*] Restarting Tor to get new IP...")
-    run_command(["sudo", "service", "tor", "restart"], "Failed to restart Tor", retries=1)
-    time.sleep(5)  # Allow Tor time to reconnect
-
-def run_command(command, error_msg, retries=5, delay=5, restart_ip_on_fail=False):
-    for attempt in range(retries):
-        try:
-            subprocess.run(command, check=True)
-            return
-        except subprocess.CalledProcessError as e:
-            print(f"[ERROR] {error_msg} (Attempt {attempt + 1}/{retries}): {e}")
-            if restart_ip_on_fail:
-                restart_tor()
-            if attempt < retries - 1:
-                print(f"[*] Retrying in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                print("[✘] Giving up.")
-                sys.exit(1)
-
-# === TOR SETUP ===
-def start_tor():
-    print("[*] Setting up Tor...")
-    tor_installed = subprocess.run(["which", "tor"], capture_output=True).returncode == 0
-    if not tor_installed:
-        print("[*] Installing Tor...")
-        run_command(["sudo", "apt-get", "update"], "Failed to update package list")
-        run_command(["sudo", "apt-get", "install", "-y", "tor"], "Failed to install Tor")
-
-    print("[*] Starting Tor service...")
-    run_command(["sudo", "service", "tor", "start"], "Failed to start Tor")
-
-    try:
-        result = subprocess.run([
-            "curl", "--socks5", "127.0.0.1:9050", "https://check.torproject.org/"
-        ], capture_output=True, timeout=10)
-        if b"Congratulations" in result.stdout:
-            print("[✓] Tor is active.")
-        else:
-            print("[!] Tor check did not confirm activity.")
-    except Exception as e:
-        print(f"[!] Skipping Tor validation: {e}")
+JOBS      = max(1, int(os.environ.get("DOWNLOAD_JOBS", "4")))
+RETRIES   = max(1, int(os.environ.get("DOWNLOAD_RETRIES", "3")))
+FRAGMENTS = os.environ.get("DOWNLOAD_FRAGMENTS", "4")
+USE_TOR   = str(os.environ.get("DOWNLOAD_TOR", "1")).strip().lower() in ("1", "true", "yes", "on")
+RETRY_DELAY = 7
 
 # === FILTER CHECK ===
 def read_filter_result():
@@ -69,28 +59,61 @@ def read_filter_result():
         return True  # Default to allowing download
 
 # === DOWNLOAD FUNCTION ===
-def download_video(link, out_path):
-    print(f"[*] Downloading from {link}")
-    run_command([
+def already_downloaded(group_num):
+    """A finished Vid/group_N.<ext> exists (not a .part / .fNNN.* / .temp.* leftover)."""
+    prefix = f"group_{group_num}."
+    for path in glob.glob(os.path.join(OUTPUT_DIR, prefix + "*")):
+        ext = os.path.basename(path)[len(prefix):]
+        if "." not in ext and ext not in ("part", "ytdl"):
+            return True
+    return False
+
+def download_cmd(link, out_path, group_num=None, proxy=None, duration=None):
+    cmd = [
         "yt-dlp",
-        "--proxy", "socks5://127.0.0.1:9050",
-        "--merge-output-format", "mp4",
+        "--continue", "--no-overwrites",
+        "--retries", "10", "--fragment-retries", "10", "--socket-timeout", "30",
+        "--concurrent-fragments", FRAGMENTS,
+        *download_sections.ytdlp_args(group_num, duration),
+        "--merge-output-format", "mp4", "--remux-video", "mp4",
         "-o", out_path,
-        link
-    ], "Video download failed", retries=3, delay=7, restart_ip_on_fail=True)
+    ]
+    if proxy:
+        cmd += ["--proxy", proxy]
+    return cmd + [link]
+
+def download_video(link, out_path, group_num=None, pool=None, duration=None):
+    """One video, retried on a fresh circuit; returns True on success."""
+    end = download_sections.section_end(group_num, duration)
+    print(f"[*] Downloading from {link}" + (f" (first {end}s, not resumable)" if end else ""), flush=True)
+    for attempt in range(1, RETRIES + 1):
+        if pool is None:
+            result = subprocess.run(download_cmd(link, out_path, group_num, duration=duration))
+        else:
+            with pool.slot() as slot:
+                if end:
+                    # ffmpeg does the section download and cannot use --proxy
+                    result = subprocess.run(["torsocks", *download_cmd(link, out_path, group_num, duration=duration)],
+                                            env=slot.torsocks_env())
+                else:
+                    result = subprocess.run(download_cmd(link, out_path, group_num, slot.proxy, duration))
+                if result.returncode != 0:
+                    slot.rotate()
+        if result.returncode == 0:
+            return True
+        print(f"[ERROR] Video download failed for {link} (Attempt {attempt}/{RETRIES})", flush=True)
+        if attempt < RETRIES:
+            time.sleep(RETRY_DELAY)
+    return False
 
 # === FILENAME PARSER ===
 def letter_to_index(letter):
     return ord(letter.lower()) - ord('a')
 
-# === MAIN EXECUTION ===
-def main():
-    if not read_filter_result():
-        print("[✘] Video flagged by filter (haram/music/face/etc). Skipping.")
-        sys.exit(0)
-
-    start_tor()
-
+# === JOB LIST ===
+def qualified_jobs():
+    """[(group_num, link, duration or None), ...] from qualified.txt, the Links and DURATION files."""
+    jobs = []
     with open(QUALIFY_PATH) as f:
         for line in f:
             if not line.strip():
@@ -124,10 +147,50 @@ def main():
                 print(f"[!] Not enough links in {links_file}")
                 continue
 
-            link = links[qualified_index]
-            out_path = os.path.join(OUTPUT_DIR, f"group_{group_num}.%(ext)s")
-            download_video(link, out_path)
+            jobs.append((group_num, links[qualified_index], download_sections.known_duration(file_name)))
+    return jobs
+
+# === MAIN EXECUTION ===
+def run_jobs(jobs, pool=None):
+    failed = []
+    with ThreadPoolExecutor(max_workers=JOBS) as ex:
+        futures = {
+            ex.submit(download_video, link, os.path.join(OUTPUT_DIR, f"group_{group_num}.%(ext)s"),
+                      group_num, pool, duration): group_num
+            for group_num, link, duration in jobs
+        }
+        for fut in as_completed(futures):
+            group_num = futures[fut]
+            if fut.result():
+                print(f"[✓] group_{group_num} downloaded.", flush=True)
+            else:
+                print(f"[✘] group_{group_num}: giving up.", flush=True)
+                failed.append(group_num)
+    return failed
+
+def main():
+    if not read_filter_result():
+        print("[✘] Video flagged by filter (haram/music/face/etc). Skipping.")
+        sys.exit(0)
 
+    jobs = qualified_jobs()
+    todo = [job for job in jobs if not already_downloaded(job[0])]
+    if len(todo) < len(jobs):
+        print(f"[*] {len(jobs) - len(todo)} video(s) already in {OUTPUT_DIR}/, skipping them.")
+    if not todo:
+        print("[✓] All downloads complete.")
+        return
+
+    print(f"[*] Downloading {len(todo)} video(s), {JOBS} at a time" + (" over Tor" if USE_TOR else ""))
+    if USE_TOR:
+        with TorPool(slots=JOBS) as pool:
+            failed = run_jobs(todo, pool)
+    else:
+        failed = run_jobs(todo)
+
+    if failed:
+        print(f"[✘] {len(failed)} download(s) failed: " + ", ".join(f"group_{g}" for g in sorted(failed, key=int)))
+        sys.exit(1)
     print("[✓] All downloads complete.")
 
 # === LAUNCH ===
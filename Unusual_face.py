@@ -1,46 +1,27 @@
 
 import os
-import time
-import string
-from multiprocessing import Pool, TimeoutError as MP_Timeout
-from google import genai
+import asyncio
 from google.genai import types
+from gemini_pool import GeminiPool
+from catalog import Catalog
 
 # === Configuration ===
 LINKS_DIR = "Unuusual_memory/Relevant_links"
 OUTPUT_DIR = "Unuusual_memory/FACE DETECTION"
 MAX_QUALIFIED_TXT = 33
-WAIT_BETWEEN_FILES = 70  # seconds
 TIMEOUT_PER_REQUEST = 600  # 10 minutes per link
 
-# === Load Gemini API keys ===
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5")
-]
-API_KEYS = [key for key in API_KEYS if key]
-if not API_KEYS:
-    raise ValueError("❌ No valid GEMINI_API keys found.")
-
 MODEL = "gemini-2.5-flash"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # === Helpers ===
-def check_video_wrapper(args):
-    key_index, link, product = args
-    for attempt in range(len(API_KEYS)):
-        real_index = (key_index + attempt) % len(API_KEYS)
-        try:
-            client = genai.Client(api_key=API_KEYS[real_index])
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part(file_data=types.FileData(file_uri=link, mime_type="video/*")),
-                        types.Part(text=f"""Watch the video carefully and create a detailed timestamp list showing exactly when a face appears and when it doesn’t.
+async def check_video(pool, link, product):
+    contents = [
+        types.Content(
+            role="user",
+            parts=[
+                types.Part(file_data=types.FileData(file_uri=link, mime_type="video/*")),
+                types.Part(text=f"""Watch the video carefully and create a detailed timestamp list showing exactly when a face appears and when it doesn’t.
 
 Follow this exact format:
 
@@ -54,60 +35,63 @@ Instructions:
 3. Clearly write Face or No face.  
 4. Whenever a face or no face appears, write the product name in parentheses after "Face" (example: (Samsung Galaxy S25)).
 """)
-                    ],
-                )
-            ]
-            config = types.GenerateContentConfig(response_mime_type="text/plain")
-            response = client.models.generate_content(model=MODEL, contents=contents, config=config)
-            result = response.text.strip()
-            print(f"✅ [{link}] => Success (API#{real_index + 1})", flush=True)
-            return (link, result)
-        except Exception as e:
-            print(f"🔁 Retry {attempt + 1}/{len(API_KEYS)} on {link} (API#{real_index + 1}) => Error: {e}", flush=True)
-            time.sleep(1)
-
-    print(f"❌ [{link}] => All retries failed.", flush=True)
-    return (link, "")
-
-def wait_between_files(seconds):
-    print(f"\n⏱️ Waiting {seconds} seconds before next file...", flush=True)
-    for i in range(seconds, 0, -1):
-        if i <= 5 or i % 10 == 0:
-            print(f"  ...{i}s", flush=True)
-        time.sleep(1)
-    print("✅ Wait complete.\n", flush=True)
+            ],
+        )
+    ]
+    config = types.GenerateContentConfig(response_mime_type="text/plain")
+    try:
+        # One budget for the link, across all of the pool's retries
+        text = await asyncio.wait_for(pool.generate_text(MODEL, contents, config, label=link),
+                                      TIMEOUT_PER_REQUEST)
+        print(f"✅ [{link}] => Success", flush=True)
+        return text.strip()
+    except asyncio.TimeoutError:
+        print(f"⏰ [{link}] => Timed out after {TIMEOUT_PER_REQUEST}s", flush=True)
+        return ""
+    except Exception as e:
+        print(f"❌ [{link}] => All retries failed: {e}", flush=True)
+        return ""
+
+def slot_names():
+    """{(group_num, url): "<n>(<slot>)_<slug>.txt"} for every relevant Links slot.
+
+    Relevant_links only lists the relevant URLs, so a line's position there is
+    not its Links slot; outputs are named like the RATING files instead, which
+    is what qualified.txt refers to.
+    """
+    catalog = Catalog()
+    catalog.sync()
+    return {(group_num, url): f"{group_num}({slot})_{slug}.txt"
+            for group_num, slot, slug, url, _ in catalog.relevant_candidates()}
 
 # === Process Each File ===
-def process_file(file_name):
+async def process_file(pool, file_name, names):
     full_path = os.path.join(LINKS_DIR, file_name)
     with open(full_path, "r") as f:
         links = [line.strip() for line in f if line.strip()]
 
     product = file_name.split("_", 1)[1].replace(".txt", "").replace("_", " ")
-    args_list = [(i % len(API_KEYS), link, product) for i, link in enumerate(links)]
-
-    print(f"🧪 Checking {len(links)} links with multiprocessing...", flush=True)
-    with Pool(processes=len(args_list)) as pool:
-        multiple_results = [pool.apply_async(check_video_wrapper, (args,)) for args in args_list]
-        for i, res in enumerate(multiple_results):
-            link = args_list[i][1]
-            try:
-                link, result = res.get(timeout=TIMEOUT_PER_REQUEST)
-                if result:
-                    output_filename = f"{file_name.split('_')[0]}({chr(97 + i)})_{file_name.split('_',1)[1]}"
-                    output_path = os.path.join(OUTPUT_DIR, output_filename)
-                    with open(output_path, "w") as f_out:
-                        f_out.write(result)
-                    print(f"✅ Saved result to: {output_path}", flush=True)
-                else:
-                    print(f"🚫 No result for {link}", flush=True)
-            except MP_Timeout:
-                print(f"⏱️ Timeout on: {link}", flush=True)
-            except Exception as e:
-                print(f"⚠️ Error processing {link}: {e}", flush=True)
+    group_num = int(file_name.split("_")[0])
+    for link in [l for l in links if (group_num, l) not in names]:
+        print(f"⚠️ {link} is not a relevant Links slot of group {group_num}, skipped", flush=True)
+    links = [l for l in links if (group_num, l) in names]
+
+    print(f"🧪 Checking {len(links)} links from {file_name}...", flush=True)
+    results = await asyncio.gather(*(check_video(pool, link, product) for link in links))
+    for link, result in zip(links, results):
+        try:
+            if result:
+                output_path = os.path.join(OUTPUT_DIR, names[(group_num, link)])
+                with open(output_path, "w") as f_out:
+                    f_out.write(result)
+                print(f"✅ Saved result to: {output_path}", flush=True)
+            else:
+                print(f"🚫 No result for {link}", flush=True)
+        except Exception as e:
+            print(f"⚠️ Error processing {link}: {e}", flush=True)
 
 # === Main Script ===
-def main():
+async def main():
     print("🚀 Starting Gemini Face Detection Timestamping...\n", flush=True)
     txt_files = sorted(
         [
@@ -115,23 +99,24 @@ def main():
             if f.endswith(".txt") and f[0].isdigit()
         ],
         key=lambda x: int(x.split("_")[0])
+    )[:MAX_QUALIFIED_TXT]
+
+    # Files run concurrently; the pool paces requests to each key's quota
+    pool = GeminiPool()
+    names = slot_names()
+    outcomes = await asyncio.gather(
+        *(process_file(pool, file_name, names) for file_name in txt_files),
+        return_exceptions=True
     )
 
     processed_count = 0
-    for index, file_name in enumerate(txt_files):
-        if processed_count >= MAX_QUALIFIED_TXT:
-            break
-
-        print(f"\n📂 File [{index + 1}/{len(txt_files)}]: {file_name}", flush=True)
-        try:
-            process_file(file_name)
+    for file_name, outcome in zip(txt_files, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"❌ Unexpected error in {file_name}: {outcome}", flush=True)
+        else:
             processed_count += 1
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}", flush=True)
-
-        wait_between_files(WAIT_BETWEEN_FILES)
 
     print(f"\n🎉 Finished! Total files processed: {processed_count}", flush=True)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -26,7 +26,17 @@ Key Features / Differences from your original:
     * If ANY frame in that second has a face => that second = 'face'.
     * Saves timeline text file; skips video if timeline already exists (unless SKIP_EXISTING=0).
     * Allows FRAME_STRIDE to speed up detection (e.g., analyze every 2nd or 3rd frame).
+    * Stops inspecting a second at its first face; checks only a few evenly
+      spaced frames of no_face stretches and densifies around face/no_face
+      transitions (FACE_SAMPLES_PER_SEC=0 => exhaustive, early exit only).
     * Clean error handling and verbose logging controlled by VERBOSE flag.
+    * Videos (and optionally time ranges of long videos) are spread over a
+      process pool (face_pool.py); shard results are merged per video.
+    * Frames are decoded by one ffmpeg pipe per shard (frame_source.py):
+      downscaled RGB read into a reused buffer, no per-frame cv2 conversion.
+    * Per-frame detection scores are cached by video content hash + detector
+      settings (face_cache.py); a re-run, also at another MIN_CONFIDENCE
+      (>= FACE_SCORE_FLOOR), re-derives the timeline without decoding the video.
 
 Environment Variables (all optional):
     VIDEO_DIR            (default: Final_Videos)
@@ -37,22 +47,31 @@ Environment Variables (all optional):
     SKIP_EXISTING        (default: 1)     # 1 => do not re-create existing timeline
     VERBOSE              (default: 1)     # 1 => print progress
     MODEL_SELECTION      (default: 0)     # mediapipe face model (0=short-range,1=full-range)
+    FACE_SAMPLES_PER_SEC (default: 3)     # frames checked per no_face second; 0 => every frame
+    FACE_WORKERS         (default: CPU count) # worker processes, one FaceDetection each
+    FACE_SHARD_SECONDS   (default: 0)     # also split long videos into N-second ranges
+    FACE_DETECT_WIDTH    (default: 480)   # width frames are decoded at for detection
+    FACE_CACHE           (default: 1)     # reuse per-frame scores keyed by video hash + settings
+    FACE_SCORE_FLOOR     (default: 0.3)   # lowest MIN_CONFIDENCE a cached scan can be re-derived at
 
 Return Codes:
     0 on success (even if some videos failed; see per-video summary)
     Non-zero exit if VIDEO_DIR is missing.
 
 Dependencies:
-    pip install mediapipe opencv-python
-    (ffmpeg not required for this script)
+    pip install mediapipe numpy
+    ffmpeg / ffprobe on PATH
 
 """
 
 import os
 import sys
 import math
-import cv2
-import mediapipe as mp
+import numpy as np
+import face_pool
+import face_cache
+import frame_source
+from array import array
 
 # ---------------- ENV ----------------
 def _truthy(x):
@@ -66,6 +85,12 @@ FRAME_STRIDE      = int(os.environ.get("FRAME_STRIDE", "1"))
 SKIP_EXISTING     = _truthy(os.environ.get("SKIP_EXISTING", "1"))
 VERBOSE           = _truthy(os.environ.get("VERBOSE", "1"))
 MODEL_SELECTION   = int(os.environ.get("MODEL_SELECTION", "0"))
+SAMPLES_PER_SEC   = int(os.environ.get("FACE_SAMPLES_PER_SEC", "3"))
+
+# A scan that fills the face cache must hold for any threshold >= the score
+# floor: sampling is decided at the floor and no second stops at its first face.
+DECIDE_AT         = face_cache.detector_floor(MIN_CONF)
+SCORE_ALL         = face_cache.CACHE_ENABLED
 
 os.makedirs(TIMELINE_DIR, exist_ok=True)
 
@@ -77,46 +102,35 @@ def err(msg: str):
     print(msg, file=sys.stderr, flush=True)
 
 # ---------------- FACE DETECTOR ----------------
-mp_face = mp.solutions.face_detection
-
-def detect_faces_bgr(image_bgr, detector):
+def face_score(image_rgb, detector):
     """
-    Run MediaPipe face detector on a single BGR frame.
-    Returns number of detections meeting MIN_CONF.
+    Run MediaPipe face detector on a single RGB frame (straight from the
+    frame_source pipe, no colour conversion needed).
+    Returns the best detection score (0.0 if none); a face is >= MIN_CONF.
     """
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    image_rgb.flags.writeable = False
     results = detector.process(image_rgb)
-    count = 0
+    best = 0.0
     if results.detections:
         for det in results.detections:
-            if det.score and det.score[0] is not None and det.score[0] >= MIN_CONF:
-                count += 1
-    return count
+            if det.score and det.score[0] is not None:
+                best = max(best, det.score[0])
+    return best
 
 # ---------------- PER-VIDEO ANALYSIS ----------------
-def analyze_video(video_path: str, timeline_path: str) -> bool:
-    """
-    Analyze a single video, produce a per-second timeline file.
-    A second is 'face' if ANY frame within that second has a face.
-    """
-    vlog(f"\n[video] {video_path}")
-
-    if SKIP_EXISTING and os.path.isfile(timeline_path):
-        vlog(f"[skip] timeline exists: {timeline_path}")
-        return True
-
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        err(f"[!] cannot open video: {video_path}")
-        return False
+def probe_video(video_path: str):
+    """fps / duration / analysis limit for one video, or None if it cannot be opened."""
+    try:
+        meta = frame_source.probe(video_path)
+    except Exception as e:
+        err(f"[!] cannot open video: {video_path} ({e})")
+        return None
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = meta["fps"]
     if not fps or fps <= 0:
         fps = 30.0
         vlog(f"[warn] invalid FPS -> fallback to {fps:.3f}")
 
-    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    frame_count = meta["frames"]
     duration_sec_est = frame_count / fps if frame_count else None
 
     if duration_sec_est is not None:
@@ -130,70 +144,160 @@ def analyze_video(video_path: str, timeline_path: str) -> bool:
 
     # If max_seconds is 0 (meaning both unknown duration and MAX_ANALYZE_SEC=0), treat as unlimited
     unlimited = (max_seconds == 0)
-    max_seconds_int = int(math.floor(max_seconds)) if not unlimited else float('inf')
+    max_seconds_int = int(math.floor(max_seconds)) if not unlimited else None
 
     vlog(f"  fps={fps:.3f} frames={frame_count} dur_est={duration_sec_est} analyze<= {'ALL' if unlimited else max_seconds_int}")
-
+    return {
+        "fps": fps,
+        "duration_sec_est": duration_sec_est,
+        "max_seconds_int": max_seconds_int,
+        "unlimited": unlimited,
+        "meta": meta,
+    }
+
+def second_frames(sec: int, fps: float):
+    """[first, end) frame indices whose int(frame / fps) == sec."""
+    def first_of(n):
+        f = int(math.ceil(n * fps))
+        while f > 0 and int((f - 1) / fps) >= n:
+            f -= 1
+        while int(f / fps) < n:
+            f += 1
+        return f
+    return first_of(sec), first_of(sec + 1)
+
+def pick_samples(candidates, n: int):
+    """n evenly spaced entries of candidates (all of them if n <= 0 or too few)."""
+    if n <= 0 or len(candidates) <= n:
+        return list(candidates)
+    if n == 1:
+        return [candidates[len(candidates) // 2]]
+    return sorted({candidates[round(i * (len(candidates) - 1) / (n - 1))] for i in range(n)})
+
+def scan_seconds(video_path: str, start_sec: int, end_sec, fps: float, meta=None):
+    """
+    Per-second face flags for seconds [start_sec, end_sec) (end_sec None = to EOF).
+    A second is True if ANY inspected frame within it has a face.
+    Returns (sec_results, frames_read, detector_calls, frames, scores), the last
+    two being every inspected frame and its quantized best score (face_cache).
+    Runs inside a face_pool worker.
+
+    Frames come from one ffmpeg pipe (frame_source.FrameSource): downscaled
+    RGB at a constant `fps`, so pipe frame k is video frame first+k.
+
+    Adaptive sampling:
+      * a second stops being inspected as soon as one frame has a face; the
+        rest of its frames are only read off the pipe (no detect). While
+        caching (SCORE_ALL) every checked frame is scored instead, and the
+        sampling below treats a second as busy from DECIDE_AT (the floor), so
+        the stored scores re-derive any MIN_CONFIDENCE >= the floor
+      * after a no_face second, only SAMPLES_PER_SEC evenly spaced frames are checked
+      * near transitions every (strided) frame is checked: the second after a
+        face second, the first second of a shard, and a sampled no_face second
+        that is followed by a face second. The pipe cannot seek back, so the
+        unchecked frames of the last sampled second are kept in a small
+        preallocated stash (one second deep).
+    """
+    first, _ = second_frames(start_sec, fps)
+    duration = None
+    if end_sec is not None:
+        stop, _ = second_frames(end_sec, fps)
+        duration = (stop - first + 0.5) / fps
+    try:
+        src = frame_source.FrameSource(video_path, fps=fps, start=first / fps,
+                                       duration=duration, info=meta)
+    except Exception as e:
+        err(f"[!] cannot open video: {video_path} ({e})")
+        return {}, 0, 0, array("I"), array("H")
+
+    detector = face_pool.detector()
+    calls = 0
+    frames, scores = array("I"), array("H")
+
+    def inspect(f, image):
+        nonlocal calls
+        calls += 1
+        score = face_score(image, detector)
+        frames.append(f)
+        scores.append(face_cache.quantize(score))
+        return score
+
+    # Stash for the unchecked frames of a sampled second: two one-second slots
+    # (current / previous), allocated once per scan.
+    per_sec = int(math.ceil(fps)) + 1
+    stash = np.empty((2, per_sec) + src.frame.shape, np.uint8)
+    stash_frames = [[], []]
+    cur = 0
+
+    def candidates_of(f0, f1):
+        # Frame stride: only these frames are ever inspected
+        return [f for f in range(f0, f1) if FRAME_STRIDE <= 1 or f % FRAME_STRIDE == 0]
+
+    def run_second(f0, f1, check, keep):
+        """
+        Read frames f0..f1-1 off the pipe; detect on `check` until a hit
+        (all of them if SCORE_ALL), stash `keep`. Returns (found, busy, read,
+        eof): a face at MIN_CONF / a score at DECIDE_AT.
+        """
+        best, read = 0.0, 0
+        slot = stash_frames[cur]
+        slot.clear()
+        for f in range(f0, f1):
+            if not src.read():
+                return best >= MIN_CONF, best >= DECIDE_AT, read, True
+            read += 1
+            if f in keep and len(slot) < per_sec:
+                np.copyto(stash[cur, len(slot)], src.frame)
+                slot.append(f)
+            if (best >= MIN_CONF and not SCORE_ALL) or f not in check:
+                continue
+            best = max(best, inspect(f, src.frame))
+        return best >= MIN_CONF, best >= DECIDE_AT, read, False
+
+    # Time from frame index (the pipe is constant-rate)
+    sec = start_sec
     sec_results = {}
-    current_sec_index = -1
-    has_face_in_current_sec = False
-    grabbed_any = False
-
-    with mp_face.FaceDetection(model_selection=MODEL_SELECTION,
-                               min_detection_confidence=MIN_CONF) as detector:
-        frame_index = 0
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                # Save last second result if any
-                if current_sec_index != -1:
-                    sec_results[current_sec_index] = has_face_in_current_sec
-                break
-
-            grabbed_any = True
-
-            # Time from frame index (more reliable than CAP_PROP_POS_MSEC for some codecs)
-            t_sec = frame_index / fps
-            cur_sec = int(t_sec)
-
-            if not unlimited and cur_sec > max_seconds_int:
-                # Save the last second before breaking
-                if current_sec_index != -1:
-                    sec_results[current_sec_index] = has_face_in_current_sec
-                break
-
-            if cur_sec != current_sec_index:
-                # New second encountered: store previous second result
-                if current_sec_index != -1:
-                    sec_results[current_sec_index] = has_face_in_current_sec
-                current_sec_index = cur_sec
-                has_face_in_current_sec = False  # reset for new second
-
-            # Frame stride: skip detection if not the selected frame
-            if FRAME_STRIDE <= 1 or (frame_index % FRAME_STRIDE == 0):
-                n_faces = detect_faces_bgr(frame, detector)
-                if n_faces > 0:
-                    has_face_in_current_sec = True
-                    # Optimization: if we *already* know this second has a face and we don't
-                    # need partial counts, we could skip the rest of the frames in that second.
-                    # (Optional optimization; not implemented to keep code simple.)
-
-            frame_index += 1
-
-    cap.release()
-
-    if not grabbed_any:
-        err(f"[!] no frames read: {video_path}")
-        return False
-
+    sampled_only = None    # previous second if decided from samples alone (and stashed)
+    frames_read = 0
+    prev = None            # previous second's result (None = shard boundary)
+    while end_sec is None or sec < end_sec:
+        f0, f1 = second_frames(sec, fps)
+        cands = candidates_of(f0, f1)
+        dense = SAMPLES_PER_SEC <= 0 or prev is not False
+        check = set(cands) if dense else set(pick_samples(cands, SAMPLES_PER_SEC))
+        keep = set() if dense else set(cands) - check
+
+        found, busy, read, eof = run_second(f0, f1, check, keep)
+        frames_read += read
+        if not read:
+            break
+        sec_results[sec] = found
+
+        if busy and sampled_only == sec - 1:
+            # no_face -> face transition: re-check the stashed frames behind us
+            back = cur ^ 1
+            for i, f in enumerate(stash_frames[back]):
+                if inspect(f, stash[back, i]) >= MIN_CONF:
+                    sec_results[sec - 1] = True
+                    if not SCORE_ALL:
+                        break
+        sampled_only = sec if (not busy and keep) else None
+
+        if eof:
+            break
+        prev = busy
+        cur ^= 1
+        sec += 1
+
+    src.close()
+    return sec_results, frames_read, calls, frames, scores
+
+def write_timeline(timeline_path: str, sec_results: dict, info: dict) -> bool:
     # Determine final range to write
-    if unlimited:
-        if sec_results:
-            max_sec_written = max(sec_results.keys())
-        else:
-            max_sec_written = -1
+    if info["unlimited"]:
+        max_sec_written = max(sec_results.keys()) if sec_results else -1
     else:
-        max_sec_written = int(math.floor(max_seconds))
+        max_sec_written = info["max_seconds_int"]
 
     # Fill missing seconds (if any) with no_face (False)
     timeline = []
@@ -204,9 +308,9 @@ def analyze_video(video_path: str, timeline_path: str) -> bool:
     try:
         with open(timeline_path, "w", encoding="utf-8") as f:
             f.write(f"total_seconds_analyzed: {len(timeline)}\n")
-            if duration_sec_est is not None:
-                f.write(f"video_duration_est: {int(duration_sec_est)}\n")
-            if unlimited:
+            if info["duration_sec_est"] is not None:
+                f.write(f"video_duration_est: {int(info['duration_sec_est'])}\n")
+            if info["unlimited"]:
                 # If unlimited & unknown, reflect what we actually processed
                 f.write(f"seconds_truncated_to: {max_sec_written if max_sec_written >= 0 else 0}\n")
             else:
@@ -220,6 +324,118 @@ def analyze_video(video_path: str, timeline_path: str) -> bool:
         err(f"[write] fail {timeline_path}: {e}")
         return False
 
+def video_jobs(video_path: str, info: dict):
+    """(video_path, start, end, fps, probe) shard jobs covering the analysed range."""
+    n_seconds = None if info["unlimited"] else info["max_seconds_int"] + 1
+    return [(video_path, start, end, info["fps"], info["meta"])
+            for start, end in face_pool.shard_ranges(n_seconds)]
+
+def analyze_video(video_path: str, timeline_path: str) -> bool:
+    """
+    Analyze a single video, produce a per-second timeline file.
+    A second is 'face' if ANY frame within that second has a face.
+    """
+    return analyze_videos([(video_path, timeline_path)], workers=1)[0] == 1
+
+def cache_settings():
+    """Detector settings a cached score set is only valid for (see face_cache.py)."""
+    return {
+        "script": "Unusual_faces",
+        "model": MODEL_SELECTION,
+        "stride": FRAME_STRIDE,
+        "max_sec": MAX_ANALYZE_SEC,
+        "samples": SAMPLES_PER_SEC,
+        "width": frame_source.DETECT_WIDTH,
+        "floor": face_cache.detector_floor(MIN_CONF),
+    }
+
+def analyze_videos(pairs, workers=face_pool.WORKERS):
+    """
+    Analyze [(video_path, timeline_path), ...] across a process pool (one
+    FaceDetection per worker); shards of one video are merged before writing.
+    Videos already scanned with the same settings come from the face cache,
+    re-thresholded at MIN_CONFIDENCE.
+    Returns (ok_count, fail_count).
+    """
+    cache = face_cache.default_cache()
+    settings = cache_settings()
+    floor = settings["floor"]
+
+    infos, jobs = {}, []
+    ok_total = fail_total = 0
+    for video_path, timeline_path in pairs:
+        vlog(f"\n[video] {video_path}")
+        if SKIP_EXISTING and os.path.isfile(timeline_path):
+            vlog(f"[skip] timeline exists: {timeline_path}")
+            ok_total += 1
+            continue
+
+        vhash = None
+        if cache is not None:
+            try:
+                vhash = face_cache.content_hash(video_path)
+            except OSError as e:
+                err(f"[!] cannot read video: {video_path} ({e})")
+                fail_total += 1
+                continue
+            entry = cache.get(vhash, settings, MIN_CONF)
+            if entry is not None:
+                info = entry["info"]
+                vlog(f"[cache] hit {vhash[:12]}: {len(entry['frames'])} scored frame(s), threshold {MIN_CONF}")
+                sec_results = face_cache.seconds_from_scores(entry["frames"], entry["scores"], info["fps"], MIN_CONF)
+                if write_timeline(timeline_path, sec_results, info):
+                    ok_total += 1
+                else:
+                    fail_total += 1
+                continue
+
+        info = probe_video(video_path)
+        if info is None:
+            fail_total += 1
+            continue
+        info["timeline_path"] = timeline_path
+        info["vhash"] = vhash
+        info["parts"] = []
+        info["frames"], info["scores"] = array("I"), array("H")
+        info["frames_read"] = 0
+        info["calls"] = 0
+        info["pending"] = len(video_jobs(video_path, info))
+        infos[video_path] = info
+        jobs.extend(video_jobs(video_path, info))
+
+    vlog(f"\n[pool] {len(jobs)} job(s) for {len(infos)} video(s) on {min(workers, max(1, len(jobs)))} worker(s)")
+
+    for job, result in face_pool.run_jobs(scan_seconds, jobs, MODEL_SELECTION, floor, workers):
+        info = infos[job[0]]
+        if result is not None:
+            sec_results, frames_read, calls, frames, scores = result
+            info["parts"].append(sec_results)
+            info["frames_read"] += frames_read
+            info["calls"] += calls
+            info["frames"].extend(frames)
+            info["scores"].extend(scores)
+        else:
+            info["failed_shard"] = True
+        info["pending"] -= 1
+        if info["pending"]:
+            continue
+
+        vlog(f"[detect] {job[0]}: {info['calls']} detector call(s) for {info['frames_read']} frame(s)")
+        if not info["frames_read"]:
+            err(f"[!] no frames read: {job[0]}")
+            fail_total += 1
+            continue
+        if write_timeline(info["timeline_path"], face_pool.merge_seconds(info["parts"]), info):
+            ok_total += 1
+        else:
+            fail_total += 1
+        if cache is not None and not info.get("failed_shard"):
+            keep = ("fps", "duration_sec_est", "max_seconds_int", "unlimited")
+            cache.put(info["vhash"], settings, info["frames"], info["scores"],
+                      {k: info[k] for k in keep}, floor)
+
+    return ok_total, fail_total
+
 # ---------------- SCAN VIDEO DIR ----------------
 def main():
     print("=== face_timeline.py ===")
@@ -228,9 +444,13 @@ def main():
     print(f"MAX_ANALYZE_SEC    = {MAX_ANALYZE_SEC}")
     print(f"MIN_CONF           = {MIN_CONF}")
     print(f"FRAME_STRIDE       = {FRAME_STRIDE}")
+    print(f"SAMPLES_PER_SEC    = {SAMPLES_PER_SEC}")
     print(f"MODEL_SELECTION    = {MODEL_SELECTION}")
     print(f"SKIP_EXISTING      = {SKIP_EXISTING}")
     print(f"VERBOSE            = {VERBOSE}")
+    print(f"FACE_WORKERS       = {face_pool.WORKERS}")
+    print(f"FACE_SHARD_SECONDS = {face_pool.SHARD_SECONDS}")
+    print(f"FACE_CACHE         = {face_cache.CACHE_ENABLED}")
 
     if not os.path.isdir(VIDEO_DIR):
         err(f"❌ VIDEO_DIR not found: {VIDEO_DIR}")
@@ -243,17 +463,13 @@ def main():
         err("[!] No video files found.")
         return
 
-    ok_total = 0
-    fail_total = 0
-
+    pairs = []
     for vid in sorted(videos):
         in_path = os.path.join(VIDEO_DIR, vid)
         base, _ = os.path.splitext(vid)
-        out_path = os.path.join(TIMELINE_DIR, base + ".txt")
-        if analyze_video(in_path, out_path):
-            ok_total += 1
-        else:
-            fail_total += 1
+        pairs.append((in_path, os.path.join(TIMELINE_DIR, base + ".txt")))
+
+    ok_total, fail_total = analyze_videos(pairs)
 
     print("\n=== Summary ===")
     print(f"Timelines OK : {ok_total}")
@@ -9,6 +9,12 @@ Analyze each video in VIDEO_DIR (default: Vid/) and determine for every second
 - Uses MediaPipe Face Detection with MIN_CONFIDENCE (default 0.5)
 - Stops at MAX_ANALYZE_SECONDS (default 180)
 - Outputs timeline text files in TIMELINE_DIR (default: Timeline/)
+- Videos / time ranges are spread over a process pool (face_pool.py:
+  FACE_WORKERS, FACE_SHARD_SECONDS), one FaceDetection per worker
+- Frames come from an ffmpeg pipe (frame_source.py, FACE_DETECT_WIDTH):
+  downscaled RGB in a reused buffer, no cv2 decode / colour conversion
+- Per-frame scores are cached by video content hash + settings (face_cache.py:
+  FACE_CACHE, FACE_SCORE_FLOOR); re-runs, also at another MIN_CONFIDENCE, skip decoding
 
 Timeline format:
     total_seconds_analyzed: <int>
@@ -24,8 +30,10 @@ Timeline format:
 import os
 import sys
 import math
-import cv2
-import mediapipe as mp
+import face_pool
+import face_cache
+import frame_source
+from array import array
 
 # ---------------- ENV CONFIG ----------------
 def _truthy(x): return str(x).strip().lower() in ("1","true","yes","on")
@@ -47,39 +55,30 @@ def err(msg):
     print(msg, file=sys.stderr, flush=True)
 
 # ---------------- FACE DETECTOR ----------------
-mp_face = mp.solutions.face_detection
-
-def detect_faces_bgr(image_bgr, detector):
-    """Run mediapipe face detector on a single BGR frame."""
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    image_rgb.flags.writeable = False
+def face_score(image_rgb, detector):
+    """Best mediapipe face score on a single RGB frame (0.0 if none); a face is >= MIN_CONF."""
     results = detector.process(image_rgb)
-    count = 0
+    best = 0.0
     if results.detections:
         for det in results.detections:
-            if det.score and det.score[0] >= MIN_CONF:
-                count += 1
-    return count
+            if det.score:
+                best = max(best, det.score[0])
+    return best
 
 # ---------------- PER-VIDEO ANALYSIS ----------------
-def analyze_video(video_path, timeline_path):
-    vlog(f"\n[video] {video_path}")
-
-    if SKIP_EXISTING and os.path.isfile(timeline_path):
-        vlog(f"[skip] timeline exists: {timeline_path}")
-        return True
-
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        err(f"[!] cannot open video: {video_path}")
-        return False
+def probe_video(video_path):
+    try:
+        meta = frame_source.probe(video_path)
+    except Exception as e:
+        err(f"[!] cannot open video: {video_path} ({e})")
+        return None
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
+    fps = meta["fps"]
     if not fps or fps <= 0:
         fps = 30.0
         vlog(f"[warn] invalid FPS -> fallback to {fps}")
 
-    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+    frame_count = meta["frames"]
     duration_sec_est = None
     if frame_count and frame_count > 0:
         duration_sec_est = frame_count / fps
@@ -92,51 +91,134 @@ def analyze_video(video_path, timeline_path):
 
     max_seconds_int = int(math.floor(max_seconds))
     vlog(f"  fps={fps:.3f} frames={frame_count} dur_est={duration_sec_est} analyze<= {max_seconds_int}s")
-
-    sec_results = {}  # second_index -> bool face
-    for s in range(0, max_seconds_int + 1):
-        sec_results[s] = False  # initialize all as no_face
-
-    with mp_face.FaceDetection(model_selection=0, min_detection_confidence=MIN_CONF) as detector:
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                break
-
-            pos_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
-            if pos_msec is None:
-                pos_frames = cap.get(cv2.CAP_PROP_POS_FRAMES)
-                pos_msec = (pos_frames / fps) * 1000.0
-
-            cur_sec = int(pos_msec / 1000.0)
-
-            # Stop if beyond analysis limit
-            if cur_sec > max_seconds_int:
-                break
-
-            # Detect faces in every frame
-            n_faces = detect_faces_bgr(frame, detector)
-            if n_faces > 0:
-                sec_results[cur_sec] = True
-
-        cap.release()
-
-    # Write timeline file
+    return {"fps": fps, "duration_sec_est": duration_sec_est, "max_seconds_int": max_seconds_int,
+            "meta": meta}
+
+def scan_seconds(video_path, start_sec, end_sec, fps, meta=None):
+    """
+    Seconds in [start_sec, end_sec) that contain a face (runs in a face_pool worker).
+    Returns (sec_results, frames, scores): inspected frames and their quantized scores.
+    """
+    # Constant-rate pipe: pipe frame k is video frame first + k
+    first = int(math.ceil(start_sec * fps))
+    frames, scores = array("I"), array("H")
+    try:
+        src = frame_source.FrameSource(video_path, fps=fps, start=first / fps,
+                                       duration=end_sec - first / fps, info=meta)
+    except Exception as e:
+        err(f"[!] cannot open video: {video_path} ({e})")
+        return {}, frames, scores
+
+    detector = face_pool.detector()
+    sec_results = {}
+    while src.read():
+        f = first + src.index
+        cur_sec = int(f / fps)
+
+        # Stop if beyond this shard / the analysis limit
+        if cur_sec >= end_sec:
+            break
+        if cur_sec < start_sec or (sec_results.get(cur_sec) and not face_cache.CACHE_ENABLED):
+            continue
+
+        # Detect faces in every frame (until the second has one; all of them
+        # while caching, so the scores hold for any threshold >= the floor)
+        score = face_score(src.frame, detector)
+        frames.append(f)
+        scores.append(face_cache.quantize(score))
+        if score >= MIN_CONF:
+            sec_results[cur_sec] = True
+
+    src.close()
+    return sec_results, frames, scores
+
+def write_timeline(timeline_path, sec_results, info):
+    max_seconds_int = info["max_seconds_int"]
     try:
         with open(timeline_path, "w", encoding="utf-8") as f:
-            f.write(f"total_seconds_analyzed: {len(sec_results)}\n")
-            if duration_sec_est is not None:
-                f.write(f"video_duration_est: {int(duration_sec_est)}\n")
+            f.write(f"total_seconds_analyzed: {max_seconds_int + 1}\n")
+            if info["duration_sec_est"] is not None:
+                f.write(f"video_duration_est: {int(info['duration_sec_est'])}\n")
             f.write(f"seconds_truncated_to: {max_seconds_int}\n")
             f.write("---\n")
             for s in range(0, max_seconds_int + 1):
-                f.write(f"{s}: {'face' if sec_results[s] else 'no_face'}\n")
+                f.write(f"{s}: {'face' if sec_results.get(s) else 'no_face'}\n")
         vlog(f"[write] {timeline_path}")
         return True
     except Exception as e:
         err(f"[write] fail {timeline_path}: {e}")
         return False
 
+def analyze_video(video_path, timeline_path):
+    return analyze_videos([(video_path, timeline_path)], workers=1)[0] == 1
+
+def cache_settings():
+    return {
+        "script": "Unusual_faces2",
+        "model": 0,
+        "max_sec": MAX_ANALYZE_SEC,
+        "width": frame_source.DETECT_WIDTH,
+        "floor": face_cache.detector_floor(MIN_CONF),
+    }
+
+def analyze_videos(pairs, workers=face_pool.WORKERS):
+    """Shard [(video_path, timeline_path), ...] over the face pool; returns (ok, failed)."""
+    cache = face_cache.default_cache()
+    settings = cache_settings()
+
+    infos, jobs = {}, []
+    ok_total = fail_total = 0
+    for video_path, timeline_path in pairs:
+        vlog(f"\n[video] {video_path}")
+        if SKIP_EXISTING and os.path.isfile(timeline_path):
+            vlog(f"[skip] timeline exists: {timeline_path}")
+            ok_total += 1
+            continue
+
+        vhash = face_cache.content_hash(video_path) if cache is not None and os.path.isfile(video_path) else None
+        entry = cache.get(vhash, settings, MIN_CONF) if vhash else None
+        if entry is not None:
+            info = entry["info"]
+            vlog(f"[cache] hit {vhash[:12]}: re-thresholded at MIN_CONFIDENCE={MIN_CONF}")
+            sec_results = face_cache.seconds_from_scores(entry["frames"], entry["scores"], info["fps"], MIN_CONF)
+            if write_timeline(timeline_path, sec_results, info):
+                ok_total += 1
+            else:
+                fail_total += 1
+            continue
+
+        info = probe_video(video_path)
+        if info is None:
+            fail_total += 1
+            continue
+        shards = face_pool.shard_ranges(info["max_seconds_int"] + 1)
+        info.update(timeline_path=timeline_path, vhash=vhash, parts=[], pending=len(shards),
+                    frames=array("I"), scores=array("H"), complete=True)
+        infos[video_path] = info
+        jobs.extend((video_path, start, end, info["fps"], info["meta"]) for start, end in shards)
+
+    for job, result in face_pool.run_jobs(scan_seconds, jobs, 0, settings["floor"], workers):
+        info = infos[job[0]]
+        if result is not None:
+            sec_results, frames, scores = result
+            info["parts"].append(sec_results)
+            info["frames"].extend(frames)
+            info["scores"].extend(scores)
+        else:
+            info["complete"] = False
+        info["pending"] -= 1
+        if info["pending"]:
+            continue
+        if write_timeline(info["timeline_path"], face_pool.merge_seconds(info["parts"]), info):
+            ok_total += 1
+        else:
+            fail_total += 1
+        if info["vhash"] and info["complete"] and info["frames"]:
+            keep = ("fps", "duration_sec_est", "max_seconds_int")
+            cache.put(info["vhash"], settings, info["frames"], info["scores"],
+                      {k: info[k] for k in keep}, settings["floor"])
+    return ok_total, fail_total
+
 # ---------------- SCAN VIDEO DIR ----------------
 def main():
     print("=== face_timeline.py ===")
@@ -146,6 +228,7 @@ def main():
     print(f"MIN_CONF        = {MIN_CONF}")
     print(f"SKIP_EXISTING   = {SKIP_EXISTING}")
     print(f"VERBOSE         = {VERBOSE}")
+    print(f"FACE_WORKERS    = {face_pool.WORKERS}")
 
     if not os.path.isdir(VIDEO_DIR):
         err(f"❌ VIDEO_DIR not found: {VIDEO_DIR}")
@@ -158,15 +241,13 @@ def main():
         err("[!] No video files found.")
         return
 
-    ok_total = fail_total = 0
+    pairs = []
     for vid in sorted(videos):
         in_path = os.path.join(VIDEO_DIR, vid)
         base, _ = os.path.splitext(vid)
-        out_path = os.path.join(TIMELINE_DIR, base + ".txt")
-        if analyze_video(in_path, out_path):
-            ok_total += 1
-        else:
-            fail_total += 1
+        pairs.append((in_path, os.path.join(TIMELINE_DIR, base + ".txt")))
+
+    ok_total, fail_total = analyze_videos(pairs)
 
     print("\n=== Summary ===")
     print(f"Timelines OK : {ok_total}")
@@ -4,6 +4,7 @@ import time
 import subprocess
 from datetime import datetime
 from google import genai
+from gemini_cache import cached_generate_text
 
 INPUT_DIR = "Unuusual_memory/SCRIPT"
 OUTPUT_FILE = "Unuusual_memory/GROUP_GDG/group_gdg.txt"
@@ -48,11 +49,7 @@ def call_genai_with_retries(product_name):
         key = API_KEYS[attempt % len(API_KEYS)]
         client = genai.Client(api_key=key)
         try:
-            resp = client.models.generate_content(
-                model=MODEL,
-                contents=prompt
-            )
-            name = resp.text.strip()
+            name = cached_generate_text(client, MODEL, prompt).strip()
             if name:
                 return name, attempt // len(API_KEYS) + 1
         except Exception as e:
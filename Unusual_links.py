@@ -1,8 +1,9 @@
 
 import os
 import re
-import requests
 import subprocess
+from youtube_api import SearchService, QuotaExceeded, DB_PATH
+from catalog import Catalog, CATALOG_PATH
 
 # 🔐 Load your YouTube Data API key from environment variable
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API")  # GitHub Secret
@@ -38,34 +39,18 @@ def sanitize_filename(name):
     name = re.sub(r"\s+", "_", name)        # Replace spaces with underscores
     return name.strip("_")
 
-def search_youtube(query, max_results=MAX_RESULTS):
-    """Search YouTube videos for a given query using the API."""
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "q": query,
-        "maxResults": max_results,
-        "type": "video",
-        "videoLicense": "creativeCommon",
-        "key": YOUTUBE_API_KEY
-    }
-
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    results = response.json()
-
-    video_links = [
-        f"https://www.youtube.com/watch?v={item['id']['videoId']}"
-        for item in results.get("items", [])
-    ]
-    return video_links
-
-def save_links_to_file(index, product, links):
+def search_youtube(search, query, max_results=MAX_RESULTS):
+    """Search YouTube videos for a given query (cached, quota-checked)."""
+    video_ids = search.search(query, max_results=max_results, video_license="creativeCommon")
+    return [f"https://www.youtube.com/watch?v={vid}" for vid in video_ids]
+
+def save_links_to_file(catalog, index, product, links):
     """Save YouTube links to a file named with index and sanitized product name."""
     safe_name = sanitize_filename(product)
     filename = os.path.join(OUTPUT_DIR, f"{index}_{safe_name}.txt")
     with open(filename, "w", encoding="utf-8") as f:
         f.write("\n".join(links))
+    catalog.record_product(index, product, links, os.path.basename(filename))
     print(f"✅ Saved to {filename}")
 
 def commit_saved_links():
@@ -73,7 +58,7 @@ def commit_saved_links():
     try:
         subprocess.run(["git", "config", "--global", "user.name", "bot"], check=True)
         subprocess.run(["git", "config", "--global", "user.email", "bot@example.com"], check=True)
-        subprocess.run(["git", "add", OUTPUT_DIR], check=True)
+        subprocess.run(["git", "add", OUTPUT_DIR, DB_PATH, CATALOG_PATH], check=True)
         subprocess.run(["git", "commit", "-m", "🔗 Auto-saved YouTube links"], check=True)
         subprocess.run(["git", "push"], check=True)
         print("✅ Changes committed and pushed to GitHub.")
@@ -88,11 +73,21 @@ def main():
     items = extract_numbered_lines(INPUT_FILE)
     print(f"🔍 Found {len(items)} products to process...")
 
-    for index, product in items:
+    search = SearchService(YOUTUBE_API_KEY)
+    catalog = Catalog()
+    uncached = sum(1 for _, product in items if search.cached(product, MAX_RESULTS) is None)
+    print(f"💾 {len(items) - uncached} cached, {uncached} need search.list "
+          f"({search.ledger.remaining()} quota units left today)")
+
+    for n, (index, product) in enumerate(items):
         print(f"📦 [{index}] Searching: {product}")
         try:
-            links = search_youtube(product)
-            save_links_to_file(index, product, links)
+            links = search_youtube(search, product)
+            save_links_to_file(catalog, index, product, links)
+        except QuotaExceeded as e:
+            # Leave the rest for the next quota day; finished products are cached
+            print(f"⏸️ Quota limit reached, deferring {len(items) - n} product(s): {e}")
+            break
         except Exception as e:
             print(f"❌ Failed on [{index}] {product}: {e}")
 
@@ -1,30 +1,15 @@
 
 import os
-import time
 import string
-import random
-import threading
-from queue import Queue
-from google import genai
+import asyncio
 from google.genai import types
+from gemini_pool import GeminiPool
 
 DESCR_DIR = "Unuusual_memory/DESCR"
 RELEVANT_DIR = "Unuusual_memory/Relevant"
 os.makedirs(RELEVANT_DIR, exist_ok=True)
 
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5")
-]
-API_KEYS = [key for key in API_KEYS if key]
-if not API_KEYS:
-    raise ValueError("❌ No valid GEMINI_API keys found.")
-
 MODEL = "gemini-2.5-flash"
-REQUEST_INTERVAL = 12  # seconds between requests per key
 
 def normalize_response(text: str) -> str:
     return text.strip().lower().translate(str.maketrans('', '', string.punctuation))
@@ -45,7 +30,7 @@ def parse_txt_file(file_path):
     description = "\n".join(description_lines).strip()
     return title, description
 
-def process_file(api_key, file_name):
+async def process_file(pool, file_name):
     full_path = os.path.join(DESCR_DIR, file_name)
     product = file_name.rsplit(".", 1)[0].replace("_", " ")
 
@@ -56,7 +41,6 @@ def process_file(api_key, file_name):
         return
 
     try:
-        client = genai.Client(api_key=api_key)
         prompt = (
             f"Here is a YouTube video title and description:\n\n"
             f"Title: {title}\n\n"
@@ -66,10 +50,10 @@ def process_file(api_key, file_name):
         )
         contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
         config = types.GenerateContentConfig(response_mime_type="text/plain")
-        response = client.models.generate_content(model=MODEL, contents=contents, config=config)
-        result = normalize_response(response.text)
+        text = await pool.generate_text(MODEL, contents, config, label=file_name)
+        result = normalize_response(text)
 
-        print(f"✅ [{title[:40]}...] => {response.text.strip()} (key ending: ...{api_key[-4:]})", flush=True)
+        print(f"✅ [{title[:40]}...] => {text.strip()}", flush=True)
         if result == "yes":
             output_path = os.path.join(RELEVANT_DIR, file_name)
             with open(output_path, "w", encoding="utf-8") as f:
@@ -78,33 +62,17 @@ def process_file(api_key, file_name):
     except Exception as e:
         print(f"❌ Error processing {file_name} => {e}")
 
-def worker(api_key, queue: Queue):
-    while not queue.empty():
-        file_name = queue.get()
-        process_file(api_key, file_name)
-        time.sleep(REQUEST_INTERVAL)  # Respect per-key limit
-        queue.task_done()
-
-def main():
+async def main():
     print("🚀 Starting Gemini parallel relevance filter...")
 
     txt_files = [f for f in os.listdir(DESCR_DIR) if f.endswith(".txt")]
     print(f"🔍 Found {len(txt_files)} files.")
 
-    queues = [Queue() for _ in API_KEYS]
-    for i, file in enumerate(txt_files):
-        queues[i % len(API_KEYS)].put(file)
-
-    threads = []
-    for i, key in enumerate(API_KEYS):
-        t = threading.Thread(target=worker, args=(key, queues[i]))
-        t.start()
-        threads.append(t)
-
-    for t in threads:
-        t.join()
+    # Per-key pacing is handled by the pool's RPM/TPM buckets
+    pool = GeminiPool()
+    await asyncio.gather(*(process_file(pool, f) for f in txt_files))
 
     print("\n✅ All files processed.")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
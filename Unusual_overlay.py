@@ -1,16 +1,65 @@
+#!/usr/bin/env python3
+"""
+Unusual_overlay.py
+------------------
+Burn the typewriter product title into every Final_Videos/*.mp4.
+
+All ASS scripts are rendered in memory from one template (ASS_HEADER +
+dialogue()), the video sizes come from one parallel media_probe pass, and
+the libx264 encodes run concurrently: OVERLAY_JOBS encodes at a time with
+OVERLAY_THREADS threads each, so a batch keeps every core busy instead of
+encoding one video after another. Audio is stream-copied.
+
+Preview mode renders the same overlay at a reduced size with a fast preset
+into Overlayed_Videos/preview/ for checking titles and placement.
+
+Usage:
+    python Unusual_overlay.py
+
+Env:
+  OVERLAY_JOBS            concurrent encodes (default: CPU count / 4, at least 1)
+  OVERLAY_THREADS         libx264 threads per encode (default: CPU count / OVERLAY_JOBS)
+  OVERLAY_PRESET          libx264 preset (default: fast)
+  OVERLAY_CRF             libx264 CRF (default: 23)
+  OVERLAY_PREVIEW         "1" = fast preview render (default 0)
+  OVERLAY_PREVIEW_SIZE    short side of preview output in px (default: 480)
+  OVERLAY_PREVIEW_PRESET  (default: ultrafast)
+  OVERLAY_PREVIEW_CRF     (default: 30)
+"""
+
 import os
+import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import media_probe
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
 
 font_path = "FontsFree-Net-Proxima-Nova-Bold-It.otf.ttf"
 input_folder = "Final_Videos"
 output_folder = "Overlayed_Videos"
-os.makedirs(output_folder, exist_ok=True)
 
-videos = [f for f in os.listdir(input_folder) if f.endswith(".mp4")]
+CPUS    = os.cpu_count() or 1
+JOBS    = max(1, int(os.environ.get("OVERLAY_JOBS", "0")) or CPUS // 4)
+THREADS = max(1, int(os.environ.get("OVERLAY_THREADS", "0")) or CPUS // JOBS)
+PRESET  = os.environ.get("OVERLAY_PRESET", "fast")
+CRF     = os.environ.get("OVERLAY_CRF", "23")
 
-def generate_ass_file(text, ass_path, font_name="Proxima Nova Bold", fontsize=60, x=100, y=300):
-    text_k = ''.join([f'{{\\k20}}{c}' for c in text])
-    ass_content = f"""[Script Info]
+PREVIEW        = _truthy(os.environ.get("OVERLAY_PREVIEW", "0"))
+PREVIEW_SIZE   = int(os.environ.get("OVERLAY_PREVIEW_SIZE", "480"))
+PREVIEW_PRESET = os.environ.get("OVERLAY_PREVIEW_PRESET", "ultrafast")
+PREVIEW_CRF    = os.environ.get("OVERLAY_PREVIEW_CRF", "30")
+
+
+# ------------------------------------------------------------------
+# ASS template
+# ------------------------------------------------------------------
+ASS_HEADER = """[Script Info]
 Title: Typewriter Effect
 ScriptType: v4.00+
 
@@ -20,54 +69,88 @@ Style: Default,{font_name},{fontsize},&H00FFFFFF,&HFF0000FF,&H00000000,&H6400000
 
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-Dialogue: 0,0:00:01.00,0:00:10.00,Default,,0,0,0,,{{\\pos({x},{y})}}{text_k}
 """
-    with open(ass_path, 'w', encoding='utf-8') as f:
-        f.write(ass_content)
 
-for video in videos:
-    input_path = os.path.join(input_folder, video)
-    output_path = os.path.join(output_folder, video)
+TITLE_START, TITLE_END = 1.0, 10.0   # seconds
 
-    product_name = video.replace(".mp4", "").replace("_", " ").title()
+def ass_time(sec):
+    cs = int(round(sec * 100))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
 
-    # Detect orientation
-    cmd_probe = [
-        "ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
-        "stream=width,height", "-of", "csv=s=x:p=0", input_path
-    ]
-    try:
-        output = subprocess.check_output(cmd_probe).decode().strip()
-        width, height = map(int, output.split("x"))
-        orientation = "vertical" if height > width else "horizontal"
-    except Exception as e:
-        print(f"[!] Could not probe video {video}: {e}")
-        continue
-
-    print(f"[>] Processing {orientation} video: {video}")
-
-    # Generate .ass file
-    ass_path = f"temp_{os.path.splitext(video)[0]}.ass"
-    generate_ass_file(product_name, ass_path)
-
-    # Set text position based on orientation
-    y_pos = 300 if orientation == "vertical" else 100
-
-    # Adjust position in the .ass file
-    generate_ass_file(product_name, ass_path, x=100, y=y_pos)
-
-    # Apply subtitles (typewriter) with FFmpeg
-    cmd_overlay = [
-        "ffmpeg", "-y", "-i", input_path,
-        "-vf", f"subtitles={ass_path}",
-        "-c:v", "libx264", "-crf", "23", "-preset", "fast",
+def title_y(width, height):
+    """Title baseline: lower on vertical video, near the top on horizontal."""
+    return 300 if height > width else 100
+
+def dialogue(text, start=TITLE_START, end=TITLE_END, x=100, y=300):
+    text_k = ''.join([f'{{\\k20}}{c}' for c in text])
+    return f"Dialogue: 0,{ass_time(start)},{ass_time(end)},Default,,0,0,0,,{{\\pos({x},{y})}}{text_k}"
+
+def render_ass(events, font_name="Proxima Nova Bold", fontsize=60):
+    """Full ASS script text for the given Dialogue lines."""
+    return ASS_HEADER.format(font_name=font_name, fontsize=fontsize) + "\n".join(events) + "\n"
+
+
+# ------------------------------------------------------------------
+# Render
+# ------------------------------------------------------------------
+def overlay_cmd(input_path, ass_path, output_path, width, height):
+    vf = f"subtitles={ass_path}"
+    preset, crf = PRESET, CRF
+    if PREVIEW:
+        scale = PREVIEW_SIZE / min(width, height)
+        if scale < 1:
+            w, h = int(width * scale) // 2 * 2, int(height * scale) // 2 * 2
+            vf = f"scale={w}:{h}:flags=fast_bilinear,{vf}"
+        preset, crf = PREVIEW_PRESET, PREVIEW_CRF
+    return [
+        "ffmpeg", "-y", "-v", "error", "-i", input_path,
+        "-vf", vf,
+        "-c:v", "libx264", "-crf", crf, "-preset", preset, "-threads", str(THREADS),
+        "-c:a", "copy",
         output_path
     ]
-    try:
-        subprocess.run(cmd_overlay, check=True)
-        print(f"[✓] Overlayed with typewriter effect: {output_path}")
-    except subprocess.CalledProcessError:
-        print(f"[X] FFmpeg failed for {video}")
-    finally:
-        if os.path.exists(ass_path):
-            os.remove(ass_path)
+
+def render(video, size, ass_dir, out_dir):
+    input_path = os.path.join(input_folder, video)
+    output_path = os.path.join(out_dir, video)
+    width, height = size
+
+    product_name = video.replace(".mp4", "").replace("_", " ").title()
+    ass_path = os.path.join(ass_dir, f"{os.path.splitext(video)[0]}.ass")
+    with open(ass_path, "w", encoding="utf-8") as f:
+        f.write(render_ass([dialogue(product_name, x=100, y=title_y(width, height))]))
+
+    subprocess.run(overlay_cmd(input_path, ass_path, output_path, width, height), check=True)
+    return output_path
+
+
+def main():
+    out_dir = os.path.join(output_folder, "preview") if PREVIEW else output_folder
+    os.makedirs(out_dir, exist_ok=True)
+
+    infos = media_probe.probe_dir(input_folder, exts=(".mp4",))   # all sizes in one parallel pass
+    sizes = {}
+    for path, info in infos.items():
+        video = os.path.basename(path)
+        if not info or not info["video"]:
+            print(f"[!] Could not probe video {video}")
+            continue
+        sizes[video] = (info["video"]["width"], info["video"]["height"])
+
+    print(f"[>] Overlaying {len(sizes)} video(s): {JOBS} job(s) x {THREADS} thread(s)"
+          + (" [preview]" if PREVIEW else ""))
+
+    with tempfile.TemporaryDirectory(prefix="overlay_ass_") as ass_dir, \
+         ThreadPoolExecutor(max_workers=JOBS) as ex:
+        futures = {ex.submit(render, video, size, ass_dir, out_dir): video
+                   for video, size in sorted(sizes.items())}
+        for fut in as_completed(futures):
+            video = futures[fut]
+            try:
+                print(f"[✓] Overlayed with typewriter effect: {fut.result()}")
+            except subprocess.CalledProcessError:
+                print(f"[X] FFmpeg failed for {video}")
+
+
+if __name__ == "__main__":
+    main()
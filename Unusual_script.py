@@ -1,36 +1,22 @@
-
 import os
-import time
-from multiprocessing import Pool, TimeoutError as MP_Timeout
-from google import genai
+import asyncio
 from google.genai import types
+from gemini_pool import GeminiPool
+from pipeline import want_file
 
 DESCRIPTION_DIR = "Unuusual_memory/DESCREPTION"
 OUTPUT_DIR = "Unuusual_memory/SCRIPT"
 TIMEOUT_PER_REQUEST = 200  # seconds per file
 
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5"),
-]
-API_KEYS = [k for k in API_KEYS if k]
-if not API_KEYS:
-    raise ValueError("❌ No valid GEMINI_API keys found.")
-
 MODEL = "gemini-2.5-flash"
 
 def get_description_files():
     return sorted(
         f for f in os.listdir(DESCRIPTION_DIR)
-        if f.startswith("group_") and f.endswith(".txt")
+        if f.startswith("group_") and f.endswith(".txt") and want_file(f)
     )
 
-def process_file(args):
-    api_index, filename = args
-    key = API_KEYS[api_index]
+async def process_file(pool, filename):
     filepath = os.path.join(DESCRIPTION_DIR, filename)
 
     try:
@@ -47,7 +33,6 @@ def process_file(args):
             f"{video_content}"
         )
 
-        client = genai.Client(api_key=key)
         contents = [
             types.Content(
                 role="user",
@@ -56,45 +41,30 @@ def process_file(args):
         ]
         config = types.GenerateContentConfig(response_mime_type="text/plain")
 
-        full_response = ""
-        for chunk in client.models.generate_content_stream(
-                model=MODEL, contents=contents, config=config):
-            full_response += chunk.text
+        full_response = await pool.stream_text(
+            MODEL, contents, config, label=filename, timeout=TIMEOUT_PER_REQUEST
+        )
 
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         output_path = os.path.join(OUTPUT_DIR, filename)
         with open(output_path, 'w', encoding='utf-8') as out:
             out.write(full_response.strip() + "\n")
-        print(f"✅ {filename} processed with API#{api_index + 1}")
+        print(f"✅ {filename} processed")
 
         return filename
 
     except Exception as e:
-        print(f"❌ Error processing {filename} (API#{api_index + 1}): {e}")
+        print(f"❌ Error processing {filename}: {e}")
         return None
 
-def main():
+async def main():
     files = get_description_files()
     print(f"📂 Found {len(files)} description files.\n")
 
-    args_list = [(i % len(API_KEYS), f) for i, f in enumerate(files)]
-
-    with Pool(processes=min(len(API_KEYS), len(files))) as pool:
-        results = [
-            (filename, pool.apply_async(process_file, (args,)))
-            for args in args_list
-            for filename in [args[1]]
-        ]
-
-        for filename, res in results:
-            try:
-                res.get(timeout=TIMEOUT_PER_REQUEST)
-            except MP_Timeout:
-                print(f"⏱️ Timeout on {filename}")
-            except Exception as e:
-                print(f"⚠️ Error on {filename}: {e}")
+    pool = GeminiPool()
+    await asyncio.gather(*(process_file(pool, f) for f in files))
 
     print("\n🎉 Finished processing all files.")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Unusual_stitch.py
+-----------------
+Build the upload file in ONE encode:
+
+    Intro_Video_Final.mp4 + ranked group videos + Outro_Video_Final.mp4
+
+The group order comes from Unuusual_memory/TOP_GDG/Top_gadget.txt
+("1.  Product name" per line); product names are matched to groups through
+the scripts table of the pipeline catalog (catalog.py). Every input is
+normalised (scale/pad to one size, fps, yuv420p, 48 kHz stereo audio) and
+concatenated inside a single filter graph. The per-group typewriter titles
+(the Unusual_overlay.py ASS template) go into ONE subtitle track, offset
+to where each group starts, and are burned in after the concat. Each
+source frame is therefore decoded and encoded exactly once, instead of
+overlay re-encode + concat re-encode.
+
+Usage:
+    python Unusual_stitch.py
+
+Env:
+  STITCH_OUTPUT     (default: Final_Upload/final_video.mp4)
+  STITCH_COUNTDOWN  "1" = play the ranking from last to first (default 0)
+  STITCH_SIZE       WxH of the output (default: size of the first group video)
+  STITCH_FPS        output frame rate (default: 30)
+  STITCH_PRESET     libx264 preset (default: medium)
+  STITCH_CRF        libx264 CRF (default: 20)
+"""
+
+import os
+import re
+import sys
+import tempfile
+import subprocess
+
+import media_probe
+from catalog import Catalog
+from Unusual_overlay import TITLE_START, TITLE_END, dialogue, render_ass, title_y
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+FINAL_DIR   = "Final_Videos"
+TOP_FILE    = "Unuusual_memory/TOP_GDG/Top_gadget.txt"
+INTRO_VIDEO = os.path.join(FINAL_DIR, "Intro_Video_Final.mp4")
+OUTRO_VIDEO = os.path.join(FINAL_DIR, "Outro_Video_Final.mp4")
+
+OUTPUT      = os.environ.get("STITCH_OUTPUT", "Final_Upload/final_video.mp4")
+COUNTDOWN   = _truthy(os.environ.get("STITCH_COUNTDOWN", "0"))
+SIZE        = os.environ.get("STITCH_SIZE", "")
+FPS         = os.environ.get("STITCH_FPS", "30")
+PRESET      = os.environ.get("STITCH_PRESET", "medium")
+CRF         = os.environ.get("STITCH_CRF", "20")
+
+
+# ------------------------------------------------------------------
+# Order
+# ------------------------------------------------------------------
+def read_ranking(path=TOP_FILE):
+    """[(rank, product name), ...] from the numbered Top_gadget.txt list."""
+    ranking = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            m = re.match(r'^\s*(\d+)\s*[.)]\s*(.+?)\s*$', line.replace("*", ""))
+            if m:
+                ranking.append((int(m.group(1)), m.group(2)))
+    return ranking
+
+def ordered_segments():
+    """[(path, title or None), ...]: intro, ranked groups, outro."""
+    catalog = Catalog()
+    catalog.sync()
+
+    groups = []
+    for rank, name in read_ranking():
+        group_num = catalog.group_for_product(name)
+        path = os.path.join(FINAL_DIR, f"group_{group_num}.mp4") if group_num is not None else None
+        if not path or not os.path.isfile(path):
+            print(f"⚠️ No group video for #{rank} {name}, skipping.")
+            continue
+        groups.append((path, f"#{rank} {name}"))
+    if COUNTDOWN:
+        groups.reverse()
+
+    segments = []
+    if os.path.isfile(INTRO_VIDEO):
+        segments.append((INTRO_VIDEO, None))
+    segments += groups
+    if os.path.isfile(OUTRO_VIDEO):
+        segments.append((OUTRO_VIDEO, None))
+    return segments
+
+
+# ------------------------------------------------------------------
+# Titles
+# ------------------------------------------------------------------
+def write_titles(ass_path, titles, width, height):
+    """One ASS file holding every group title at its offset in the stitched timeline."""
+    y = title_y(width, height)
+    events = [dialogue(text, offset + TITLE_START, offset + TITLE_END, x=100, y=y)
+              for offset, text in titles]
+    with open(ass_path, "w", encoding="utf-8") as f:
+        f.write(render_ass(events))
+
+
+# ------------------------------------------------------------------
+# Command
+# ------------------------------------------------------------------
+def output_size(segments):
+    if SIZE:
+        w, h = SIZE.lower().split("x")
+        return int(w), int(h)
+    for path, title in segments:
+        if title is not None:
+            return media_probe.video_size(path)
+    return media_probe.video_size(segments[0][0])
+
+def build_command(segments, ass_path, width, height):
+    inputs, graph, pads = [], [], []
+    offset, titles = 0.0, []
+    for i, (path, title) in enumerate(segments):
+        info = media_probe.probe(path)
+        dur = (info["video"] or {}).get("duration") or info["duration"]
+        inputs += ["-i", path]
+        graph.append(
+            f"[{i}:v:0]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={FPS},format=yuv420p[v{i}]"
+        )
+        if info["audio"] is not None:
+            graph.append(
+                f"[{i}:a:0]aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                f"apad,atrim=0:{dur:.3f},asetpts=PTS-STARTPTS[a{i}]"
+            )
+        else:
+            graph.append(f"anullsrc=r=48000:cl=stereo,atrim=0:{dur:.3f}[a{i}]")
+        pads.append(f"[v{i}][a{i}]")
+        if title is not None:
+            titles.append((offset, title))
+        offset += dur
+
+    write_titles(ass_path, titles, width, height)
+    graph.append(f"{''.join(pads)}concat=n={len(segments)}:v=1:a=1[vc][aout]")
+    graph.append(f"[vc]subtitles=filename={ass_path}:fontsdir=.[vout]")
+
+    return [
+        "ffmpeg", "-y", "-v", "error", "-stats", *inputs,
+        "-filter_complex", ";".join(graph),
+        "-map", "[vout]", "-map", "[aout]",
+        "-c:v", "libx264", "-preset", PRESET, "-crf", CRF, "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "192k", "-movflags", "+faststart",
+        OUTPUT
+    ], offset
+
+
+# ------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------
+def main():
+    segments = ordered_segments()
+    if not any(title for _, title in segments):
+        print("❌ No ranked group videos found.")
+        sys.exit(1)
+
+    width, height = output_size(segments)
+    os.makedirs(os.path.dirname(OUTPUT) or ".", exist_ok=True)
+    print(f"🎬 Stitching {len(segments)} segment(s) at {width}x{height}@{FPS} -> {OUTPUT}")
+    for path, title in segments:
+        print(f"   • {path}" + (f"  [{title}]" if title else ""))
+
+    fd, ass_path = tempfile.mkstemp(prefix="stitch_titles_", suffix=".ass")
+    os.close(fd)
+    try:
+        cmd, total = build_command(segments, ass_path, width, height)
+        subprocess.run(cmd, check=True)
+        print(f"✅ Created {OUTPUT} ({total:.1f}s)")
+    finally:
+        os.remove(ass_path)
+
+
+if __name__ == "__main__":
+    main()
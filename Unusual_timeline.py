@@ -1,26 +1,31 @@
+"""
+Chapter timeline per group: where the group's script starts and ends inside
+its batch audio (Unuusual_memory/AUDIO/group_X_to_Y.wav).
+
+When Unusual_tts.py wrote the batch it also wrote the exact offsets of every
+group next to it (tts_scheduler, group_X_to_Y.json); those are used as-is.
+Otherwise (audio from before the offsets existed) the script is force-aligned locally against the transcript words
+(script_align.locate: fuzzy token DP), so the range is deterministic, needs
+no API calls and carries millisecond timestamps ("MM:SS.mmm-MM:SS.mmm",
+read by Unusual_audio_real.py).
+
+Env:
+  TIMELINE_MIN_MATCH   minimum fraction of script words found in the
+                       transcript to accept a range (default: 0.5)
+"""
 
 import os
-import time
-from google import genai
-from google.genai import types
+import script_align
+import tts_scheduler
+import wav_io
+from pipeline import want_file
 
 # === Configuration ===
 SCRIPT_DIR = "Unuusual_memory/SCRIPT"
 TRANSCRIPT_DIR = "Unuusual_memory/TRANSCRIPT"
+AUDIO_DIR = "Unuusual_memory/AUDIO"
 OUTPUT_DIR = "Unuusual_memory/TIMELINE"
-WAIT_BETWEEN_FILES = 40  # seconds
-MODEL = "gemini-2.5-flash"
-
-API_KEYS = [
-    os.environ.get("GEMINI_API"),
-    os.environ.get("GEMINI_API2"),
-    os.environ.get("GEMINI_API3"),
-    os.environ.get("GEMINI_API4"),
-    os.environ.get("GEMINI_API5")
-]
-API_KEYS = [key for key in API_KEYS if key]
-if not API_KEYS:
-    raise ValueError("❌ No valid Gemini API keys found.")
+MIN_MATCH = float(os.environ.get("TIMELINE_MIN_MATCH", "0.5"))
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -38,89 +43,71 @@ def find_transcript_file(group_number, transcript_files):
                 continue
     return None
 
-# === Gemini Request ===
-def analyze_script_with_transcript(product_name, script, transcript, api_key_index):
-    for attempt in range(len(API_KEYS)):
-        real_index = (api_key_index + attempt) % len(API_KEYS)
-        try:
-            client = genai.Client(api_key=API_KEYS[real_index])
-            prompt = f"""
-You are given:
-1. Product Name: {product_name}
-2. Script of the video.
-3. Full Transcript (timeline).
-
-Your task:
-- Analyze the transcript and find the **exact timestamp chapter** where the given script starts and ends.
-- Return only the chapter timestamps (start and end) covering the entire script.
-
-⚠️ Rules:
-- Only output the chapter timestamps where the **entire script** (given above) appears within the transcript.
-- Output format (strict):
-mm:ss-mm:ss (no extra text, no explanations)
-- Do NOT include "00:" hour prefix, only mm:ss format.
-- Be precise, cover the whole script section.
-
-Here is the script:
-{script}
-
-Here is the transcript:
-{transcript}
-"""
-            contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
-            config = types.GenerateContentConfig(response_mime_type="text/plain")
-            response = client.models.generate_content(
-                model=MODEL, contents=contents, config=config
-            )
-            return response.text.strip()
-        except Exception as e:
-            print(f"🔁 Retry {attempt + 1} with API#{real_index + 1} => Error: {e}", flush=True)
-            time.sleep(1)
-    print("❌ Failed to process Gemini request.", flush=True)
-    return ""
+# === Local Alignment ===
+def analyze_script_with_transcript(product_name, script, words):
+    """'MM:SS.mmm-MM:SS.mmm' range of `script` inside the transcript words, or ''."""
+    match = script_align.locate(script, words)
+    if match is None or match.score < MIN_MATCH:
+        score = match.score if match else 0.0
+        print(f"❌ Script of {product_name} not found in transcript (matched {score:.0%})", flush=True)
+        return ""
+    return f"{wav_io.format_time(match.start)}-{wav_io.format_time(match.end)}"
+
+# === Per-file Processing ===
+def save_timeline(script_file, result):
+    output_path = os.path.join(OUTPUT_DIR, script_file)
+    with open(output_path, "w") as f_out:
+        f_out.write(result)
+    print(f"✅ Saved chapter timeline to: {output_path}", flush=True)
+
+def process_script_file(script_file, transcript_files, transcripts):
+    group_number = int(script_file.replace("group_", "").replace(".txt", ""))
+
+    # Exact offsets recorded by the TTS join
+    offsets = tts_scheduler.find_doc(AUDIO_DIR, f"group_{group_number}")
+    if offsets:
+        print(f"\n📄 Processing: {script_file} from TTS offsets", flush=True)
+        save_timeline(script_file, f"{wav_io.format_time(offsets[0])}-{wav_io.format_time(offsets[1])}")
+        return
+
+    transcript_file = find_transcript_file(group_number, transcript_files)
+    if not transcript_file:
+        print(f"🚫 No transcript found for {script_file}", flush=True)
+        return
+
+    # Load script file (product + script)
+    with open(os.path.join(SCRIPT_DIR, script_file), "r") as f:
+        content = f.read()
+    product_line, script_line = content.strip().split("\n\n", 1)
+    product_name = product_line.replace("Product name:", "").strip()
+    script_text = script_line.replace("Script:", "").strip()
+
+    # Load transcript (parsed once per batch)
+    if transcript_file not in transcripts:
+        transcripts[transcript_file] = script_align.read_transcript(os.path.join(TRANSCRIPT_DIR, transcript_file))
+    words = transcripts[transcript_file]
+
+    print(f"\n📄 Processing: {script_file} with {transcript_file}", flush=True)
+
+    # Alignment
+    result = analyze_script_with_transcript(product_name, script_text, words)
+    if result:
+        save_timeline(script_file, result)
+    else:
+        print(f"🚫 No result for {script_file}", flush=True)
 
 # === Main Processing ===
 def main():
     script_files = sorted(
-        [f for f in os.listdir(SCRIPT_DIR) if f.endswith(".txt")],
+        [f for f in os.listdir(SCRIPT_DIR) if f.endswith(".txt") and want_file(f)],
     )
     transcript_files = sorted(
         [f for f in os.listdir(TRANSCRIPT_DIR) if f.endswith(".txt")],
-    )
+    ) if os.path.isdir(TRANSCRIPT_DIR) else []
 
-    for idx, script_file in enumerate(script_files):
-        group_number = int(script_file.replace("group_", "").replace(".txt", ""))
-        transcript_file = find_transcript_file(group_number, transcript_files)
-
-        if not transcript_file:
-            print(f"🚫 No transcript found for {script_file}", flush=True)
-            continue
-
-        # Load script file (product + script)
-        with open(os.path.join(SCRIPT_DIR, script_file), "r") as f:
-            content = f.read()
-        product_line, script_line = content.strip().split("\n\n", 1)
-        product_name = product_line.replace("Product name:", "").strip()
-        script_text = script_line.replace("Script:", "").strip()
-
-        # Load transcript
-        with open(os.path.join(TRANSCRIPT_DIR, transcript_file), "r") as f:
-            transcript = f.read()
-
-        print(f"\n📄 Processing: {script_file} with {transcript_file}", flush=True)
-
-        # Gemini Analysis
-        result = analyze_script_with_transcript(product_name, script_text, transcript, idx % len(API_KEYS))
-        if result:
-            output_path = os.path.join(OUTPUT_DIR, script_file)
-            with open(output_path, "w") as f_out:
-                f_out.write(result)
-            print(f"✅ Saved chapter timeline to: {output_path}", flush=True)
-        else:
-            print(f"🚫 No result for {script_file}", flush=True)
-
-        print(f"⏳ Waiting {WAIT_BETWEEN_FILES}s before next file...\n", flush=True)
-        time.sleep(WAIT_BETWEEN_FILES)
+    transcripts = {}
+    for script_file in script_files:
+        process_script_file(script_file, transcript_files, transcripts)
 
     print("\n🎉 All files processed!", flush=True)
 
@@ -4,6 +4,7 @@ import time
 import string
 import random
 from google import genai
+from gemini_cache import cached_generate_text
 
 # === Configuration ===
 SCRIPT_DIR = "Unuusual_memory/SCRIPT"
@@ -49,16 +50,17 @@ def rank_products_with_gemini(products):
     for attempt in range(len(API_KEYS)):
         try:
             client = genai.Client(api_key=API_KEYS[attempt])
-            response = client.models.generate_content(
-                model=MODEL,
-                contents=[
+            text = cached_generate_text(
+                client,
+                MODEL,
+                [
                     {
                         "role": "user",
                         "parts": [{"text": prompt}]
                     }
                 ]
             )
-            ranked = response.text.strip()
+            ranked = text.strip()
             print(f"✅ Ranking done using API#{attempt + 1}", flush=True)
             return ranked
         except Exception as e:
@@ -1,28 +1,24 @@
 
-import whisper
-from datetime import timedelta
+import os
 from pathlib import Path
+import whisper_service
+import tts_scheduler
 
-def format_timestamp(seconds):
-    return str(timedelta(seconds=int(seconds))).split('.')[0].zfill(8)[:8]
-
-# Load Whisper model
-model = whisper.load_model('base')
+# Batches with TTS offsets (group_X_to_Y.json) need no transcript; TRANS_FORCE=1 transcribes them anyway
+FORCE = os.environ.get("TRANS_FORCE", "0").strip().lower() in ("1", "true", "yes", "on")
 
 audio_dir = Path("Unuusual_memory/AUDIO")
 transcript_dir = Path("Unuusual_memory/TRANSCRIPT")
 transcript_dir.mkdir(parents=True, exist_ok=True)
 
-for audio_file in audio_dir.glob("*.wav"):
-    print(f"Transcribing: {audio_file.name}")
-    result = model.transcribe(str(audio_file), word_timestamps=True)
-    
+audio_files = sorted(
+    f for f in audio_dir.glob("*.wav")
+    if FORCE or not os.path.exists(tts_scheduler.offsets_path(str(f)))
+)
+print(f"Transcribing {len(audio_files)} file(s)")
+
+# One model, several files in flight (see whisper_service.py for the env knobs)
+for audio_file, words in whisper_service.transcribe_many(audio_files):
     transcript_path = transcript_dir / f"{audio_file.stem}.txt"
-    with open(transcript_path, 'w') as f:
-        for segment in result['segments']:
-            for word in segment.get('words', []):
-                start = format_timestamp(word['start'])
-                end = format_timestamp(word['end'])
-                text = word['word'].strip()
-                f.write(f'{start}-{end}: {text}\n')
+    whisper_service.write_transcript(words, transcript_path, whisper_service.hms_line)
     print(f"Saved transcript: {transcript_path.name}")
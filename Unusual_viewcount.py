@@ -1,9 +1,9 @@
 
 import os
 import re
-import requests
 from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
+from youtube_api import MetadataService, collect_video_ids
 
 load_dotenv()  # Load .env file
 
@@ -14,6 +14,8 @@ OUTPUT_DIR = 'Unuusual_memory/VIEW_COUNT'
 # Ensure output directory exists
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+META = MetadataService(API_KEY)
+
 def extract_video_id(link):
     """Extract YouTube video ID from URL."""
     parsed_url = urlparse(link.strip())
@@ -25,20 +27,16 @@ def extract_video_id(link):
     return None
 
 def fetch_view_counts(video_ids):
-    """Fetch view counts for up to 50 video IDs."""
-    url = 'https://www.googleapis.com/youtube/v3/videos'
-    params = {
-        'part': 'statistics',
-        'id': ','.join(video_ids),
-        'key': API_KEY
-    }
-    response = requests.get(url, params=params)
-    if response.ok:
-        data = response.json()
-        return {item['id']: item['statistics'].get('viewCount', '0') for item in data.get('items', [])}
-    else:
-        print(f"API Error: {response.text}")
-        return {}
+    """View counts from the shared metadata table (see youtube_api.py)."""
+    counts = {}
+    for video_id in video_ids:
+        count = META.view_count(video_id)
+        if count is not None:
+            counts[video_id] = str(count)
+    return counts
+
+# One batched metadata pass for every file below
+META.ensure(collect_video_ids([INPUT_DIR]))
 
 # Process each valid file
 for filename in os.listdir(INPUT_DIR):
@@ -56,13 +54,8 @@ for filename in os.listdir(INPUT_DIR):
             if video_id:
                 video_id_map[link] = video_id
 
-        # Batch query view counts
-        view_counts = {}
-        video_ids = list(video_id_map.values())
-        for i in range(0, len(video_ids), 50):
-            batch = video_ids[i:i+50]
-            batch_counts = fetch_view_counts(batch)
-            view_counts.update(batch_counts)
+        # Look up view counts
+        view_counts = fetch_view_counts(list(video_id_map.values()))
 
         # Write output
         with open(output_path, 'w') as out_f:
@@ -6,6 +6,7 @@ import random
 from multiprocessing import Pool, TimeoutError as MP_Timeout
 from google import genai
 from google.genai import types
+from gemini_cache import cached_generate_text
 
 # === Configuration ===
 RELEVANT_DIR = "Unuusual_memory/Relevant_links"
@@ -66,8 +67,7 @@ def rate_video_wrapper(args):
                 )
             ]
             config = types.GenerateContentConfig(response_mime_type="text/plain")
-            response = client.models.generate_content(model=MODEL, contents=contents, config=config)
-            result = normalize_response(response.text)
+            result = normalize_response(cached_generate_text(client, MODEL, contents, config))
             print(f"✅ [{link}] => {result} (API#{real_index + 1})", flush=True)
             return result
         except Exception as e:
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+catalog.py
+----------
+One indexed SQLite catalog for the gadget pipeline state in Unuusual_memory.
+
+Stages used to pass state through filenames like `1(a)_robot_window_cleaner.txt`
+and each one re-listed and regex-parsed whole directories (plus opened every
+file) to rebuild it. The catalog keeps that state in tables instead:
+
+  products    group_num -> slug (canonical, for matching), product name, Links file
+  candidates  (group_num, slot) -> url, video_id, relevant flag
+  ratings     (group_num, slot) -> score
+  durations   (group_num, slot) -> duration_iso / duration_sec
+  scripts     group_num -> product name, script text
+  audio       group_num -> wav path, duration
+  timelines   (group_num, kind) -> interval lines (kind: timeline / no_face)
+
+Stages write rows as they produce output (the .txt files are still written for
+the workflows and older scripts). `sync()` folds in anything written outside
+the catalog: it remembers (mtime, size) per file and only opens files that
+changed since the last run, so a warm sync is one listdir per directory.
+
+Usage:
+    from catalog import Catalog
+    cat = Catalog()
+    cat.sync()
+    for group_num, fname, score, dur in cat.qualified():
+        ...
+
+    python catalog.py            # sync and print a per-table summary
+
+Env:
+  CATALOG_PATH   (default: Unuusual_memory/CACHE/catalog.sqlite)
+  VERBOSE        "1" for extra logs
+"""
+
+import os
+import re
+import sys
+import time
+import wave
+import sqlite3
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+BASE_DIR      = "Unuusual_memory"
+CATALOG_PATH  = os.environ.get("CATALOG_PATH", os.path.join(BASE_DIR, "CACHE", "catalog.sqlite"))
+VERBOSE       = os.environ.get("VERBOSE") == "1"
+
+LINKS_DIR     = os.path.join(BASE_DIR, "Links")
+RELEVANT_DIR  = os.path.join(BASE_DIR, "Relevant")
+RATING_DIR    = os.path.join(BASE_DIR, "RATING")
+DURATION_DIR  = os.path.join(BASE_DIR, "DURATION")
+SCRIPT_DIR    = os.path.join(BASE_DIR, "SCRIPT")
+AUDIO_DIR     = os.path.join(BASE_DIR, "AUDIO_REAL")
+TIMELINE_DIR  = os.path.join(BASE_DIR, "TIMELINE")
+NO_FACE_DIR   = os.path.join(BASE_DIR, "NO_FACE")
+
+def log(msg):
+    print(msg, flush=True)
+
+def vlog(msg):
+    if VERBOSE:
+        log(msg)
+
+def err(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+# ------------------------------------------------------------------
+# Filename / content parsing (the only place that knows the naming scheme)
+# ------------------------------------------------------------------
+_slug_cleanup_re = re.compile(r'[^a-z0-9]+')
+_vid_re          = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/)([A-Za-z0-9_-]{11})')
+_group_file_re   = re.compile(r'^group_(\d+)\.(?:txt|wav)$', re.IGNORECASE)
+
+SCORE_RE    = re.compile(r'overall\s*score\s*[:\-]?\s*(\d+)\s*(?:/|of)\s*(\d+)', re.IGNORECASE)
+DUR_SECS_RE = re.compile(r'Duration_seconds\s*:\s*(\d+)', re.IGNORECASE)
+DUR_ISO_RE  = re.compile(r'Duration_ISO\s*:\s*(PT\S+)', re.IGNORECASE)
+PRODUCT_RE  = re.compile(r'^\s*Product name\s*:\s*(.+)$', re.IGNORECASE | re.MULTILINE)
+
+def canon_slug(s: str) -> str:
+    return _slug_cleanup_re.sub("_", s.lower()).strip("_")
+
+def strip_ext(name: str) -> str:
+    return re.sub(r'\.[tT][xX][tT]\s*$', '', name.strip())
+
+def extract_video_id(url: str):
+    m = _vid_re.search(url or "")
+    return m.group(1) if m else None
+
+def slot_letter(index: int) -> str:
+    return chr(ord('a') + index)
+
+def slot_index(slot_token: str) -> int:
+    """Letters a.. -> 0..; digits are 1-based -> 0-based."""
+    if slot_token.isdigit():
+        return max(0, int(slot_token) - 1)
+    return max(0, ord(slot_token.lower()) - ord('a'))
+
+def parse_slot_filename(name: str):
+    """
+    '  12 ( b ) _whatever .TXT' -> (12, 'b', 'whatever') or None.
+    Leading digits are the group, the first char inside the first () the slot.
+    """
+    noext = strip_ext(name)
+    i = 0
+    while i < len(noext) and noext[i].isdigit():
+        i += 1
+    if i == 0:
+        return None
+    rest = noext[i:]
+    o = rest.find('(')
+    c = rest.find(')', o + 1) if o != -1 else -1
+    if c == -1 or not rest[o + 1:c].strip():
+        return None
+    slot = rest[o + 1:c].strip()[0].lower()
+    return int(noext[:i]), slot, canon_slug(rest[c + 1:])
+
+def _split_links_filename(name: str):
+    noext = strip_ext(name)
+    i = 0
+    while i < len(noext) and noext[i].isdigit():
+        i += 1
+    if i == 0:
+        return None
+    return int(noext[:i]), noext[i:].strip().lstrip("_")
+
+def parse_links_filename(name: str):
+    """'1_robot_window_cleaner.txt' -> (1, 'robot_window_cleaner') or None."""
+    parsed = _split_links_filename(name)
+    return (parsed[0], canon_slug(parsed[1])) if parsed else None
+
+def file_slug(links_file: str):
+    """
+    The slug exactly as it is spelled on disk: '18_voice-controlled_shower.txt'
+    -> 'voice-controlled_shower'. Output files (Relevant/RATING/DURATION) are
+    named with this one; canon_slug() is only for matching.
+    """
+    parsed = _split_links_filename(links_file or "")
+    return parsed[1] if parsed and parsed[1] else None
+
+def parse_group_filename(name: str):
+    """'group_12.txt' / 'group_12.wav' -> 12 or None."""
+    m = _group_file_re.match(name.strip())
+    return int(m.group(1)) if m else None
+
+def parse_score(text: str):
+    m = SCORE_RE.search(text or "")
+    if not m:
+        return None
+    num, denom = int(m.group(1)), int(m.group(2))
+    if denom <= 0:
+        denom = 10
+    return max(0, min(10, round(num / denom * 10)))
+
+def parse_iso_duration(iso: str):
+    m = re.match(r'^PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$', (iso or "").strip())
+    if not m:
+        return None
+    h, mi, s = (int(g or 0) for g in m.groups())
+    return h * 3600 + mi * 60 + s
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+def _read_links(path):
+    return [s for s in (line.strip() for line in _read(path).splitlines()) if s and not s.startswith("#")]
+
+
+# ------------------------------------------------------------------
+# Schema
+# ------------------------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    group_num   INTEGER PRIMARY KEY,
+    slug        TEXT NOT NULL,
+    name        TEXT,
+    links_file  TEXT
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    group_num   INTEGER NOT NULL,
+    slot        TEXT NOT NULL,
+    slot_idx    INTEGER NOT NULL,
+    url         TEXT NOT NULL,
+    video_id    TEXT,
+    relevant    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_num, slot)
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_video ON candidates(video_id);
+CREATE TABLE IF NOT EXISTS ratings (
+    group_num   INTEGER NOT NULL,
+    slot        TEXT NOT NULL,
+    slot_idx    INTEGER NOT NULL,
+    score       INTEGER,
+    file        TEXT NOT NULL,
+    PRIMARY KEY (group_num, slot)
+);
+CREATE TABLE IF NOT EXISTS durations (
+    group_num    INTEGER NOT NULL,
+    slot         TEXT NOT NULL,
+    duration_iso TEXT,
+    duration_sec INTEGER,
+    file         TEXT NOT NULL,
+    PRIMARY KEY (group_num, slot)
+);
+CREATE TABLE IF NOT EXISTS scripts (
+    group_num    INTEGER PRIMARY KEY,
+    product_name TEXT,
+    text         TEXT NOT NULL,
+    file         TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audio (
+    group_num    INTEGER PRIMARY KEY,
+    path         TEXT NOT NULL,
+    duration_sec REAL
+);
+CREATE TABLE IF NOT EXISTS timelines (
+    group_num   INTEGER NOT NULL,
+    kind        TEXT NOT NULL,
+    intervals   TEXT NOT NULL,
+    file        TEXT NOT NULL,
+    PRIMARY KEY (group_num, kind)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path   TEXT PRIMARY KEY,
+    mtime  REAL NOT NULL,
+    size   INTEGER NOT NULL
+);
+"""
+
+
+# ------------------------------------------------------------------
+# Catalog
+# ------------------------------------------------------------------
+class Catalog:
+    """Indexed pipeline state; see module docstring."""
+
+    def __init__(self, path=CATALOG_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ---------- writes (called by stages as they produce output) ----------
+    def record_product(self, group_num, name, links, links_file=None, slug=None):
+        """A Links file: product plus one candidate per link (slot a, b, c ...)."""
+        slug = slug or canon_slug(name)
+        prev = self.db.execute("SELECT slug FROM products WHERE group_num = ?", (group_num,)).fetchone()
+        if prev and prev["slug"] != slug:
+            # Group number reused for a new product: drop the old product's state
+            vlog(f"  [catalog] group {group_num}: {prev['slug']} -> {slug}, clearing old rows")
+            for table in ("candidates", "ratings", "durations", "scripts", "audio", "timelines"):
+                self.db.execute(f"DELETE FROM {table} WHERE group_num = ?", (group_num,))
+        self.db.execute(
+            "INSERT OR REPLACE INTO products (group_num, slug, name, links_file) VALUES (?, ?, ?, ?)",
+            (group_num, slug, name, links_file),
+        )
+        self.db.execute("DELETE FROM candidates WHERE group_num = ? AND slot_idx >= ?", (group_num, len(links)))
+        for i, url in enumerate(links):
+            self.db.execute(
+                "INSERT INTO candidates (group_num, slot, slot_idx, url, video_id) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (group_num, slot) DO UPDATE SET url = excluded.url, video_id = excluded.video_id",
+                (group_num, slot_letter(i), i, url, extract_video_id(url)),
+            )
+        self.db.commit()
+
+    def mark_relevant(self, group_num, slot, relevant=True):
+        self.db.execute(
+            "UPDATE candidates SET relevant = ? WHERE group_num = ? AND slot = ?",
+            (1 if relevant else 0, group_num, slot),
+        )
+        self.db.commit()
+
+    def record_rating(self, group_num, slot, score, file):
+        self.db.execute(
+            "INSERT OR REPLACE INTO ratings (group_num, slot, slot_idx, score, file) VALUES (?, ?, ?, ?, ?)",
+            (group_num, slot, slot_index(slot), score, file),
+        )
+        self.db.commit()
+
+    def record_duration(self, group_num, slot, duration_iso, duration_sec, file):
+        self.db.execute(
+            "INSERT OR REPLACE INTO durations (group_num, slot, duration_iso, duration_sec, file)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (group_num, slot, duration_iso, duration_sec, file),
+        )
+        self.db.commit()
+
+    def record_script(self, group_num, product_name, text, file):
+        self.db.execute(
+            "INSERT OR REPLACE INTO scripts (group_num, product_name, text, file) VALUES (?, ?, ?, ?)",
+            (group_num, product_name, text, file),
+        )
+        self.db.commit()
+
+    def record_audio(self, group_num, path, duration_sec):
+        self.db.execute(
+            "INSERT OR REPLACE INTO audio (group_num, path, duration_sec) VALUES (?, ?, ?)",
+            (group_num, path, duration_sec),
+        )
+        self.db.commit()
+
+    def record_timeline(self, group_num, kind, intervals, file):
+        self.db.execute(
+            "INSERT OR REPLACE INTO timelines (group_num, kind, intervals, file) VALUES (?, ?, ?, ?)",
+            (group_num, kind, intervals, file),
+        )
+        self.db.commit()
+
+    # ---------- reads ----------
+    def product(self, group_num):
+        row = self.db.execute("SELECT * FROM products WHERE group_num = ?", (group_num,)).fetchone()
+        return dict(row) if row else None
+
+    def candidate(self, group_num, slot):
+        row = self.db.execute(
+            "SELECT c.*, p.slug FROM candidates c JOIN products p USING (group_num)"
+            " WHERE c.group_num = ? AND c.slot_idx = ?",
+            (group_num, slot_index(slot)),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def relevant_candidates(self):
+        """[(group_num, slot, slug, url, video_id)] for every relevant slot.
+
+        `slug` is the on-disk spelling from the Links filename (file_slug), so
+        names built from it match the Links/Relevant/DURATION files.
+        """
+        return [(r["group_num"], r["slot"], file_slug(r["links_file"]) or r["slug"], r["url"], r["video_id"])
+                for r in self.db.execute(
+            "SELECT c.group_num, c.slot, p.slug, p.links_file, c.url, c.video_id"
+            " FROM candidates c JOIN products p USING (group_num)"
+            " WHERE c.relevant = 1 ORDER BY c.group_num, c.slot_idx"
+        )]
+
+    def by_video_id(self, video_id):
+        return [dict(r) for r in self.db.execute(
+            "SELECT * FROM candidates WHERE video_id = ?", (video_id,)
+        )]
+
+    def qualified(self):
+        """
+        Winner per group: higher score, then longer duration, then earlier
+        slot, then filename. [(group_num, rating_file, score, duration_sec)].
+        """
+        return [tuple(r) for r in self.db.execute("""
+            SELECT group_num, file, score, duration FROM (
+                SELECT r.group_num, r.file,
+                       COALESCE(r.score, 0)        AS score,
+                       COALESCE(d.duration_sec, 0) AS duration,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY r.group_num
+                           ORDER BY COALESCE(r.score, 0) DESC,
+                                    COALESCE(d.duration_sec, 0) DESC,
+                                    r.slot_idx, r.file
+                       ) AS rank
+                FROM ratings r
+                LEFT JOIN durations d ON d.group_num = r.group_num AND d.slot = r.slot
+            ) WHERE rank = 1 ORDER BY group_num
+        """)]
+
+    def script(self, group_num):
+        row = self.db.execute("SELECT * FROM scripts WHERE group_num = ?", (group_num,)).fetchone()
+        return dict(row) if row else None
+
+    def group_for_product(self, product_name):
+        """group_num whose script is about `product_name` (case/spacing-insensitive), or None."""
+        want = canon_slug(product_name)
+        for row in self.db.execute("SELECT group_num, product_name FROM scripts ORDER BY group_num"):
+            if row["product_name"] and canon_slug(row["product_name"]) == want:
+                return row["group_num"]
+        return None
+
+    def timeline(self, group_num, kind="timeline"):
+        row = self.db.execute(
+            "SELECT intervals FROM timelines WHERE group_num = ? AND kind = ?", (group_num, kind)
+        ).fetchone()
+        return row["intervals"] if row else None
+
+    def counts(self):
+        tables = ("products", "candidates", "ratings", "durations", "scripts", "audio", "timelines")
+        return {t: self.db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in tables}
+
+    # ---------- sync from files written outside the catalog ----------
+    def _changed(self, directory, exts=(".txt",)):
+        """(fnames present, fnames new/modified since last sync)."""
+        try:
+            names = sorted(n for n in os.listdir(directory) if n.lower().endswith(exts))
+        except FileNotFoundError:
+            return [], []
+        changed = []
+        for name in names:
+            path = os.path.join(directory, name)
+            st = os.stat(path)
+            row = self.db.execute("SELECT mtime, size FROM files WHERE path = ?", (path,)).fetchone()
+            if row is None or row["mtime"] != st.st_mtime or row["size"] != st.st_size:
+                changed.append(name)
+                self.db.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                    (path, st.st_mtime, st.st_size),
+                )
+        return names, changed
+
+    def _forget_missing(self, table, directory, present):
+        """Drop rows whose backing file has been deleted."""
+        keep = set(present)
+        for row in self.db.execute(f"SELECT rowid, file FROM {table}").fetchall():
+            if row["file"] not in keep:
+                self.db.execute(f"DELETE FROM {table} WHERE rowid = ?", (row["rowid"],))
+        for row in self.db.execute("SELECT path FROM files WHERE path LIKE ?", (directory + os.sep + "%",)).fetchall():
+            if os.path.basename(row["path"]) not in keep:
+                self.db.execute("DELETE FROM files WHERE path = ?", (row["path"],))
+
+    def _sync_slot_dir(self, directory, ingest):
+        names, changed = self._changed(directory)
+        for name in changed:
+            parsed = parse_slot_filename(name)
+            if not parsed:
+                vlog(f"  [catalog] cannot parse {name!r}; skipping")
+                continue
+            ingest(name, *parsed)
+        return names, changed
+
+    def sync(self):
+        """Fold new/modified stage files into the catalog; returns #files read."""
+        t0 = time.time()
+        read = 0
+
+        names, changed = self._changed(LINKS_DIR)
+        for name in changed:
+            parsed = parse_links_filename(name)
+            if parsed:
+                group_num, slug = parsed
+                self.record_product(group_num, slug.replace("_", " "),
+                                    _read_links(os.path.join(LINKS_DIR, name)), name, slug)
+        read += len(changed)
+
+        def ingest_relevant(name, group_num, slot, slug):
+            prod = self.product(group_num)
+            if prod and prod["slug"] != slug:
+                vlog(f"  [catalog] {name!r} does not match product {prod['slug']!r}; skipping")
+                return
+            self.mark_relevant(group_num, slot)
+        names, changed = self._sync_slot_dir(RELEVANT_DIR, ingest_relevant)
+        present = set()
+        for n in names:
+            parsed = parse_slot_filename(n)
+            if parsed:
+                present.add(parsed[:2])
+        for row in self.db.execute("SELECT group_num, slot FROM candidates WHERE relevant = 1").fetchall():
+            if (row["group_num"], row["slot"]) not in present:
+                self.mark_relevant(row["group_num"], row["slot"], False)
+        read += len(changed)
+
+        def ingest_rating(name, group_num, slot, slug):
+            self.record_rating(group_num, slot, parse_score(_read(os.path.join(RATING_DIR, name))), name)
+        names, changed = self._sync_slot_dir(RATING_DIR, ingest_rating)
+        self._forget_missing("ratings", RATING_DIR, names)
+        read += len(changed)
+
+        def ingest_duration(name, group_num, slot, slug):
+            text = _read(os.path.join(DURATION_DIR, name))
+            m_iso, m_sec = DUR_ISO_RE.search(text), DUR_SECS_RE.search(text)
+            iso = m_iso.group(1) if m_iso else None
+            secs = int(m_sec.group(1)) if m_sec else parse_iso_duration(iso)
+            self.record_duration(group_num, slot, iso, secs, name)
+        names, changed = self._sync_slot_dir(DURATION_DIR, ingest_duration)
+        self._forget_missing("durations", DURATION_DIR, names)
+        read += len(changed)
+
+        names, changed = self._changed(SCRIPT_DIR)
+        for name in changed:
+            group_num = parse_group_filename(name)
+            if group_num is not None:
+                text = _read(os.path.join(SCRIPT_DIR, name))
+                m = PRODUCT_RE.search(text)
+                self.record_script(group_num, m.group(1).strip() if m else None, text, name)
+        self._forget_missing("scripts", SCRIPT_DIR, names)
+        read += len(changed)
+
+        for kind, directory in (("timeline", TIMELINE_DIR), ("no_face", NO_FACE_DIR)):
+            names, changed = self._changed(directory)
+            for name in changed:
+                group_num = parse_group_filename(name)
+                if group_num is not None:
+                    self.record_timeline(group_num, kind, _read(os.path.join(directory, name)), name)
+            keep = set(names)
+            for row in self.db.execute("SELECT group_num, file FROM timelines WHERE kind = ?", (kind,)).fetchall():
+                if row["file"] not in keep:
+                    self.db.execute("DELETE FROM timelines WHERE group_num = ? AND kind = ?",
+                                    (row["group_num"], kind))
+            read += len(changed)
+
+        names, changed = self._changed(AUDIO_DIR, exts=(".wav",))
+        for name in changed:
+            group_num = parse_group_filename(name)
+            if group_num is None:
+                continue
+            path = os.path.join(AUDIO_DIR, name)
+            try:
+                with wave.open(path, "rb") as w:
+                    dur = w.getnframes() / float(w.getframerate())
+            except Exception:
+                dur = None
+            self.record_audio(group_num, path, dur)
+        keep = {os.path.join(AUDIO_DIR, n) for n in names}
+        for row in self.db.execute("SELECT group_num, path FROM audio").fetchall():
+            if row["path"] not in keep:
+                self.db.execute("DELETE FROM audio WHERE group_num = ?", (row["group_num"],))
+        read += len(changed)
+
+        self.db.commit()
+        vlog(f"[catalog] sync read {read} changed file(s) in {time.time() - t0:.2f}s")
+        return read
+
+
+# ------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------
+def main():
+    cat = Catalog()
+    read = cat.sync()
+    log(f"[✓] Catalog synced ({read} file(s) read): {CATALOG_PATH}")
+    for table, n in cat.counts().items():
+        log(f"  {table:<11} {n}")
+
+if __name__ == "__main__":
+    main()
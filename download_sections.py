@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+download_sections.py
+--------------------
+yt-dlp arguments that fetch only what the pipeline uses of a source video:
+
+  - the time range: `--download-sections *0-END`, where END is the end of
+    the last no-face range of the group (Unuusual_memory/NO_FACE/group_N.txt,
+    when face detection already ran) plus a small margin, else
+    MAX_ANALYZE_SECONDS. The section always starts at 0 so every timestamp
+    computed on the full video (NO_FACE, TIMELINE) still points at the same
+    frame in the download.
+  - the resolution: the lowest video format whose short side is at least
+    DOWNLOAD_MIN_RES, falling back to the best there is.
+  - no audio track: the narration replaces it (DOWNLOAD_AUDIO=1 keeps it).
+
+Section downloads are done by ffmpeg, which cannot use a SOCKS proxy; when
+the download goes through Tor, run yt-dlp under torsocks (tor_pool.Slot.
+torsocks_env()) so the ffmpeg child rides the same circuit. ffmpeg also
+ignores --continue: an interrupted section download starts over from 0 on
+the next attempt. So when the video's duration is known (DURATION/ file of
+the qualified slot) and the section would not save at least
+DOWNLOAD_SECTION_MIN_SAVING of it, the whole video is fetched by yt-dlp's
+native downloader instead, which resumes from its .part file.
+
+Usage:
+    import download_sections
+    duration = download_sections.known_duration("7(c)_smart_ring.txt")   # or None
+    cmd = ["yt-dlp", *download_sections.ytdlp_args(group_num, duration), "-o", out, url]
+
+Env:
+  DOWNLOAD_SECTIONS     auto | analyze | full (default: auto)
+                          auto     NO_FACE end when known, else MAX_ANALYZE_SECONDS
+                          analyze  always MAX_ANALYZE_SECONDS
+                          full     whole video, no section / format limits
+  MAX_ANALYZE_SECONDS   (default: 180; 0 = whole video)
+  DOWNLOAD_SECTION_MIN_SAVING
+                        fraction of the video a section must skip to be worth
+                        a non-resumable ffmpeg download (default: 0.25)
+  DOWNLOAD_MIN_RES      minimum short side in px (default: 720)
+  DOWNLOAD_AUDIO        "1" keeps the audio track (default 0)
+"""
+
+import os
+import re
+
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+MODE            = os.environ.get("DOWNLOAD_SECTIONS", "auto").strip().lower()
+MAX_ANALYZE_SEC = int(os.environ.get("MAX_ANALYZE_SECONDS", "180"))
+MIN_RES         = int(os.environ.get("DOWNLOAD_MIN_RES", "720"))
+KEEP_AUDIO      = _truthy(os.environ.get("DOWNLOAD_AUDIO", "0"))
+MIN_SAVING      = float(os.environ.get("DOWNLOAD_SECTION_MIN_SAVING", "0.25"))
+NO_FACE_DIR     = "Unuusual_memory/NO_FACE"
+DURATION_DIR    = "Unuusual_memory/DURATION"
+MARGIN_SEC      = 2
+
+_RANGE = re.compile(r'^\s*(\d+):(\d+)\s*-\s*(\d+):(\d+)')
+_DUR_SECS = re.compile(r'Duration_seconds\s*:\s*(\d+)', re.IGNORECASE)
+
+
+def no_face_end(group_num):
+    """End (s) of the last no-face range of the group, or None if unknown."""
+    path = os.path.join(NO_FACE_DIR, f"group_{group_num}.txt")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            ends = [int(m.group(3)) * 60 + int(m.group(4)) for m in map(_RANGE.match, f) if m]
+    except OSError:
+        return None
+    return max(ends) if ends else None
+
+def known_duration(slot_file):
+    """Duration_seconds of a qualified slot ('7(c)_smart_ring.txt') from DURATION/, or None."""
+    try:
+        with open(os.path.join(DURATION_DIR, slot_file), "r", encoding="utf-8") as f:
+            m = _DUR_SECS.search(f.read())
+    except OSError:
+        return None
+    return int(m.group(1)) if m and int(m.group(1)) > 0 else None
+
+def section_end(group_num=None, duration=None):
+    """Seconds to download from the start, or None for the whole video (resumable)."""
+    if MODE == "full":
+        return None
+    end = None
+    if MODE == "auto" and group_num is not None:
+        end = no_face_end(group_num)
+        if end is not None:
+            end += MARGIN_SEC
+    if end is None:
+        end = MAX_ANALYZE_SEC or None
+    if end and duration and end >= duration * (1 - MIN_SAVING):
+        return None     # not worth giving up resumable downloads for
+    return end
+
+def format_selector():
+    res = f"[height>={MIN_RES}][width>={MIN_RES}]"
+    if KEEP_AUDIO:
+        return f"wv{res}+ba/wv*{res}+ba/bv*+ba/b"
+    return f"wv{res}/wv*{res}/bv*/b"
+
+def ytdlp_args(group_num=None, duration=None):
+    """yt-dlp options for the range / format / track limits above ([] in full mode)."""
+    if MODE == "full":
+        return []
+    args = ["-f", format_selector()]
+    end = section_end(group_num, duration)
+    if end:
+        args += ["--download-sections", f"*0-{end}"]
+    return args
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+face_cache.py
+-------------
+Result cache for the face timeline scripts (Unusual_faces.py, Unusual_faces2.py).
+
+SKIP_EXISTING only looks for the timeline file, so every fresh runner (or a
+re-download of Vid/) pays for face detection again. Here results are keyed by
+a fast content hash of the source video (size + three 1 MiB samples, BLAKE2b)
+plus the detector settings that change which frames are inspected and how
+(model, frame stride, analysis cap, sampling, decode width, score floor).
+
+What is stored is not the yes/no timeline but the best detection score of
+every inspected frame (uint16, 1e-4 steps, zlib-compressed). While the cache
+is on, the detector runs at FACE_SCORE_FLOOR and the scan does not depend on
+MIN_CONFIDENCE: no second stops at its first face, and sampling densifies
+around transitions decided at the floor. Changing the threshold (to anything
+>= the floor) therefore re-derives the timeline from the stored scores
+without decoding the video again.
+
+Usage:
+    import face_cache
+    cache = face_cache.default_cache()
+    vhash = face_cache.content_hash(path)
+    entry = cache.get(vhash, settings, MIN_CONF)          # None on miss
+    sec_results = face_cache.seconds_from_scores(entry["frames"], entry["scores"],
+                                                 entry["info"]["fps"], MIN_CONF)
+    cache.put(vhash, settings, frames, scores, info, floor)
+
+Env:
+  FACE_CACHE         "0" disables the cache (default 1)
+  FACE_CACHE_PATH    (default: Unuusual_memory/CACHE/face_scores.sqlite)
+  FACE_SCORE_FLOOR   detector min confidence while caching (default: 0.3;
+                     the lowest MIN_CONFIDENCE an entry can be re-derived at)
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from array import array
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+CACHE_ENABLED = _truthy(os.environ.get("FACE_CACHE", "1"))
+CACHE_PATH    = os.environ.get("FACE_CACHE_PATH", "Unuusual_memory/CACHE/face_scores.sqlite")
+SCORE_FLOOR   = float(os.environ.get("FACE_SCORE_FLOOR", "0.3"))
+
+SAMPLE_BYTES = 1 << 20   # bytes hashed at start / middle / end of a video
+SCORE_SCALE  = 10000     # stored score = floor(score * SCORE_SCALE)
+
+
+# ------------------------------------------------------------------
+# Keys / encoding
+# ------------------------------------------------------------------
+def content_hash(path) -> str:
+    """BLAKE2b over the file size and 1 MiB from its start, middle and end."""
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_BYTES // 2), max(0, size - SAMPLE_BYTES)}):
+            f.seek(offset)
+            h.update(f.read(SAMPLE_BYTES))
+    return h.hexdigest()
+
+def settings_key(settings: dict) -> str:
+    return json.dumps(settings, sort_keys=True, separators=(",", ":"))
+
+def detector_floor(min_conf: float) -> float:
+    """min_detection_confidence to run MediaPipe with so scores stay re-usable."""
+    return min(min_conf, SCORE_FLOOR) if CACHE_ENABLED else min_conf
+
+def quantize(score: float) -> int:
+    return max(0, min(SCORE_SCALE, int(score * SCORE_SCALE)))
+
+def seconds_from_scores(frames, scores, fps: float, threshold: float) -> dict:
+    """{second: has_face} over the inspected frames, face = any score >= threshold."""
+    cut = int(round(threshold * SCORE_SCALE))
+    sec_results = {}
+    for f, q in zip(frames, scores):
+        sec = int(f / fps)
+        sec_results[sec] = sec_results.get(sec, False) or q >= cut
+    return sec_results
+
+
+# ------------------------------------------------------------------
+# SQLite store
+# ------------------------------------------------------------------
+class FaceCache:
+    """Per-frame face scores keyed by (video content hash, detector settings)."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        cols = [r[1] for r in self._db.execute("PRAGMA table_info(face_scores)")]
+        if "decided_at" in cols:
+            # Old layout: scans stopped at a fixed threshold, not re-derivable
+            self._db.execute("DROP TABLE face_scores")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS face_scores ("
+            " video_hash TEXT NOT NULL,"
+            " settings TEXT NOT NULL,"
+            " floor REAL NOT NULL,"
+            " info TEXT NOT NULL,"
+            " frames BLOB NOT NULL,"
+            " scores BLOB NOT NULL,"
+            " created REAL NOT NULL,"
+            " PRIMARY KEY (video_hash, settings))"
+        )
+        self._db.commit()
+
+    def get(self, video_hash, settings: dict, threshold: float):
+        """Cached entry usable at `threshold` (>= its score floor), or None."""
+        row = self._db.execute(
+            "SELECT floor, info, frames, scores FROM face_scores"
+            " WHERE video_hash = ? AND settings = ?",
+            (video_hash, settings_key(settings)),
+        ).fetchone()
+        if row is None or threshold < row[0] - 1e-9:
+            return None     # scores below the floor were never recorded
+        frames, scores = array("I"), array("H")
+        frames.frombytes(zlib.decompress(row[2]))
+        scores.frombytes(zlib.decompress(row[3]))
+        return {
+            "floor": row[0],
+            "info": json.loads(row[1]),
+            "frames": frames,
+            "scores": scores,
+        }
+
+    def put(self, video_hash, settings: dict, frames, scores, info: dict, floor: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO face_scores"
+            " (video_hash, settings, floor, info, frames, scores, created)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (video_hash, settings_key(settings), floor, json.dumps(info),
+             zlib.compress(array("I", frames).tobytes()),
+             zlib.compress(array("H", scores).tobytes()),
+             time.time()),
+        )
+        self._db.commit()
+
+
+def default_cache():
+    """FaceCache at FACE_CACHE_PATH, or None when disabled."""
+    return FaceCache() if CACHE_ENABLED else None
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+face_pool.py
+------------
+Process-pool sharding for the per-second face timeline scripts
+(Unusual_faces.py, Unusual_faces2.py).
+
+MediaPipe runs single-threaded per detector, so analysing videos one after
+another leaves most of a runner idle. Here every worker process builds ONE
+FaceDetection in its initializer and reuses it for all the work it is given;
+videos (and, with FACE_SHARD_SECONDS, fixed time ranges inside long videos)
+are spread across the workers and the per-second results are merged back
+per video, so the timeline files come out exactly as before.
+
+Usage (from a timeline script):
+    import face_pool
+    jobs = [(path, start, end, fps), ...]            # see shard_ranges()
+    for job, result in face_pool.run_jobs(scan_seconds, jobs, MODEL_SELECTION, MIN_CONF):
+        ...
+    # inside scan_seconds(): detector = face_pool.detector()
+
+Env:
+  FACE_WORKERS        worker processes (default: CPU count; 1 = in-process)
+  FACE_SHARD_SECONDS  split videos into ranges of this many seconds (default: 0 = whole videos)
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+WORKERS        = int(os.environ.get("FACE_WORKERS", "0")) or os.cpu_count() or 1
+SHARD_SECONDS  = int(os.environ.get("FACE_SHARD_SECONDS", "0"))
+
+_detector = None
+
+
+# ------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------
+def init_worker(model_selection, min_conf):
+    """Create this process's FaceDetection (once per worker, not per video)."""
+    global _detector
+    import mediapipe as mp
+    _detector = mp.solutions.face_detection.FaceDetection(
+        model_selection=model_selection, min_detection_confidence=min_conf
+    )
+
+def detector():
+    return _detector
+
+def _call(fn, job):
+    try:
+        return fn(*job)
+    except Exception as e:
+        print(f"[!] face worker failed on {job[0]}: {e}", file=sys.stderr, flush=True)
+        return None
+
+
+# ------------------------------------------------------------------
+# Planning / merging
+# ------------------------------------------------------------------
+def shard_ranges(n_seconds, shard_seconds=SHARD_SECONDS):
+    """
+    [(start, end), ...] covering seconds [0, n_seconds). end=None means
+    'until the video ends' (used when the length is unknown).
+    """
+    if n_seconds is None:
+        return [(0, None)]
+    if shard_seconds <= 0 or n_seconds <= shard_seconds:
+        return [(0, n_seconds)]
+    return [(s, min(s + shard_seconds, n_seconds)) for s in range(0, n_seconds, shard_seconds)]
+
+def merge_seconds(parts):
+    """OR together {second: has_face} dicts from several shards of one video."""
+    merged = {}
+    for part in parts:
+        for sec, has_face in part.items():
+            merged[sec] = merged.get(sec, False) or has_face
+    return merged
+
+
+# ------------------------------------------------------------------
+# Dispatch
+# ------------------------------------------------------------------
+def run_jobs(fn, jobs, model_selection, min_conf, workers=WORKERS):
+    """
+    Yield (job, fn(*job)) as jobs finish (result None if the job raised).
+    With workers > 1 the jobs run in a process pool (fn must be a
+    module-level function); otherwise in-process with a single shared
+    detector.
+    """
+    jobs = list(jobs)
+    if workers <= 1 or len(jobs) <= 1:
+        if _detector is None:
+            init_worker(model_selection, min_conf)
+        for job in jobs:
+            yield job, _call(fn, job)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                             initializer=init_worker,
+                             initargs=(model_selection, min_conf)) as ex:
+        futures = {ex.submit(_call, fn, job): job for job in jobs}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
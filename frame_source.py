@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+frame_source.py
+---------------
+Shared ffmpeg-pipe frame decoder for the face detection scripts
+(Unusual_faces.py, Unusual_faces2.py, Unusual_download.py).
+
+cv2.VideoCapture decodes every frame at full resolution into a fresh BGR
+array, the scripts then cvtColor() each one to RGB, and MediaPipe shrinks it
+to ~128-192 px anyway. Here ffmpeg does the work in one native pass:
+
+    ffmpeg [-ss start] -i video [-t dur] -vf fps=F,scale=W:H -pix_fmt rgb24 -f rawvideo pipe:
+
+and frames are read with readinto() into ONE preallocated NumPy buffer, so
+there is no per-frame allocation and no BGR->RGB pass in Python. The fps
+filter also makes the frame cadence constant, so frame k is at start + k/F.
+
+If the caller also needs the original frames (Unusual_download writes them
+out), full_bgr=True adds a second full-resolution bgr24 output on its own
+pipe from the same decode (split filter).
+
+Usage:
+    from frame_source import FrameSource, probe
+    with FrameSource(path, start=60, duration=30) as src:
+        while src.read():
+            detector.process(src.frame)        # RGB, (h, w, 3) uint8, reused
+            t = src.time()
+
+Env:
+  FACE_DETECT_WIDTH   width of detection frames (default: 480; 0 = source width)
+"""
+
+import os
+import subprocess
+
+import numpy as np
+
+import media_probe
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+DETECT_WIDTH = int(os.environ.get("FACE_DETECT_WIDTH", "480"))
+
+
+# ------------------------------------------------------------------
+# Probe
+# ------------------------------------------------------------------
+def probe(path):
+    """{width, height, fps, duration, frames} of the first video stream (cached, media_probe.py)."""
+    info = media_probe.probe(path)
+    video = info["video"]
+    if not video:
+        raise RuntimeError(f"no video stream in {path}")
+    return {
+        "width": video["width"],
+        "height": video["height"],
+        "fps": video["fps"],
+        "duration": video["duration"] or info["duration"],
+        "frames": video["frames"],
+    }
+
+
+def _even(x):
+    return max(2, int(round(x / 2.0)) * 2)
+
+
+# ------------------------------------------------------------------
+# Frame source
+# ------------------------------------------------------------------
+class FrameSource:
+    """Constant-rate RGB frames from an ffmpeg pipe, read into a reused buffer."""
+
+    def __init__(self, path, width=DETECT_WIDTH, fps=None, start=0.0, duration=None,
+                 full_bgr=False, info=None):
+        info = info or probe(path)
+        self.path = path
+        self.fps = float(fps or info["fps"] or 30.0)
+        self.start = float(start or 0.0)
+        self.index = -1
+
+        src_w, src_h = info["width"], info["height"]
+        if width and width < src_w:
+            self.width, self.height = _even(width), _even(src_h * width / src_w)
+        else:
+            self.width, self.height = src_w, src_h
+        self.full_size = (src_w, src_h)
+
+        self.frame = np.empty((self.height, self.width, 3), np.uint8)
+        self._view = memoryview(self.frame).cast("B")
+        self.full = None
+
+        cmd = ["ffmpeg", "-v", "error", "-nostdin"]
+        if self.start > 0:
+            cmd += ["-ss", f"{self.start:.6f}"]
+        cmd += ["-i", path]
+        if duration is not None:
+            cmd += ["-t", f"{float(duration):.6f}"]
+        cmd += ["-an", "-sn", "-dn"]
+
+        rate = f"fps={self.fps!r}"
+        scale = f"scale={self.width}:{self.height}:flags=area"
+        pass_fds = ()
+        self._full_r = None
+        if full_bgr:
+            self.full = np.empty((src_h, src_w, 3), np.uint8)
+            self._full_view = memoryview(self.full).cast("B")
+            full_r, full_w = os.pipe()
+            pass_fds = (full_w,)
+            cmd += [
+                "-filter_complex",
+                f"[0:v]{rate},split=2[d][f];[d]{scale},format=rgb24[det];[f]format=bgr24[full]",
+                "-map", "[det]", "-f", "rawvideo", "pipe:1",
+                "-map", "[full]", "-f", "rawvideo", f"pipe:{full_w}",
+            ]
+        else:
+            cmd += ["-vf", f"{rate},{scale}", "-pix_fmt", "rgb24", "-f", "rawvideo", "pipe:1"]
+
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, pass_fds=pass_fds, bufsize=0)
+        if full_bgr:
+            os.close(full_w)
+            self._full_r = os.fdopen(full_r, "rb", buffering=0)
+
+    # ---------- reading ----------
+    @staticmethod
+    def _fill(stream, view):
+        got = 0
+        size = len(view)
+        while got < size:
+            n = stream.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def read(self):
+        """Load the next frame into self.frame (and self.full). False at end of stream."""
+        if not self._fill(self.proc.stdout, self._view):
+            return False
+        if self._full_r is not None and not self._fill(self._full_r, self._full_view):
+            return False
+        self.index += 1
+        return True
+
+    # Consuming a frame costs the same either way; kept for cv2-style call sites
+    grab = read
+
+    def time(self):
+        """Timestamp (seconds, source timeline) of the current frame."""
+        return self.start + self.index / self.fps
+
+    # ---------- lifecycle ----------
+    def close(self):
+        for stream in (self.proc.stdout, self._full_r):
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+gemini_cache.py
+---------------
+Content-addressed on-disk cache for Gemini text responses.
+
+The key is sha256 over (model, every prompt text, every file_uri + mime type,
+the generation config). A re-run of any stage after a crash therefore only
+pays for prompts that never succeeded; everything else is answered from the
+SQLite file in milliseconds without touching the quota.
+
+Entries expire after GEMINI_CACHE_TTL_DAYS and the file is trimmed back under
+GEMINI_CACHE_MAX_MB by evicting the least recently used rows. The workflows
+carry the SQLite file between runs with actions/cache (it is not committed:
+concurrent jobs would push conflicting binary versions). Only lookup-style
+prompts should go through it; generative ones (Unusual_category.py) call the
+client directly so a repeated prompt still gets a fresh answer.
+
+Usage (sync stages):
+    from gemini_cache import cached_generate_text
+    text = cached_generate_text(client, MODEL, contents, config)
+
+GeminiPool (gemini_pool.py) uses the same cache automatically.
+
+Env:
+  GEMINI_CACHE           "0" disables the cache (default 1)
+  GEMINI_CACHE_PATH      (default: Unuusual_memory/CACHE/gemini_responses.sqlite)
+  GEMINI_CACHE_TTL_DAYS  (default: 30)
+  GEMINI_CACHE_MAX_MB    (default: 50)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+CACHE_ENABLED = _truthy(os.environ.get("GEMINI_CACHE", "1"))
+CACHE_PATH    = os.environ.get("GEMINI_CACHE_PATH", "Unuusual_memory/CACHE/gemini_responses.sqlite")
+TTL_DAYS      = float(os.environ.get("GEMINI_CACHE_TTL_DAYS", "30"))
+MAX_MB        = float(os.environ.get("GEMINI_CACHE_MAX_MB", "50"))
+
+EVICT_EVERY_PUTS = 50  # run TTL/size eviction after this many writes
+
+
+# ------------------------------------------------------------------
+# Key derivation
+# ------------------------------------------------------------------
+def _get(obj, name):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+def _normalize_contents(contents):
+    """Reduce contents to plain (role, parts) data that hashes stably."""
+    if isinstance(contents, (str, dict)) or not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    out = []
+    for content in contents:
+        if isinstance(content, str):
+            out.append(["user", [["text", content]]])
+            continue
+        parts = []
+        for part in _get(content, "parts") or []:
+            text = _get(part, "text")
+            file_data = _get(part, "file_data")
+            if text is not None:
+                parts.append(["text", text])
+            if file_data is not None:
+                parts.append(["file", _get(file_data, "file_uri"), _get(file_data, "mime_type")])
+        out.append([_get(content, "role") or "user", parts])
+    return out
+
+def _normalize_config(config):
+    if config is None:
+        return None
+    if hasattr(config, "model_dump"):
+        return config.model_dump(exclude_none=True, mode="json")
+    return config
+
+def cache_key(model, contents, config=None) -> str:
+    payload = json.dumps(
+        [model, _normalize_contents(contents), _normalize_config(config)],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------------------
+# SQLite store
+# ------------------------------------------------------------------
+class ResponseCache:
+    """SQLite-backed text cache with TTL and size-based LRU eviction."""
+
+    def __init__(self, path=CACHE_PATH, ttl_days=TTL_DAYS, max_mb=MAX_MB):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._puts = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._db.commit()
+        self.evict()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            text, created = row
+            if self.ttl > 0 and now - created > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return text
+
+    def put(self, key, model, text):
+        if not text:
+            return  # never cache empty / failed answers
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, text, size, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, text, len(text.encode("utf-8")), now, now),
+            )
+            self._db.commit()
+            self._puts += 1
+        if self._puts % EVICT_EVERY_PUTS == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least-recently-used rows until under max size."""
+        with self._lock:
+            if self.ttl > 0:
+                self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if self.max_bytes > 0 and total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                freed = 0
+                doomed = []
+                for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used"):
+                    if total - freed <= target:
+                        break
+                    doomed.append((key,))
+                    freed += size
+                self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self._db.commit()
+
+
+_default_cache = None
+_default_pid = None
+
+def default_cache():
+    """Process-wide cache (reopened after fork), or None when disabled."""
+    global _default_cache, _default_pid
+    if not CACHE_ENABLED:
+        return None
+    if _default_cache is None or _default_pid != os.getpid():
+        _default_cache = ResponseCache()
+        _default_pid = os.getpid()
+    return _default_cache
+
+
+# ------------------------------------------------------------------
+# Sync helpers for stages that call the client directly
+# ------------------------------------------------------------------
+def cached_generate_text(client, model, contents, config=None, cache=None):
+    """client.models.generate_content(...).text, served from cache when possible."""
+    cache = cache or default_cache()
+    key = cache_key(model, contents, config) if cache else None
+    if cache:
+        hit = cache.get(key)
+        if hit is not None:
+            print(f"💾 Cache hit ({model})", flush=True)
+            return hit
+    response = client.models.generate_content(model=model, contents=contents, config=config)
+    text = getattr(response, "text", None) or ""
+    if cache:
+        cache.put(key, model, text)
+    return text
+
+def cached_stream_text(client, model, contents, config=None, cache=None):
+    """Concatenated text of generate_content_stream(...), served from cache when possible."""
+    cache = cache or default_cache()
+    key = cache_key(model, contents, config) if cache else None
+    if cache:
+        hit = cache.get(key)
+        if hit is not None:
+            print(f"💾 Cache hit ({model})", flush=True)
+            return hit
+    text = ""
+    for chunk in client.models.generate_content_stream(model=model, contents=contents, config=config):
+        text += chunk.text or ""
+    if cache:
+        cache.put(key, model, text)
+    return text
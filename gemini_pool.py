@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+gemini_pool.py
+--------------
+Shared asyncio dispatcher for Gemini calls.
+
+Keeps ONE long-lived genai.Client per API key and, for every (key, model)
+pair, two token buckets: requests/minute and tokens/minute. A request is
+sent to whichever key can serve it soonest, so stages no longer need fixed
+sleeps (time.sleep(61), REQUEST_INTERVAL, WAIT_BETWEEN_FILES) between calls;
+they just submit everything and the buckets pace it to the real quota.
+
+Text results are also looked up in / written to the response cache
+(gemini_cache.py), so re-runs only spend quota on prompts that never
+succeeded.
+
+Usage:
+    from gemini_pool import GeminiPool
+
+    async def main():
+        pool = GeminiPool()
+        texts = await asyncio.gather(*(pool.generate_text(MODEL, c) for c in jobs))
+
+    asyncio.run(main())
+
+Env:
+  GEMINI_API .. GEMINI_API5  API keys (at least one required)
+  GEMINI_RPM                 override requests/minute per key (all models)
+  GEMINI_TPM                 override tokens/minute per key (all models)
+  GEMINI_MAX_IN_FLIGHT       max concurrent requests per key (default 4)
+  GEMINI_FILE_TOKENS         token estimate for a file_data part (default 20000)
+  VERBOSE                    "1" for extra logs
+"""
+
+import os
+import time
+import asyncio
+from google import genai
+from gemini_cache import cache_key, default_cache
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+KEY_ENV_VARS = ["GEMINI_API", "GEMINI_API2", "GEMINI_API3", "GEMINI_API4", "GEMINI_API5"]
+
+# Free-tier budgets per key: (requests/minute, tokens/minute)
+MODEL_LIMITS = {
+    "gemini-2.0-flash":             (15, 1_000_000),
+    "gemini-2.5-flash":             (10,   250_000),
+    "gemini-flash-latest":          (10,   250_000),
+    "gemini-2.5-pro":               (5,    250_000),
+    "gemini-2.5-flash-preview-tts": (3,     10_000),
+}
+DEFAULT_LIMITS = (10, 250_000)
+
+RPM_OVERRIDE      = int(os.environ.get("GEMINI_RPM", "0"))
+TPM_OVERRIDE      = int(os.environ.get("GEMINI_TPM", "0"))
+MAX_IN_FLIGHT     = int(os.environ.get("GEMINI_MAX_IN_FLIGHT", "4"))
+FILE_PART_TOKENS  = int(os.environ.get("GEMINI_FILE_TOKENS", "20000"))
+VERBOSE           = os.environ.get("VERBOSE") == "1"
+
+MAX_RETRIES        = 5
+RETRY_DELAY        = 5    # seconds, after a non-quota error
+RATE_LIMIT_COOLDOWN = 60  # seconds a key is parked after a 429
+POLL_INTERVAL      = 1.0  # max seconds between capacity checks
+IN_FLIGHT_POLL     = 0.1  # re-check interval while a key is at MAX_IN_FLIGHT
+
+def log(msg):
+    print(msg, flush=True)
+
+def vlog(msg):
+    if VERBOSE:
+        log(msg)
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def load_api_keys(env_vars=KEY_ENV_VARS):
+    """Read GEMINI_API* keys from the environment, dropping empty ones."""
+    keys = [os.environ.get(v) for v in env_vars]
+    keys = [k for k in keys if k]
+    if not keys:
+        raise ValueError("❌ No valid GEMINI_API keys found.")
+    return keys
+
+def model_limits(model):
+    rpm, tpm = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+    return (RPM_OVERRIDE or rpm), (TPM_OVERRIDE or tpm)
+
+def _iter_parts(contents):
+    """Yield parts from types.Content objects, plain dicts or bare strings."""
+    if isinstance(contents, (str, dict)) or not isinstance(contents, (list, tuple)):
+        contents = [contents]
+    for content in contents:
+        if isinstance(content, str):
+            yield {"text": content}
+            continue
+        parts = content.get("parts") if isinstance(content, dict) else getattr(content, "parts", None)
+        for part in parts or []:
+            yield part
+
+def estimate_tokens(contents) -> int:
+    """Rough prompt size: ~4 chars per token, fixed cost per attached file."""
+    total = 0
+    for part in _iter_parts(contents):
+        if isinstance(part, dict):
+            text, file_data = part.get("text"), part.get("file_data")
+        else:
+            text, file_data = getattr(part, "text", None), getattr(part, "file_data", None)
+        if text:
+            total += len(text) // 4 + 1
+        if file_data:
+            total += FILE_PART_TOKENS
+    return max(total, 1)
+
+def _is_rate_limit(e) -> bool:
+    if getattr(e, "code", None) == 429:
+        return True
+    s = str(e)
+    return "429" in s or "RESOURCE_EXHAUSTED" in s
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage else None
+
+
+# ------------------------------------------------------------------
+# Token bucket
+# ------------------------------------------------------------------
+class TokenBucket:
+    """Continuous-refill bucket holding at most `capacity` units per `period` seconds."""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """Correct an earlier estimate; may go negative to pay back overspend."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+# ------------------------------------------------------------------
+# Key slot
+# ------------------------------------------------------------------
+class _KeySlot:
+    def __init__(self, index, key):
+        self.index = index
+        self.key = key
+        self.client = genai.Client(api_key=key)
+        self.buckets = {}        # model -> (rpm_bucket, tpm_bucket)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+    def _buckets(self, model):
+        if model not in self.buckets:
+            rpm, tpm = model_limits(model)
+            self.buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return self.buckets[model]
+
+    def delay_for(self, model, tokens) -> float:
+        if self.in_flight >= MAX_IN_FLIGHT:
+            return IN_FLIGHT_POLL
+        rpm, tpm = self._buckets(model)
+        cooldown = self.cooldown_until - time.monotonic()
+        return max(0.0, cooldown, rpm.delay_for(1), tpm.delay_for(tokens))
+
+    def reserve(self, model, tokens):
+        rpm, tpm = self._buckets(model)
+        rpm.take(1)
+        tpm.take(tokens)
+        self.in_flight += 1
+
+    def settle(self, model, estimated, actual):
+        if actual is not None:
+            self._buckets(model)[1].adjust(actual - estimated)
+
+    def cool_down(self, seconds):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+
+# ------------------------------------------------------------------
+# Pool
+# ------------------------------------------------------------------
+class GeminiPool:
+    """Dispatches Gemini requests across keys, respecting per-key RPM/TPM."""
+
+    def __init__(self, keys=None, max_retries=MAX_RETRIES, cache=None):
+        self.slots = [_KeySlot(i, k) for i, k in enumerate(keys or load_api_keys())]
+        self.max_retries = max_retries
+        self.cache = cache or default_cache()
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self.slots)
+
+    async def _acquire(self, model, tokens):
+        while True:
+            async with self._lock:
+                slot = min(self.slots, key=lambda s: (s.delay_for(model, tokens), s.in_flight))
+                delay = slot.delay_for(model, tokens)
+                if delay <= 0:
+                    slot.reserve(model, tokens)
+                    return slot
+            vlog(f"  [pool] all keys busy for {model}; waiting {delay:.1f}s")
+            await asyncio.sleep(min(delay, POLL_INTERVAL))
+
+    async def _call(self, model, contents, config, est_tokens, label, timeout, request):
+        tokens = est_tokens or estimate_tokens(contents)
+        last_error = None
+        for attempt in range(1, self.max_retries + 1):
+            slot = await self._acquire(model, tokens)
+            try:
+                result, used = await asyncio.wait_for(request(slot.client), timeout)
+                slot.settle(model, tokens, used)
+                vlog(f"  [pool] {label} ok on API#{slot.index + 1} ({used or tokens} tokens)")
+                return result, slot.index
+            except Exception as e:
+                last_error = e
+                log(f"🔁 Attempt {attempt}/{self.max_retries}: API#{slot.index + 1} failed on {label} => {e!r}")
+                if _is_rate_limit(e):
+                    slot.cool_down(RATE_LIMIT_COOLDOWN)
+                elif attempt < self.max_retries:
+                    await asyncio.sleep(RETRY_DELAY)
+            finally:
+                slot.in_flight -= 1
+        raise RuntimeError(f"❌ All {self.max_retries} attempts failed for {label}") from last_error
+
+    async def generate(self, model, contents, config=None, est_tokens=None, label="request", timeout=None):
+        """Return the raw GenerateContentResponse."""
+        async def request(client):
+            response = await client.aio.models.generate_content(
+                model=model, contents=contents, config=config
+            )
+            return response, _usage_tokens(response)
+
+        response, _ = await self._call(model, contents, config, est_tokens, label, timeout, request)
+        return response
+
+    def _cached(self, model, contents, config, label):
+        if not self.cache:
+            return None, None
+        key = cache_key(model, contents, config)
+        hit = self.cache.get(key)
+        if hit is not None:
+            log(f"💾 Cache hit for {label}")
+        return key, hit
+
+    async def generate_text(self, model, contents, config=None, est_tokens=None, label="request", timeout=None):
+        """Return response.text ('' if the model returned no text)."""
+        key, hit = self._cached(model, contents, config, label)
+        if hit is not None:
+            return hit
+        response = await self.generate(model, contents, config, est_tokens, label, timeout)
+        text = response.text or ""
+        if key:
+            self.cache.put(key, model, text)
+        return text
+
+    async def stream_text(self, model, contents, config=None, est_tokens=None, label="request", timeout=None):
+        """Stream a response and return the concatenated text."""
+        key, hit = self._cached(model, contents, config, label)
+        if hit is not None:
+            return hit
+
+        async def request(client):
+            text, used = "", None
+            async for chunk in await client.aio.models.generate_content_stream(
+                model=model, contents=contents, config=config
+            ):
+                text += chunk.text or ""
+                used = _usage_tokens(chunk) or used
+            return text, used
+
+        text, _ = await self._call(model, contents, config, est_tokens, label, timeout, request)
+        if key:
+            self.cache.put(key, model, text)
+        return text
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+media_probe.py
+--------------
+One cached ffprobe per media file for every script that needs durations,
+resolutions, frame rates or audio formats (Unusual_audioconc*.py,
+Unusual_overlay.py, frame_source.py, smart_cut.py, the Lesson_*_ffmpeg.py
+renderers).
+
+probe() runs `ffprobe -show_format -show_streams` once and condenses it into
+
+    {duration, format, bit_rate, size,
+     video: {codec, width, height, fps, pix_fmt, frames} | None,
+     audio: {codec, sample_rate, channels, channel_layout, sample_fmt, bits} | None,
+     streams: [{index, type, codec}, ...],
+     keyframes: <count> (only when asked for: reads every packet header)}
+
+Results are memoized in-process and on disk (SQLite) under (path, size,
+mtime), so a file that has not changed is never probed twice. probe_dir()
+probes a whole folder (probe_files() a list of paths) with a thread pool.
+
+Usage:
+    import media_probe
+    media_probe.duration("Unuusual_memory/AUDIO_REAL/group_1.wav")
+    w, h = media_probe.video_size("Final_Videos/group_1.mp4")
+    infos = media_probe.probe_dir("Final_Videos", exts=(".mp4",))
+
+    python media_probe.py <file or folder> [...]     # print probe JSON
+
+Env:
+  MEDIA_PROBE_CACHE   "0" disables the on-disk cache (default 1)
+  MEDIA_PROBE_PATH    (default: Unuusual_memory/CACHE/media_probe.sqlite)
+  MEDIA_PROBE_JOBS    parallel ffprobe processes in probe_dir / probe_files (default: 8)
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+import subprocess
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+CACHE_ENABLED = _truthy(os.environ.get("MEDIA_PROBE_CACHE", "1"))
+CACHE_PATH    = os.environ.get("MEDIA_PROBE_PATH", "Unuusual_memory/CACHE/media_probe.sqlite")
+JOBS          = int(os.environ.get("MEDIA_PROBE_JOBS", "8"))
+
+
+class ProbeError(RuntimeError):
+    pass
+
+
+# ------------------------------------------------------------------
+# ffprobe
+# ------------------------------------------------------------------
+def _rate(value):
+    try:
+        rate = Fraction(value or "0/1")
+    except (ValueError, ZeroDivisionError):
+        return None
+    return float(rate) if rate > 0 else None
+
+def _num(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+def _run_ffprobe(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise ProbeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+    data = json.loads(result.stdout or "{}")
+    fmt = data.get("format") or {}
+    streams = data.get("streams") or []
+
+    info = {
+        "duration": _num(fmt.get("duration")),
+        "format": fmt.get("format_name"),
+        "bit_rate": _num(fmt.get("bit_rate"), int),
+        "size": _num(fmt.get("size"), int),
+        "video": None,
+        "audio": None,
+        "streams": [{"index": s.get("index"), "type": s.get("codec_type"), "codec": s.get("codec_name")}
+                    for s in streams],
+    }
+    for s in streams:
+        kind = s.get("codec_type")
+        if kind == "video" and info["video"] is None and not (s.get("disposition") or {}).get("attached_pic"):
+            fps = _rate(s.get("avg_frame_rate")) or _rate(s.get("r_frame_rate"))
+            frames = _num(s.get("nb_frames"), int)
+            duration = _num(s.get("duration")) or info["duration"]
+            if frames is None and duration and fps:
+                frames = int(round(duration * fps))
+            info["video"] = {
+                "codec": s.get("codec_name"),
+                "width": _num(s.get("width"), int),
+                "height": _num(s.get("height"), int),
+                "fps": fps,
+                "pix_fmt": s.get("pix_fmt"),
+                "frames": frames,
+                "duration": duration,
+            }
+        elif kind == "audio" and info["audio"] is None:
+            info["audio"] = {
+                "codec": s.get("codec_name"),
+                "sample_rate": _num(s.get("sample_rate"), int),
+                "channels": _num(s.get("channels"), int),
+                "channel_layout": s.get("channel_layout"),
+                "sample_fmt": s.get("sample_fmt"),
+                "bits": _num(s.get("bits_per_sample"), int) or _num(s.get("bits_per_raw_sample"), int),
+                "duration": _num(s.get("duration")) or info["duration"],
+            }
+    if info["duration"] is None:
+        for part in (info["video"], info["audio"]):
+            if part and part.get("duration"):
+                info["duration"] = part["duration"]
+                break
+    return info
+
+def _count_keyframes(path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=flags", "-of", "csv=p=0", path],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise ProbeError(f"ffprobe failed for {path}: {result.stderr.strip()}")
+    return sum(1 for line in result.stdout.splitlines() if "K" in line)
+
+
+# ------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------
+class ProbeCache:
+    """(path, size, mtime) -> probe dict, in memory and in SQLite."""
+
+    def __init__(self, path=CACHE_PATH, persist=CACHE_ENABLED):
+        self._mem = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if persist:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime INTEGER NOT NULL,"
+                " info TEXT NOT NULL,"
+                " PRIMARY KEY (path, size, mtime))"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._mem:
+                return self._mem[key]
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT info FROM probes WHERE path = ? AND size = ? AND mtime = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            info = json.loads(row[0])
+            self._mem[key] = info
+            return info
+
+    def put(self, key, info):
+        with self._lock:
+            self._mem[key] = info
+            if self._db is not None:
+                # Older stamps of the same path are stale now
+                self._db.execute("DELETE FROM probes WHERE path = ?", (key[0],))
+                self._db.execute("INSERT INTO probes (path, size, mtime, info) VALUES (?, ?, ?, ?)",
+                                 (*key, json.dumps(info)))
+                self._db.commit()
+
+
+_cache = None
+_cache_pid = None
+
+def default_cache():
+    """Process-wide ProbeCache (reopened after fork)."""
+    global _cache, _cache_pid
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = ProbeCache()
+        _cache_pid = os.getpid()
+    return _cache
+
+def _key(path):
+    st = os.stat(path)
+    return (os.path.normpath(path), st.st_size, st.st_mtime_ns)
+
+
+# ------------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------------
+def probe(path, keyframes=False, cache=None):
+    """Condensed ffprobe info for `path` (see module docstring); ProbeError on failure."""
+    cache = cache or default_cache()
+    try:
+        key = _key(path)
+    except OSError as e:
+        raise ProbeError(f"cannot stat {path}: {e}") from e
+
+    info = cache.get(key)
+    if info is None:
+        info = _run_ffprobe(path)
+        if keyframes and info["video"]:
+            info["keyframes"] = _count_keyframes(path)
+        cache.put(key, info)
+    elif keyframes and info["video"] and "keyframes" not in info:
+        info = dict(info, keyframes=_count_keyframes(path))
+        cache.put(key, info)
+    return info
+
+def duration(path):
+    """Container duration in seconds."""
+    d = probe(path)["duration"]
+    if d is None:
+        raise ProbeError(f"no duration for {path}")
+    return d
+
+def video_size(path):
+    """(width, height) of the first video stream."""
+    video = probe(path)["video"]
+    if not video or not video["width"] or not video["height"]:
+        raise ProbeError(f"no video stream in {path}")
+    return video["width"], video["height"]
+
+def has_audio(path):
+    return probe(path)["audio"] is not None
+
+def probe_dir(folder, exts=None, jobs=JOBS, keyframes=False):
+    """{path: info} for the files in `folder` (matching exts), probed in parallel; failures map to None."""
+    names = sorted(os.listdir(folder))
+    if exts:
+        names = [n for n in names if n.lower().endswith(tuple(e.lower() for e in exts))]
+    paths = [os.path.join(folder, n) for n in names if os.path.isfile(os.path.join(folder, n))]
+    return probe_files(paths, jobs, keyframes)
+
+def probe_files(paths, jobs=JOBS, keyframes=False):
+    """{path: info} for `paths`, probed in parallel; failures map to None."""
+    def one(path):
+        try:
+            return probe(path, keyframes=keyframes)
+        except ProbeError as e:
+            print(f"⚠️ {e}", file=sys.stderr, flush=True)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        return dict(zip(paths, ex.map(one, paths)))
+
+
+if __name__ == "__main__":
+    results = {}
+    for target in sys.argv[1:]:
+        if os.path.isdir(target):
+            results.update(probe_dir(target))
+        else:
+            results[target] = probe(target)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+-----------
+Incremental runner for the Unusual_* gadget pipeline.
+
+Every stage declares the paths it reads and writes. A stage is rebuilt only
+when the content hash of its inputs (plus its own script) differs from the
+last successful run, or when its outputs are missing. Stages whose inputs
+are ready run concurrently (e.g. RATING and DURATION both start as soon as
+Relevant is done).
+
+Per-group stages go further: input files are bucketed by the group they
+belong to (`group_7.txt`, `7(c)_slug.txt`, `group_1_to_11.wav` ...), and if
+only some groups changed the stage is run with PIPELINE_GROUPS=<n,n,...>, so
+editing one product's script re-renders that group and not all 33. Scripts
+honour it via selected_groups() / want_file().
+
+File hashes are cached on (path, size, mtime), so unchanged videos are not
+re-read on every run.
+
+Usage:
+    python pipeline.py                  # bring everything up to date
+    python pipeline.py qualify          # qualify and whatever it depends on
+    python pipeline.py --only tts       # just that stage
+    python pipeline.py --dry-run        # show what would run
+    python pipeline.py --force script   # ignore fingerprints
+
+Env:
+  PIPELINE_JOBS        stages run at once (default: 3)
+  PIPELINE_STATE_PATH  (default: Unuusual_memory/CACHE/pipeline.sqlite)
+  PIPELINE_GROUPS      set BY the runner for per-group stages
+  PIPELINE_FACE        local | gemini (default: local)
+                         local   Unusual_download.py finds the face-free frames of
+                                 Processed_Vid in one decode and writes NO_FACE
+                                 plus No_Face_Videos itself
+                         gemini  Unusual_face.py timelines from the YouTube links,
+                                 cut by Unusual_conc.py
+  VERBOSE              "1" for extra logs
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+BASE_DIR    = "Unuusual_memory"
+STATE_PATH  = os.environ.get("PIPELINE_STATE_PATH", os.path.join(BASE_DIR, "CACHE", "pipeline.sqlite"))
+JOBS        = int(os.environ.get("PIPELINE_JOBS", "3"))
+VERBOSE     = os.environ.get("VERBOSE") == "1"
+FACE_MODE   = os.environ.get("PIPELINE_FACE", "local").strip().lower()
+
+def log(msg):
+    print(msg, flush=True)
+
+def vlog(msg):
+    if VERBOSE:
+        log(msg)
+
+def err(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+def mem(*parts):
+    return os.path.join(BASE_DIR, *parts)
+
+
+# ------------------------------------------------------------------
+# Group helpers (also imported by the stage scripts)
+# ------------------------------------------------------------------
+_range_re = re.compile(r'group_(\d+)_to_(\d+)', re.IGNORECASE)
+_group_re = re.compile(r'group_(\d+)', re.IGNORECASE)
+_lead_re  = re.compile(r'^\s*(\d+)\s*[(_]')
+
+def groups_in(name: str) -> set:
+    """Group numbers a file belongs to; empty set = shared by all groups."""
+    name = os.path.basename(name)
+    m = _range_re.search(name)
+    if m:
+        return set(range(int(m.group(1)), int(m.group(2)) + 1))
+    m = _group_re.search(name) or _lead_re.match(name)
+    return {int(m.group(1))} if m else set()
+
+def selected_groups():
+    """Groups the runner asked this stage to rebuild, or None for all."""
+    raw = os.environ.get("PIPELINE_GROUPS", "").strip()
+    if not raw:
+        return None
+    return {int(g) for g in raw.split(",") if g.strip().isdigit()}
+
+def want_file(name: str) -> bool:
+    """True if `name` should be (re)processed in this run."""
+    wanted = selected_groups()
+    if wanted is None:
+        return True
+    groups = groups_in(name)
+    return not groups or bool(groups & wanted)
+
+
+# ------------------------------------------------------------------
+# Stage declarations
+# ------------------------------------------------------------------
+class Stage:
+    def __init__(self, name, script=None, inputs=(), outputs=(), per_group=False, run=None):
+        self.name = name
+        self.script = script          # python file run as a subprocess
+        self.run = run                # or an in-process callable(groups)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.per_group = per_group
+
+    def __repr__(self):
+        return f"<Stage {self.name}>"
+
+
+def extract_no_face(groups=None):
+    """FACE DETECTION/<qualified file> 'No face' lines -> NO_FACE/group_N.txt (timestamps only)."""
+    qualified = mem("QUALIFY", "qualified.txt")
+    os.makedirs(mem("NO_FACE"), exist_ok=True)
+    line_re = re.compile(r'^(\d{2}:\d{2}-\d{2}:\d{2}): No face')
+    with open(qualified, "r", encoding="utf-8") as f:
+        for line in f:
+            m = re.match(r'^Group (\d+):\s*(.+)$', line.strip())
+            if not m or (groups is not None and int(m.group(1)) not in groups):
+                continue
+            face_file = mem("FACE DETECTION", m.group(2))
+            if not os.path.isfile(face_file):
+                log(f"⚠️ File not found: {face_file}")
+                continue
+            with open(face_file, "r", encoding="utf-8", errors="ignore") as src:
+                spans = [lm.group(1) for lm in map(line_re.match, src) if lm]
+            with open(mem("NO_FACE", f"group_{m.group(1)}.txt"), "w", encoding="utf-8") as out:
+                out.write("".join(s + "\n" for s in spans))
+
+
+VIDEO_EXTS = (".mp4", ".mkv", ".webm", ".mov", ".m4v")
+
+def strip_audio(groups=None):
+    """Vid/group_N.<ext> -> Processed_Vid/group_N.mp4, video stream copied, audio dropped."""
+    os.makedirs("Processed_Vid", exist_ok=True)
+    for name in sorted(os.listdir("Vid")) if os.path.isdir("Vid") else []:
+        base, ext = os.path.splitext(name)
+        if ext.lower() not in VIDEO_EXTS or not _group_re.fullmatch(base):
+            continue    # filter_result.txt, .part / .fNNN.* leftovers
+        if groups is not None and not (groups_in(name) & groups):
+            continue
+        log(f"🔇 {name} -> Processed_Vid/{base}.mp4")
+        subprocess.run(["ffmpeg", "-y", "-v", "error", "-i", os.path.join("Vid", name),
+                        "-map", "0:v:0", "-c:v", "copy", "-an", os.path.join("Processed_Vid", base + ".mp4")],
+                       check=True)
+
+def write_relevant_links(groups=None):
+    """Relevant_links/<n>_<slug>.txt: the URLs of the product's relevant slots, in slot order."""
+    from catalog import Catalog
+    cat = Catalog()
+    try:
+        cat.sync()
+        per_file = {}
+        for group_num, slot, slug, url, _ in cat.relevant_candidates():
+            if groups is None or group_num in groups:
+                per_file.setdefault(f"{group_num}_{slug}.txt", []).append(url)
+    finally:
+        cat.close()
+    os.makedirs(mem("Relevant_links"), exist_ok=True)
+    for name, urls in per_file.items():
+        with open(mem("Relevant_links", name), "w", encoding="utf-8") as out:
+            out.write("\n".join(urls) + "\n")
+
+
+if FACE_MODE == "gemini":
+    FACE_STAGES = [
+        Stage("face",    "Unusual_face.py",           [mem("Relevant_links")],                  [mem("FACE DETECTION")]),
+        Stage("no_face", None, [mem("QUALIFY"), mem("FACE DETECTION")], [mem("NO_FACE")], run=extract_no_face),
+        Stage("conc",    "Unusual_conc.py",           [mem("NO_FACE"), "Processed_Vid"],        ["No_Face_Videos"], per_group=True),
+    ]
+else:
+    # One decode per video: detection, face-free encode, NO_FACE intervals
+    FACE_STAGES = [
+        Stage("noface",  "Unusual_download.py",       ["Processed_Vid"],                        [mem("NO_FACE"), "No_Face_Videos"],
+              per_group=True),
+    ]
+
+STAGES = [
+    Stage("links",       "Unusual_links.py",          ["CATEGORY/Products_temp.txt"],           [mem("Links")]),
+    Stage("desc",        "Unusual_desc.py",           [mem("Links")],                           [mem("DESCR")]),
+    Stage("relevant",    "Unusual_links_relevant.py", [mem("DESCR")],                           [mem("Relevant")]),
+    Stage("rating",      "Unusual_rating.py",         [mem("Relevant"), mem("Links")],          [mem("RATING")]),
+    Stage("duration",    "Unusual_duration.py",       [mem("Relevant"), mem("Links")],          [mem("DURATION")]),
+    Stage("qualify",     "Unusual_qualify.py",        [mem("RATING"), mem("DURATION")],         [mem("QUALIFY")]),
+    Stage("relevant_links", None, [mem("Links"), mem("Relevant")], [mem("Relevant_links")], per_group=True,
+          run=write_relevant_links),
+    Stage("download",    "Unusual_download3.py",      [mem("QUALIFY"), mem("Links")],           ["Vid"]),
+    Stage("strip_audio", None,                        ["Vid"],                                  ["Processed_Vid"], per_group=True,
+          run=strip_audio),
+    Stage("description", "Unusual_descreption.py",    [mem("QUALIFY"), mem("Links")],           [mem("DESCREPTION")]),
+    Stage("script",      "Unusual_script.py",         [mem("DESCREPTION")],                     [mem("SCRIPT")], per_group=True),
+    Stage("tts",         "Unusual_tts.py",            [mem("SCRIPT")],                          [mem("AUDIO")], per_group=True),
+    Stage("trans",       "Unusual_trans.py",          [mem("AUDIO")],                           [mem("TRANSCRIPT")]),
+    Stage("timeline",    "Unusual_timeline.py",       [mem("SCRIPT"), mem("AUDIO"), mem("TRANSCRIPT")], [mem("TIMELINE")], per_group=True),
+    Stage("audio_real",  "Unusual_audio_real.py",     [mem("AUDIO"), mem("TIMELINE")],          [mem("AUDIO_REAL")], per_group=True),
+    Stage("top",         "Unusual_top.py",            [mem("SCRIPT")],                          [mem("TOP_GDG")]),
+    Stage("intro_outro", "Intro_outro.py",            [mem("TOP_GDG")],                         [mem("INTR0,OUTRO")]),
+    Stage("intro_audio", "intor,ourto_audio.py",      [mem("INTR0,OUTRO")],                     [mem("Intro,ourto_audio")]),
+    *FACE_STAGES,
+    Stage("audioconc",   "Unusual_audioconc.py",
+          ["No_Face_Videos", mem("AUDIO_REAL"), mem("Intro,ourto_audio")],                      ["Final_Videos"], per_group=True),
+    Stage("overlay",     "Unusual_overlay.py",        ["Final_Videos"],                         ["Overlayed_Videos"]),
+    Stage("stitch",      "Unusual_stitch.py",         ["Final_Videos", mem("TOP_GDG")],         ["Final_Upload"]),
+]
+
+
+def _overlaps(a, b):
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+def upstream(stage, stages=STAGES):
+    """Stages whose outputs feed `stage`."""
+    return [s for s in stages if s is not stage
+            and any(_overlaps(o, i) for o in s.outputs for i in stage.inputs)]
+
+
+# ------------------------------------------------------------------
+# State / fingerprints
+# ------------------------------------------------------------------
+class State:
+    def __init__(self, path=STATE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path   TEXT PRIMARY KEY,
+                size   INTEGER NOT NULL,
+                mtime  REAL NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stage_runs (
+                stage       TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                global_fp   TEXT NOT NULL,
+                group_fps   TEXT NOT NULL,
+                finished_at REAL NOT NULL
+            );
+        """)
+
+    def file_hash(self, path):
+        st = os.stat(path)
+        with self._lock:
+            row = self.db.execute(
+                "SELECT size, mtime, sha256 FROM file_hashes WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime, digest),
+            )
+            self.db.commit()
+        return digest
+
+    def last_run(self, stage):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT fingerprint, global_fp, group_fps FROM stage_runs WHERE stage = ?", (stage,)
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def record(self, stage, fp):
+        total, global_fp, group_fps = fp
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO stage_runs (stage, fingerprint, global_fp, group_fps, finished_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (stage, total, global_fp, json.dumps(group_fps, sort_keys=True), time.time()),
+            )
+            self.db.commit()
+
+
+def _iter_files(path):
+    if os.path.isfile(path):
+        yield path
+    elif os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                if not name.startswith("."):
+                    yield os.path.join(root, name)
+
+def fingerprint(stage, state):
+    """(total, global_fp, {group: fp}) over the stage's script + input contents."""
+    shared = hashlib.sha256()
+    per_group = {}
+    if stage.script:
+        shared.update(f"script:{state.file_hash(stage.script)}\n".encode())
+    for inp in stage.inputs:
+        for path in _iter_files(inp):
+            line = f"{path}:{state.file_hash(path)}\n".encode()
+            groups = groups_in(path) if stage.per_group else set()
+            if not groups:
+                shared.update(line)
+            for g in groups:
+                per_group.setdefault(g, hashlib.sha256()).update(line)
+    global_fp = shared.hexdigest()
+    group_fps = {str(g): h.hexdigest() for g, h in sorted(per_group.items())}
+    total = hashlib.sha256(
+        (global_fp + json.dumps(group_fps, sort_keys=True)).encode()
+    ).hexdigest()
+    return total, global_fp, group_fps
+
+def _outputs_present(stage):
+    return all(next(_iter_files(o), None) is not None for o in stage.outputs)
+
+def plan(stage, state, force=False):
+    """('skip' | 'all' | 'groups', groups or None, fingerprint)."""
+    fp = fingerprint(stage, state)
+    prev = None if force else state.last_run(stage.name)
+    if prev is None or not _outputs_present(stage):
+        return "all", None, fp
+    if prev[0] == fp[0]:
+        return "skip", None, fp
+    if stage.per_group and prev[1] == fp[1]:
+        changed = sorted(int(g) for g, h in fp[2].items() if prev[2].get(g) != h)
+        if not changed:
+            return "skip", None, fp  # only groups removed
+        return "groups", changed, fp
+    return "all", None, fp
+
+
+# ------------------------------------------------------------------
+# Runner
+# ------------------------------------------------------------------
+def run_stage(stage, state, force=False, dry_run=False):
+    mode, groups, fp = plan(stage, state, force)
+    if mode == "skip":
+        log(f"⏭️  {stage.name}: up to date")
+        return True
+    what = f"groups {','.join(map(str, groups))}" if groups else "all"
+    if dry_run:
+        log(f"📝 {stage.name}: would rebuild ({what})")
+        return True
+
+    log(f"🚀 {stage.name}: rebuilding ({what})")
+    t0 = time.time()
+    try:
+        if stage.run:
+            stage.run(set(groups) if groups else None)
+        else:
+            env = dict(os.environ)
+            env.pop("PIPELINE_GROUPS", None)
+            if groups:
+                env["PIPELINE_GROUPS"] = ",".join(map(str, groups))
+            subprocess.run([sys.executable, "-u", stage.script], env=env, check=True)
+    except Exception as e:
+        err(f"❌ {stage.name} failed after {time.time() - t0:.0f}s: {e}")
+        return False
+
+    state.record(stage.name, fp)
+    log(f"✅ {stage.name}: done in {time.time() - t0:.0f}s")
+    return True
+
+def select(targets, only=False, stages=STAGES):
+    """Targets plus (unless `only`) everything upstream of them, in declaration order."""
+    by_name = {s.name: s for s in stages}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"❌ Unknown stage(s): {', '.join(unknown)} (have: {', '.join(by_name)})")
+    if not targets:
+        return list(stages)
+    wanted = {by_name[t] for t in targets}
+    if not only:
+        todo = list(wanted)
+        while todo:
+            for up in upstream(todo.pop(), stages):
+                if up not in wanted:
+                    wanted.add(up)
+                    todo.append(up)
+    return [s for s in stages if s in wanted]
+
+def run(selected, jobs=JOBS, force=False, dry_run=False):
+    state = State()
+    deps = {s: [u for u in upstream(s) if u in selected] for s in selected}
+    done, failed, running = set(), set(), {}
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        while len(done) + len(failed) < len(selected):
+            for s in selected:
+                if s in done or s in failed or s in running.values():
+                    continue
+                if any(d in failed for d in deps[s]):
+                    log(f"⛔ {s.name}: skipped, upstream failed")
+                    failed.add(s)
+                elif all(d in done for d in deps[s]):
+                    running[ex.submit(run_stage, s, state, force, dry_run)] = s
+            if not running:
+                continue
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                s = running.pop(fut)
+                (done if fut.result() else failed).add(s)
+
+    log(f"\n=== Pipeline: {len(done)} ok, {len(failed)} failed ===")
+    return not failed
+
+
+# ------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------
+def main():
+    ap = argparse.ArgumentParser(description="Incremental Unusual_* pipeline runner")
+    ap.add_argument("stages", nargs="*", help="target stages (default: all)")
+    ap.add_argument("--only", action="store_true", help="do not pull in upstream stages")
+    ap.add_argument("--force", action="store_true", help="rebuild regardless of fingerprints")
+    ap.add_argument("--dry-run", action="store_true", help="only print what would run")
+    ap.add_argument("--jobs", type=int, default=JOBS)
+    args = ap.parse_args()
+
+    selected = select(args.stages, args.only)
+    log(f"Stages: {', '.join(s.name for s in selected)}")
+    ok = run(selected, args.jobs, args.force, args.dry_run)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+script_align.py
+---------------
+Local forced alignment of a known script against a word-level transcript.
+
+The transcript of a batch WAV (Unusual_trans.py) holds the voice-over of
+several groups back to back; locate() finds where one group's script starts
+and ends in it. Both sides are normalised to lowercase word tokens
+(punctuation dropped, hyphenated words split), then a semi-global
+edit-distance DP aligns the whole script against a free-ended stretch of
+the transcript:
+
+  - substitution costs 1 - similarity(a, b) (Levenshtein ratio), so
+    ASR spellings such as "EcoVax" / "ECOVACS" still match,
+  - one token may match 2-3 joined tokens on the other side
+    ("homerunPET" / "Home Run Pet"),
+  - a skipped script or transcript word costs 1,
+  - transcript words before and after the script are free.
+
+To keep the DP small the search is first narrowed to the transcript window
+with the most exact token hits. Everything is deterministic and local; a
+batch of groups aligns in milliseconds.
+
+Transcript lines understood:
+    HH:MM:SS[.mmm]-HH:MM:SS[.mmm]: word      (Unusual_trans.py)
+    0.00 --> 0.36 : word                     (tra.py)
+
+Usage:
+    import script_align
+    words = script_align.read_transcript("Unuusual_memory/TRANSCRIPT/group_1_to_11.txt")
+    match = script_align.locate(script_text, words)
+    if match:
+        print(match.start, match.end, match.score)
+"""
+
+import re
+from functools import lru_cache
+from collections import Counter, namedtuple
+
+Word  = namedtuple("Word", "text start end")
+Match = namedtuple("Match", "start end first last score")   # first/last: transcript word indices
+
+MIN_SIMILARITY = 0.5    # below this a substitution counts as a mismatch
+GAP = 1.0
+
+
+# ------------------------------------------------------------------
+# Parsing
+# ------------------------------------------------------------------
+_TS    = r"(\d+(?::\d+){0,2}(?:[.,]\d+)?)"
+_LINE1 = re.compile(rf"^\s*{_TS}\s*-\s*{_TS}\s*:\s*(.*?)\s*$")
+_LINE2 = re.compile(rf"^\s*{_TS}\s*-->\s*{_TS}\s*:\s*(.*?)\s*$")
+
+def _seconds(text):
+    seconds = 0.0
+    for part in text.replace(",", ".").split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def parse_transcript(text):
+    """[Word(text, start, end), ...] from transcript text (either line format)."""
+    words = []
+    for line in text.splitlines():
+        m = _LINE2.match(line) or _LINE1.match(line)
+        if m and m.group(3):
+            words.append(Word(m.group(3), _seconds(m.group(1)), _seconds(m.group(2))))
+    return words
+
+def read_transcript(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_transcript(f.read())
+
+def tokens(text):
+    """Lowercase word tokens: punctuation dropped, 'award-winning' -> 'award', 'winning'."""
+    return re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+
+
+# ------------------------------------------------------------------
+# Alignment
+# ------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _letters(token):
+    return Counter(token)
+
+@lru_cache(maxsize=1 << 18)
+def similarity(a, b):
+    """1 - Levenshtein(a, b) / max(len): 1.0 for equal tokens, 0.0 below MIN_SIMILARITY."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    longest = max(len(a), len(b))
+    if min(len(a), len(b)) < MIN_SIMILARITY * longest:
+        return 0.0    # the length gap alone puts it below MIN_SIMILARITY
+    if sum((_letters(a) & _letters(b)).values()) < MIN_SIMILARITY * longest:
+        return 0.0    # distance >= longest - shared letters
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return 1.0 - prev[-1] / longest
+
+def _sub_cost(a, b):
+    s = similarity(a, b)
+    return 1.0 - s if s >= MIN_SIMILARITY else GAP * 2
+
+def _window(script, flat, slack):
+    """[lo, hi) of `flat` holding the most exact hits of a script-length window, padded by `slack`."""
+    n = len(script)
+    if len(flat) <= n + 2 * slack:
+        return 0, len(flat)
+    wanted = Counter(script)
+    hits = [1 if t in wanted else 0 for t in flat]
+    score = sum(hits[:n])
+    best, best_at = score, 0
+    for i in range(1, len(flat) - n + 1):
+        score += hits[i + n - 1] - hits[i - 1]
+        if score > best:
+            best, best_at = score, i
+    return max(0, best_at - slack), min(len(flat), best_at + n + slack)
+
+# (script tokens, transcript tokens) consumed per step: 1:1, compounds
+# ("homerunpet" ~ "home run pet" and back) and the two skips
+_MERGES = ((1, 2), (1, 3), (2, 1), (3, 1))
+
+def align(script, flat):
+    """Semi-global DP. Returns (cost, [(first, last script idx, first, last flat idx), ...] matches)."""
+    n, m = len(script), len(flat)
+    INF = float("inf")
+    # cost[i][j]: script[:i] aligned, ending at flat position j; row 0 free (transcript prefix)
+    cost = [[0.0] * (m + 1)] + [[INF] * (m + 1) for _ in range(n)]
+    move = [[(0, 0)] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        a = script[i - 1]
+        row, up = cost[i], cost[i - 1]
+        mv = move[i]
+        row[0] = up[0] + GAP
+        mv[0] = (1, 0)
+        for j in range(1, m + 1):
+            best, how = up[j - 1] + _sub_cost(a, flat[j - 1]), (1, 1)
+            c = up[j] + GAP
+            if c < best:
+                best, how = c, (1, 0)
+            c = row[j - 1] + GAP
+            if c < best:
+                best, how = c, (0, 1)
+            for di, dj in _MERGES:
+                # Compounds only where both sides start on the same letter
+                if di <= i and dj <= j and script[i - di][0] == flat[j - dj][0]:
+                    c = cost[i - di][j - dj] + _sub_cost("".join(script[i - di:i]), "".join(flat[j - dj:j]))
+                    if c < best:
+                        best, how = c, (di, dj)
+            row[j], mv[j] = best, how
+
+    # Free transcript suffix: best end column on the last row (earliest on ties)
+    j = min(range(m + 1), key=lambda k: (cost[n][k], k))
+    total, i, pairs = cost[n][j], n, []
+    while i > 0:
+        di, dj = move[i][j]
+        if di and dj and similarity("".join(script[i - di:i]), "".join(flat[j - dj:j])) >= MIN_SIMILARITY:
+            pairs.append((i - di, i - 1, j - dj, j - 1))
+        i, j = i - di, j - dj
+    pairs.reverse()
+    return total, pairs
+
+def locate(script_text, words):
+    """Match(start, end, first, last, score) for `script_text` inside `words`, or None.
+
+    score is the fraction of script tokens matched to a transcript word.
+    """
+    script = tokens(script_text)
+    # One flat token stream; owner[k] = index of the transcript word token k came from
+    flat, owner = [], []
+    for w_idx, word in enumerate(words):
+        for t in tokens(word.text):
+            flat.append(t)
+            owner.append(w_idx)
+    if not script or not flat:
+        return None
+
+    lo, hi = _window(script, flat, slack=max(10, len(script) // 2))
+    _, pairs = align(script, flat[lo:hi])
+    if not pairs:
+        return None
+
+    first, last = owner[lo + pairs[0][2]], owner[lo + pairs[-1][3]]
+    start, end = words[first].start, words[last].end
+    # Whole-second transcripts floor every timestamp: let the last word run
+    # up to the next word (at most one more second) instead of clipping it
+    if all(float(w.start).is_integer() and float(w.end).is_integer() for w in words):
+        following = words[last + 1].start if last + 1 < len(words) else end + 1.0
+        end = max(end, min(following, end + 1.0))
+    matched = sum(s_last - s_first + 1 for s_first, s_last, _, _ in pairs)
+    return Match(start, end, first, last, matched / len(script))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+smart_cut.py
+------------
+Keyframe index + smart cut for the stream-copy trims in Unusual_conc.py and
+Unusual_audioconc.py.
+
+A `-c copy` cut can only start on a keyframe, so clips drift by up to a GOP;
+re-encoding everything fixes that but is slow. Smart cut re-encodes only the
+partial GOPs at each boundary and stream-copies the whole GOPs in between:
+
+    start        k1 ............................ k2        end
+      |--encode--|------------- copy -------------|--encode--|
+
+The keyframe list comes from ffprobe packet flags (no decoding) and is cached
+next to the video as .<name>.keyframes.json (validated by size + mtime), so a
+video is indexed once however many cuts are taken from it.
+
+Pieces are written as MPEG-TS (in-band H.264 headers, so encoded and copied
+parts can be joined), encoded in parallel, then joined by the concat demuxer
+in one final mux. Audio, if the source has any, is cut sample-accurately by an
+aselect filter in that same mux. Non-H.264 sources fall back to re-encoding
+the requested ranges.
+
+Usage:
+    import smart_cut
+    smart_cut.cut(video, start, end, "clip.mp4", mode="smart")
+    smart_cut.cut_many(video, [(s1, e1), (s2, e2)], "joined.mp4", mode="smart")
+
+Env:
+  CUT_MODE        copy | smart | accurate (default: copy)
+  CUT_PRESET      libx264 preset for re-encoded parts (default: veryfast)
+  CUT_CRF         libx264 CRF for re-encoded parts (default: 18)
+  CUT_JOBS        parallel boundary encodes (default: CPU count)
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import media_probe
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+CUT_MODE = os.environ.get("CUT_MODE", "copy").strip().lower()
+PRESET   = os.environ.get("CUT_PRESET", "veryfast")
+CRF      = os.environ.get("CUT_CRF", "18")
+JOBS     = int(os.environ.get("CUT_JOBS", "0")) or os.cpu_count() or 1
+
+MODES = ("copy", "smart", "accurate")
+EPS   = 1e-3   # seconds; keeps -ss on the keyframe it names
+
+
+# ------------------------------------------------------------------
+# Keyframe index
+# ------------------------------------------------------------------
+def index_path(video):
+    folder, name = os.path.split(video)
+    return os.path.join(folder, f".{name}.keyframes.json")
+
+def _probe_index(video):
+    info = media_probe.probe(video)
+    stream = info["video"] or {}
+
+    packets = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", video
+    ], capture_output=True, text=True, check=True)
+    keyframes = set()
+    for line in packets.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            keyframes.add(round(float(pts), 6))
+
+    return {
+        "codec": stream.get("codec"),
+        "pix_fmt": stream.get("pix_fmt") or "yuv420p",
+        "has_audio": info["audio"] is not None,
+        "keyframes": sorted(keyframes),
+    }
+
+def keyframe_index(video):
+    """{codec, pix_fmt, has_audio, keyframes[]} for `video`, cached beside it."""
+    st = os.stat(video)
+    stamp = [st.st_size, int(st.st_mtime)]
+    path = index_path(video)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("stamp") == stamp:
+            return cached
+    except (OSError, ValueError):
+        pass
+
+    index = _probe_index(video)
+    index["stamp"] = stamp
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    except OSError:
+        pass  # read-only folder: index is just not cached
+    return index
+
+def drop_index(video):
+    """Remove the cached index of a temporary video."""
+    try:
+        os.remove(index_path(video))
+    except OSError:
+        pass
+
+
+# ------------------------------------------------------------------
+# Planning
+# ------------------------------------------------------------------
+def plan(keyframes, start, end):
+    """
+    [(kind, a, b), ...] covering [start, end): kind "encode" for partial GOPs,
+    "copy" for the run of whole GOPs between the first and last keyframe inside.
+    """
+    inside = [k for k in keyframes if start - EPS <= k <= end + EPS]
+    if not inside:
+        return [("encode", start, end)]
+
+    k1, k2 = inside[0], inside[-1]
+    if k2 >= end - EPS:
+        k2 = end   # a keyframe right at the end: copy all the way
+    if k2 <= k1 + EPS:
+        return [("encode", start, end)]   # no whole GOP inside
+
+    pieces = []
+    if k1 > start + EPS:
+        pieces.append(("encode", start, k1))
+    pieces.append(("copy", max(k1, start), k2))
+    if end > k2 + EPS:
+        pieces.append(("encode", k2, end))
+    return pieces
+
+
+# ------------------------------------------------------------------
+# Pieces / mux
+# ------------------------------------------------------------------
+def _piece_cmd(video, kind, a, b, out, pix_fmt):
+    cmd = ["ffmpeg", "-y", "-v", "error", "-ss", f"{a + (EPS / 10 if kind == 'copy' else 0):.6f}",
+           "-i", video, "-t", f"{b - a:.6f}", "-map", "0:v:0", "-an", "-sn", "-dn"]
+    if kind == "copy":
+        cmd += ["-c:v", "copy"]
+    else:
+        cmd += ["-c:v", "libx264", "-preset", PRESET, "-crf", CRF, "-pix_fmt", pix_fmt]
+    return cmd + ["-f", "mpegts", out]
+
+def _select(intervals):
+    return "+".join(f"between(t,{a:.6f},{b:.6f})" for a, b in intervals)
+
+def _concat_script(paths):
+    lines = ["ffconcat version 1.0"]
+    lines += ["file '{}'".format(os.path.abspath(p).replace("'", "'\\''")) for p in paths]
+    return "\n".join(lines) + "\n"
+
+def _accurate(video, intervals, output, has_audio):
+    keep = _select(intervals)
+    graph = f"[0:v]select='{keep}',setpts=N/FRAME_RATE/TB[v]"
+    maps = ["-map", "[v]"]
+    if has_audio:
+        graph += f";[0:a]aselect='{keep}',asetpts=N/SR/TB[a]"
+        maps += ["-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error", "-i", video,
+        "-filter_complex", graph, *maps,
+        "-c:v", "libx264", "-preset", PRESET, "-crf", CRF, "-pix_fmt", "yuv420p",
+        output
+    ], check=True)
+
+def _copy(video, intervals, output):
+    lines = ["ffconcat version 1.0"]
+    src = os.path.abspath(video).replace("'", "'\\''")
+    for a, b in intervals:
+        lines += [f"file '{src}'", f"inpoint {a:.6f}", f"outpoint {b:.6f}"]
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-protocol_whitelist", "file,pipe",
+        "-f", "concat", "-safe", "0", "-i", "pipe:0",
+        "-c", "copy", "-avoid_negative_ts", "make_zero", output
+    ], input=("\n".join(lines) + "\n").encode("utf-8"), check=True)
+
+def _smart(video, intervals, output, index):
+    pieces = [p for a, b in intervals for p in plan(index["keyframes"], a, b)]
+    tmp = tempfile.mkdtemp(prefix="smartcut_")
+    try:
+        paths = [os.path.join(tmp, f"{i:04d}.ts") for i in range(len(pieces))]
+        cmds = [_piece_cmd(video, kind, a, b, path, index["pix_fmt"])
+                for (kind, a, b), path in zip(pieces, paths)]
+        with ThreadPoolExecutor(max_workers=JOBS) as ex:
+            for fut in [ex.submit(subprocess.run, cmd, check=True) for cmd in cmds]:
+                fut.result()
+
+        cmd = ["ffmpeg", "-y", "-v", "error",
+               "-protocol_whitelist", "file,pipe",
+               "-f", "concat", "-safe", "0", "-i", "pipe:0"]
+        maps = ["-map", "0:v:0", "-c:v", "copy"]
+        if index["has_audio"]:
+            cmd += ["-i", video, "-filter_complex",
+                    f"[1:a:0]aselect='{_select(intervals)}',asetpts=N/SR/TB[a]"]
+            maps += ["-map", "[a]", "-c:a", "aac", "-b:a", "192k"]
+        subprocess.run(cmd + maps + ["-movflags", "+faststart", output],
+                       input=_concat_script(paths).encode("utf-8"), check=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ------------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------------
+def cut_many(video, intervals, output, mode=None):
+    """Write [(start, end), ...] of `video` back to back into `output`."""
+    mode = (mode or CUT_MODE).lower()
+    if mode not in MODES:
+        raise ValueError(f"unknown cut mode {mode!r} (expected one of {', '.join(MODES)})")
+    if mode == "copy":
+        return _copy(video, intervals, output)
+
+    index = keyframe_index(video)
+    if mode == "accurate" or index["codec"] != "h264" or not index["keyframes"]:
+        return _accurate(video, intervals, output, index["has_audio"])
+    return _smart(video, intervals, output, index)
+
+def cut(video, start, end, output, mode=None):
+    """Single [start, end) clip of `video` into `output`."""
+    return cut_many(video, [(start, end)], output, mode)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+tor_pool.py
+-----------
+A private Tor daemon with one SOCKS port per concurrent job.
+
+TorPool starts its own `tor` process (no `sudo service tor ...`) with
+TOR_SLOTS SocksPorts, each flagged IsolateSOCKSAuth, plus a ControlPort
+with cookie authentication. A job borrows a Slot and gets a proxy URL whose
+SOCKS username names the slot and its generation, so every slot rides its
+own circuit. When a job fails, slot.rotate() bumps the generation (new
+SOCKS credentials -> new circuit for that slot only) and asks Tor for fresh
+circuits with SIGNAL NEWNYM over the control port (throttled to Tor's own
+10 s limit). The daemon keeps running; other jobs are not interrupted.
+
+Usage:
+    from tor_pool import TorPool
+    with TorPool(slots=4) as pool:
+        with pool.slot() as slot:
+            subprocess.run(["yt-dlp", "--proxy", slot.proxy, url])
+            # or, for tools that spawn ffmpeg: ["torsocks", "yt-dlp", url], env=slot.torsocks_env()
+            slot.rotate()        # after a failure
+
+Env:
+  TOR_SLOTS        SOCKS ports / concurrent circuits (default: 4)
+  TOR_SOCKS_BASE   first SOCKS port (default: 9060; control port = base + slots)
+  TOR_BOOTSTRAP    seconds to wait for Tor to bootstrap (default: 120)
+"""
+
+import os
+import time
+import queue
+import socket
+import shutil
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+
+SLOTS      = int(os.environ.get("TOR_SLOTS", "4"))
+SOCKS_BASE = int(os.environ.get("TOR_SOCKS_BASE", "9060"))
+BOOTSTRAP  = float(os.environ.get("TOR_BOOTSTRAP", "120"))
+NEWNYM_GAP = 10.0   # Tor ignores NEWNYM more often than this
+
+
+class TorError(RuntimeError):
+    pass
+
+
+def ensure_tor():
+    """Install tor (and torsocks) with apt if missing."""
+    if shutil.which("tor") and shutil.which("torsocks"):
+        return
+    print("[*] Installing Tor...")
+    subprocess.run(["sudo", "apt-get", "update"], check=True)
+    subprocess.run(["sudo", "apt-get", "install", "-y", "tor", "torsocks"], check=True)
+    # The packaged service is not needed: TorPool runs its own daemon
+    subprocess.run(["sudo", "service", "tor", "stop"], capture_output=True)
+
+
+# ------------------------------------------------------------------
+# Slots
+# ------------------------------------------------------------------
+class Slot:
+    """One SOCKS port; `proxy` changes circuit on every rotate()."""
+
+    def __init__(self, pool, index, port):
+        self.pool = pool
+        self.index = index
+        self.port = port
+        self.generation = 0
+
+    @property
+    def proxy(self):
+        return f"socks5://{self._user}:x@127.0.0.1:{self.port}"
+
+    @property
+    def _user(self):
+        return f"slot{self.index}-{self.generation}"
+
+    def torsocks_env(self, base=None):
+        """Environment for `torsocks <cmd>`: same port and circuit as `proxy`, child processes included."""
+        env = dict(os.environ if base is None else base)
+        env.update(TORSOCKS_TOR_ADDRESS="127.0.0.1", TORSOCKS_TOR_PORT=str(self.port),
+                   TORSOCKS_USERNAME=self._user, TORSOCKS_PASSWORD="x")
+        return env
+
+    def rotate(self):
+        self.generation += 1
+        self.pool.newnym()
+        print(f"[*] Tor slot {self.index}: new circuit (#{self.generation})", flush=True)
+
+
+# ------------------------------------------------------------------
+# Daemon
+# ------------------------------------------------------------------
+class TorPool:
+    def __init__(self, slots=SLOTS, socks_base=SOCKS_BASE):
+        self.control_port = socks_base + slots
+        self._slots = [Slot(self, i, socks_base + i) for i in range(slots)]
+        self._free = queue.Queue()
+        for slot in self._slots:
+            self._free.put(slot)
+        self._proc = None
+        self._dir = None
+        self._ctl = None
+        self._ctl_lock = threading.Lock()
+        self._last_newnym = 0.0
+
+    # -- lifecycle ---------------------------------------------------
+    def start(self):
+        ensure_tor()
+        self._dir = tempfile.mkdtemp(prefix="tor_pool_")
+        cookie = os.path.join(self._dir, "control_auth_cookie")
+        torrc = os.path.join(self._dir, "torrc")
+        with open(torrc, "w") as f:
+            f.write(f"DataDirectory {self._dir}\n")
+            for slot in self._slots:
+                f.write(f"SocksPort 127.0.0.1:{slot.port} IsolateSOCKSAuth\n")
+            f.write(f"ControlPort 127.0.0.1:{self.control_port}\n")
+            f.write("CookieAuthentication 1\n")
+            f.write(f"CookieAuthFile {cookie}\n")
+            f.write("Log notice stdout\n")
+        self._proc = subprocess.Popen(["tor", "-f", torrc],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + BOOTSTRAP
+        while not os.path.exists(cookie):
+            if self._proc.poll() is not None:
+                raise TorError(f"tor exited with code {self._proc.returncode}")
+            if time.time() > deadline:
+                raise TorError("tor control port did not come up")
+            time.sleep(0.2)
+        self._connect(cookie, deadline)
+
+        while "PROGRESS=100" not in self._command("GETINFO status/bootstrap-phase"):
+            if time.time() > deadline:
+                raise TorError("tor did not finish bootstrapping")
+            time.sleep(1)
+        print(f"[✓] Tor is up: {len(self._slots)} SOCKS port(s) from {self._slots[0].port}, "
+              f"control {self.control_port}", flush=True)
+        return self
+
+    def stop(self):
+        if self._ctl is not None:
+            try:
+                self._command("SIGNAL SHUTDOWN")
+            except (OSError, TorError):
+                pass
+            self._ctl.close()
+            self._ctl = None
+        if self._proc is not None:
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+            self._proc = None
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- control port ------------------------------------------------
+    def _connect(self, cookie, deadline):
+        while True:
+            try:
+                self._ctl = socket.create_connection(("127.0.0.1", self.control_port), timeout=30)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise TorError("cannot connect to tor control port")
+                time.sleep(0.2)
+        self._reader = self._ctl.makefile("r", encoding="ascii", newline="\r\n")
+        with open(cookie, "rb") as f:
+            self._command(f"AUTHENTICATE {f.read().hex()}")
+
+    def _command(self, line):
+        """Send one control command; returns the reply text, TorError on a non-250 reply."""
+        with self._ctl_lock:
+            self._ctl.sendall(line.encode("ascii") + b"\r\n")
+            reply = []
+            while True:
+                row = self._reader.readline()
+                if not row:
+                    raise TorError("tor control connection closed")
+                reply.append(row.rstrip("\r\n"))
+                if len(row) >= 4 and row[3] == " ":   # "250 OK": final line
+                    break
+        if not reply[-1].startswith("250"):
+            raise TorError(f"{line.split()[0]} failed: {reply[-1]}")
+        return "\n".join(reply)
+
+    def newnym(self):
+        """SIGNAL NEWNYM, at most once per NEWNYM_GAP seconds."""
+        with self._ctl_lock:
+            if time.time() - self._last_newnym < NEWNYM_GAP:
+                return
+            self._last_newnym = time.time()
+        try:
+            self._command("SIGNAL NEWNYM")
+        except (OSError, TorError) as e:
+            print(f"[!] NEWNYM failed: {e}", flush=True)
+
+    # -- slots -------------------------------------------------------
+    @contextmanager
+    def slot(self):
+        """Borrow a free slot for the duration of a job."""
+        slot = self._free.get()
+        try:
+            yield slot
+        finally:
+            self._free.put(slot)
@@ -1,17 +1,4 @@
+import whisper_service
 
-import whisper
-from datetime import timedelta
-
-def format_timestamp(seconds):
-    return str(timedelta(seconds=int(seconds))).split('.')[0].zfill(8)[:8]
-
-model = whisper.load_model('base')
-result = model.transcribe('umbriel whisper.wav', word_timestamps=True)
-
-with open('transcription.txt', 'w') as f:
-    for segment in result['segments']:
-        for word in segment.get('words', []):
-            start = format_timestamp(word['start'])
-            end = format_timestamp(word['end'])
-            text = word['word'].strip()
-            f.write(f'{start}-{end}: {text}\n')
+words = whisper_service.transcribe_words('umbriel whisper.wav')
+whisper_service.write_transcript(words, 'transcription.txt', whisper_service.hms_line)
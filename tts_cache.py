@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+tts_cache.py
+------------
+Content-addressed cache for synthesized speech (Unusual_tts.py,
+intor,ourto_audio.py, BOOK_CODE/COMPANY_BIO/comp4.py).
+
+Gemini TTS is the slowest and most quota-hungry call in the system, and the
+same text (intro/outro, unchanged script sentences, a section shared by two
+books) is sent again on every run. Here audio is keyed by everything that
+changes what comes back: the normalized text (Unicode NFC, whitespace
+collapsed), the tone instruction, the voice, the model and the temperature.
+Sentence-bounded chunks (tts_scheduler) make the keys fine-grained, so an
+edit to one sentence only resynthesizes its chunk.
+
+Entries live under TTS_CACHE_DIR as <key[:2]>/<key>.<codec> plus <key>.json
+holding the PCM format (sample rate, bits, channels, frames) and the key
+fields. Audio is stored losslessly: FLAC through ffmpeg when it is on PATH,
+else zlib-compressed PCM. A hit is written back out as a WAV identical to
+the one that was synthesized.
+
+Usage:
+    import tts_cache
+    ok = tts_cache.cached(out_wav, lambda: generate_tts(api_key, TONE_INSTRUCTION + text, out_wav),
+                          text, TONE_INSTRUCTION, VOICE_NAME, TTS_MODEL, TEMPERATURE)
+
+Env:
+  TTS_CACHE        "0" disables the cache (default 1)
+  TTS_CACHE_DIR    (default: Unuusual_memory/CACHE/tts)
+  TTS_CACHE_CODEC  flac | zlib (default: flac when ffmpeg is available)
+"""
+
+import os
+import re
+import json
+import time
+import wave
+import zlib
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import unicodedata
+
+import wav_io
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+CACHE_ENABLED = _truthy(os.environ.get("TTS_CACHE", "1"))
+CACHE_DIR     = os.environ.get("TTS_CACHE_DIR", "Unuusual_memory/CACHE/tts")
+CODEC         = os.environ.get("TTS_CACHE_CODEC", "flac" if shutil.which("ffmpeg") else "zlib").strip().lower()
+
+FLAC_BITS = (16, 24, 32)   # sample widths ffmpeg's FLAC encoder round-trips exactly
+
+
+# ------------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------------
+def normalize_text(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+def cache_key(text, tone, voice, model, temperature=None):
+    """SHA-256 over the normalized text and the synthesis settings."""
+    fields = {
+        "text": normalize_text(text),
+        "tone": normalize_text(tone),
+        "voice": voice,
+        "model": model,
+        "temperature": temperature,
+    }
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+def _entry(key):
+    return os.path.join(CACHE_DIR, key[:2], key)
+
+
+# ------------------------------------------------------------------
+# Codecs
+# ------------------------------------------------------------------
+def _encode(pcm, meta, path):
+    if meta["codec"] == "flac":
+        cmd = ["ffmpeg", "-v", "error", "-y", "-f", f"s{meta['bits']}le",
+               "-ar", str(meta["sample_rate"]), "-ac", str(meta["channels"]), "-i", "pipe:0",
+               "-c:a", "flac", "-compression_level", "8", "-f", "flac", path]
+        subprocess.run(cmd, input=pcm, check=True)
+    else:
+        with open(path, "wb") as f:
+            f.write(zlib.compress(pcm, 9))
+
+def _decode(meta, path):
+    if meta["codec"] == "flac":
+        cmd = ["ffmpeg", "-v", "error", "-i", path,
+               "-c:a", f"pcm_s{meta['bits']}le", "-f", f"s{meta['bits']}le", "pipe:1"]
+        return subprocess.run(cmd, capture_output=True, check=True).stdout
+    with open(path, "rb") as f:
+        return zlib.decompress(f.read())
+
+
+# ------------------------------------------------------------------
+# Get / put
+# ------------------------------------------------------------------
+def get(key, out_path):
+    """Write the cached audio for `key` to out_path as a WAV; False on a miss."""
+    if not CACHE_ENABLED:
+        return False
+    base = _entry(key)
+    try:
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        pcm = _decode(meta, f"{base}.{meta['codec']}")
+    except (OSError, ValueError, KeyError, zlib.error, subprocess.CalledProcessError):
+        return False
+    block_align = meta["channels"] * meta["bits"] // 8
+    if len(pcm) != meta["frames"] * block_align:
+        return False    # truncated entry: synthesize again
+    with wav_io.WavSink(out_path, channels=meta["channels"]) as sink:
+        sink.write_pcm(pcm, meta["bits"], meta["sample_rate"])
+    return True
+
+def put(key, wav_path, **fields):
+    """Store a synthesized WAV under `key`; extra fields are kept in the metadata."""
+    if not CACHE_ENABLED:
+        return
+    with wave.open(wav_path, "rb") as w:
+        channels, bits, rate = w.getnchannels(), w.getsampwidth() * 8, w.getframerate()
+        pcm = w.readframes(w.getnframes())
+    if not pcm:
+        return
+    codec = CODEC if CODEC == "zlib" or bits in FLAC_BITS else "zlib"
+    meta = dict(fields, codec=codec, sample_rate=rate, bits=bits, channels=channels,
+                frames=len(pcm) // (channels * bits // 8), created=int(time.time()))
+
+    base = _entry(key)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    # Audio first, metadata last: an entry only counts once its .json exists
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(base), suffix=f".{codec}")
+    os.close(fd)
+    try:
+        _encode(pcm, meta, tmp)
+        os.replace(tmp, f"{base}.{codec}")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ TTS cache: could not store {key[:12]}: {e}", flush=True)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(base), suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, base + ".json")
+
+def cached(out_path, synth, text, tone, voice, model, temperature=None):
+    """out_path from the cache, else from synth() (stored on success).
+
+    Returns True on a hit, otherwise whatever synth() returned.
+    """
+    key = cache_key(text, tone, voice, model, temperature)
+    if get(key, out_path):
+        print(f"♻️ TTS cache hit: {os.path.basename(out_path)}", flush=True)
+        return True
+    ok = synth()
+    if ok and os.path.exists(out_path):
+        put(key, out_path, text=normalize_text(text), tone=normalize_text(tone),
+            voice=voice, model=model, temperature=temperature)
+    return ok
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+tts_scheduler.py
+----------------
+Sentence-bounded, parallel TTS for long texts (Unusual_tts.py group batches,
+BOOK_CODE/COMPANY_BIO/comp4.py book sections).
+
+Each document (a group script, a book section) is split at sentence
+boundaries into chunks of at most TTS_CHUNK_CHARS characters. All chunks of
+all documents are synthesized concurrently, TTS_PER_KEY requests per API
+key, each into its own chunk WAV under a work directory. A chunk that fails
+is retried on the next key; chunks that succeeded are never redone (also
+across runs: chunk files are named by their text and reused until the join
+succeeds).
+
+join() then writes each output WAV from its chunk WAVs, sample for sample,
+with TTS_GAP_MS of silence between chunks and TTS_DOC_GAP_MS between
+documents sharing one file, and records where every document and chunk
+landed in a sidecar <output>.json:
+
+    {"sample_rate": 24000,
+     "docs": [{"id": "group_1", "start": 0.0, "end": 31.25,
+               "start_frame": 0, "end_frame": 750000,
+               "chunks": [{"start": 0.0, "end": 12.5, "text": "..."}, ...]}, ...]}
+
+Those offsets are exact, so downstream alignment (Unusual_timeline.py) reads
+them instead of transcribing the audio again.
+
+Usage:
+    import tts_scheduler
+    docs = {"group_1": text1, "group_2": text2}
+    chunks = tts_scheduler.synthesize(docs, synth, API_KEYS, work_dir)
+    tts_scheduler.join(["group_1", "group_2"], chunks, "out.wav")
+    tts_scheduler.cleanup(chunks)
+    # synth(api_key, chunk_text, chunk_wav_path) -> True on success
+
+Env:
+  TTS_CHUNK_CHARS    max characters per request (default: 1500)
+  TTS_PER_KEY        concurrent requests per API key (default: 2)
+  TTS_CHUNK_RETRIES  attempts per chunk, rotating keys (default: 4)
+  TTS_RETRY_DELAY    seconds before retrying a failed chunk (default: 10)
+  TTS_GAP_MS         silence between chunks of one document (default: 150)
+  TTS_DOC_GAP_MS     silence between documents in one file (default: 600)
+"""
+
+import os
+import re
+import json
+import time
+import wave
+import hashlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import wav_io
+
+CHUNK_CHARS = int(os.environ.get("TTS_CHUNK_CHARS", "1500"))
+PER_KEY     = max(1, int(os.environ.get("TTS_PER_KEY", "2")))
+RETRIES     = max(1, int(os.environ.get("TTS_CHUNK_RETRIES", "4")))
+RETRY_DELAY = float(os.environ.get("TTS_RETRY_DELAY", "10"))
+GAP_MS      = float(os.environ.get("TTS_GAP_MS", "150"))
+DOC_GAP_MS  = float(os.environ.get("TTS_DOC_GAP_MS", "600"))
+
+Chunk = namedtuple("Chunk", "doc index text")
+
+
+# ------------------------------------------------------------------
+# Splitting
+# ------------------------------------------------------------------
+_SENTENCE_END = re.compile(r'(?<=[.!?…])["\')\]]*\s+|\n\s*\n')
+
+def split_sentences(text):
+    """Sentences (and paragraph breaks) of `text`, whitespace-trimmed."""
+    return [s.strip() for s in _SENTENCE_END.split(text) if s and s.strip()]
+
+def _split_long(sentence, max_chars):
+    """A sentence longer than max_chars, cut at clause (, ; :) then word boundaries."""
+    pieces, rest = [], sentence
+    while len(rest) > max_chars:
+        window = rest[:max_chars]
+        cut = max(window.rfind(", "), window.rfind("; "), window.rfind(": "))
+        if cut < max_chars // 3:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = max_chars - 1
+        pieces.append(rest[:cut + 1].strip())
+        rest = rest[cut + 1:].strip()
+    return pieces + ([rest] if rest else [])
+
+def make_chunks(text, max_chars=CHUNK_CHARS):
+    """Chunk texts of whole sentences, each at most max_chars (long sentences are cut)."""
+    chunks, current = [], ""
+    for sentence in split_sentences(text):
+        for piece in (_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ------------------------------------------------------------------
+# Synthesis
+# ------------------------------------------------------------------
+def chunk_path(work_dir, chunk):
+    digest = hashlib.sha1(chunk.text.encode("utf-8")).hexdigest()[:12]
+    doc = re.sub(r"[^\w.-]+", "_", chunk.doc)     # doc ids may be book headings
+    return os.path.join(work_dir, f"{doc}_{chunk.index:03d}_{digest}.wav")
+
+def synthesize(docs, synth, keys, work_dir, per_key=PER_KEY, retries=RETRIES, max_chars=CHUNK_CHARS):
+    """Synthesize every chunk of `docs` ({doc_id: text}); returns {doc_id: [(chunk wav, text), ...]}.
+
+    Raises RuntimeError naming the chunks that still failed after `retries` attempts.
+    """
+    keys = [k for k in keys if k]
+    if not keys:
+        raise ValueError("no API keys")
+    os.makedirs(work_dir, exist_ok=True)
+
+    chunks = {doc: [Chunk(doc, i, t) for i, t in enumerate(make_chunks(text, max_chars))]
+              for doc, text in docs.items()}
+    order = {c: n for n, c in enumerate(c for cs in chunks.values() for c in cs)}
+    pending = [c for c in order if not os.path.exists(chunk_path(work_dir, c))]
+    print(f"🗣️ {sum(map(len, chunks.values()))} chunk(s) in {len(docs)} document(s), "
+          f"{len(pending)} to synthesize on {len(keys)} key(s) x {per_key}", flush=True)
+
+    attempt = 0
+    while pending and attempt < retries:
+        if attempt:
+            print(f"🔁 Retrying {len(pending)} chunk(s) in {RETRY_DELAY:.0f}s...", flush=True)
+            time.sleep(RETRY_DELAY)
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(keys) * per_key) as ex:
+            # Shift the key on every attempt so a retried chunk lands on another key
+            futures = {ex.submit(synth, keys[(order[c] + attempt) % len(keys)], c.text, chunk_path(work_dir, c)): c
+                       for c in pending}
+            for fut in as_completed(futures):
+                c = futures[fut]
+                try:
+                    ok = fut.result()
+                except Exception as e:
+                    print(f"❌ {c.doc} chunk {c.index}: {e}", flush=True)
+                    ok = False
+                if not ok or not os.path.exists(chunk_path(work_dir, c)):
+                    failed.append(c)
+        pending = failed
+        attempt += 1
+
+    if pending:
+        raise RuntimeError("TTS failed for " + ", ".join(f"{c.doc}#{c.index}" for c in pending))
+    return {doc: [(chunk_path(work_dir, c), c.text) for c in cs] for doc, cs in chunks.items()}
+
+
+# ------------------------------------------------------------------
+# Join
+# ------------------------------------------------------------------
+def _read_pcm(path):
+    with wave.open(path, "rb") as w:
+        if w.getnchannels() != 1:
+            raise wav_io.WavError(f"{path}: expected mono TTS audio")
+        return w.readframes(w.getnframes()), w.getsampwidth() * 8, w.getframerate()
+
+def join(doc_ids, chunks, out_path, gap_ms=GAP_MS, doc_gap_ms=DOC_GAP_MS):
+    """Write `doc_ids` (in order) from their chunks (synthesize() result) into out_path.
+
+    The offsets are also written to <out>.json and returned.
+    """
+    docs = []
+    with wav_io.WavSink(out_path) as sink:
+        for doc in doc_ids:
+            if sink.frames and doc_gap_ms:
+                sink.write_pcm(bytes(int(sink.sample_rate * doc_gap_ms / 1000) * sink.block_align),
+                               sink.bits, sink.sample_rate)
+            entry = {"id": doc, "start_frame": sink.frames, "chunks": []}
+            for i, (path, text) in enumerate(chunks[doc]):
+                pcm, bits, rate = _read_pcm(path)
+                if i and gap_ms:
+                    sink.write_pcm(bytes(int(rate * gap_ms / 1000) * (bits // 8)), bits, rate)
+                start = sink.frames
+                sink.write_pcm(pcm, bits, rate)
+                entry["chunks"].append({"start_frame": start, "end_frame": sink.frames, "text": text})
+            entry["end_frame"] = sink.frames
+            docs.append(entry)
+        rate = sink.sample_rate or 1
+
+    for entry in docs:
+        for item in [entry] + entry["chunks"]:
+            item["start"] = item["start_frame"] / rate
+            item["end"] = item["end_frame"] / rate
+    offsets = {"sample_rate": rate, "docs": docs}
+    with open(offsets_path(out_path), "w", encoding="utf-8") as f:
+        json.dump(offsets, f, indent=2)
+    return offsets
+
+def cleanup(chunks):
+    """Remove the chunk WAVs of a synthesize() result once they are joined."""
+    for items in chunks.values():
+        for path, _ in items:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# ------------------------------------------------------------------
+# Offsets
+# ------------------------------------------------------------------
+def offsets_path(wav_path):
+    return os.path.splitext(wav_path)[0] + ".json"
+
+def find_doc(audio_dir, doc_id):
+    """(start, end) seconds of `doc_id` in any offsets sidecar under audio_dir, or None."""
+    if not os.path.isdir(audio_dir):
+        return None
+    for name in sorted(os.listdir(audio_dir)):
+        if not name.endswith(".json"):
+            continue
+        wav = os.path.join(audio_dir, name[:-5] + ".wav")
+        if not os.path.exists(wav):
+            continue
+        try:
+            with open(os.path.join(audio_dir, name), "r", encoding="utf-8") as f:
+                offsets = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for doc in offsets.get("docs", []):
+            if doc.get("id") == doc_id:
+                return doc["start"], doc["end"]
+    return None
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+wav_io.py
+---------
+In-process PCM WAV access for the audio stages, without an ffmpeg process
+per cut.
+
+WavFile maps the data chunk of a RIFF/WAVE file with numpy.memmap (one row
+per sample frame), so a slice is just an index range: nothing is decoded
+and only the pages that are copied out are read. write_slice() writes a
+sample-accurate [start, end) slice to a new WAV, reusing the source's fmt
+chunk verbatim (PCM, float and WAVE_FORMAT_EXTENSIBLE alike), with optional
+linear fades at the edges. Without numpy a slice is a plain byte-range copy
+of the data chunk; only the fades need it.
+
+WavSink is the write side for streamed PCM (Gemini TTS sends raw
+"audio/L16;rate=24000" parts): every chunk is appended to <path>.part as it
+arrives, the RIFF and data sizes are patched in on finish() and the file is
+renamed into place, so memory stays flat however long the batch is and a
+failed stream never leaves a truncated WAV behind.
+
+Timestamps are parsed by parse_time(): "SS", "MM:SS" or "HH:MM:SS", each
+with an optional fraction (".250" or ",250"), i.e. millisecond resolution.
+
+Usage:
+    import wav_io
+    with wav_io.WavFile("Unuusual_memory/AUDIO/group_1_to_11.wav") as wav:
+        wav.write_slice("out.wav", wav_io.parse_time("00:12.480"),
+                        wav_io.parse_time("00:49.120"), fade_ms=5)
+
+    with wav_io.WavSink("Unuusual_memory/AUDIO/group_1_to_10.wav") as sink:
+        for data, mime_type in stream:
+            sink.write(data, mime_type)
+        print(f"{sink.seconds:.1f}s synthesized")
+"""
+
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:     # everything but WavFile fades works without it
+    np = None
+
+
+class WavError(ValueError):
+    pass
+
+
+# ------------------------------------------------------------------
+# Timestamps
+# ------------------------------------------------------------------
+def parse_time(text):
+    """'SS[.mmm]', 'MM:SS[.mmm]' or 'HH:MM:SS[.mmm]' -> seconds (float)."""
+    parts = text.strip().replace(",", ".").split(":")
+    if not 1 <= len(parts) <= 3:
+        raise ValueError(f"bad timestamp: {text!r}")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def format_time(sec):
+    """Seconds -> 'MM:SS.mmm' (minutes keep counting past 59)."""
+    ms = int(round(sec * 1000))
+    return f"{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+# ------------------------------------------------------------------
+# Reader
+# ------------------------------------------------------------------
+_FMT_PCM, _FMT_FLOAT, _FMT_EXTENSIBLE = 0x0001, 0x0003, 0xFFFE
+
+def _chunks(f, file_size):
+    """Yield (id, offset of payload, declared size) for every top-level chunk."""
+    pos = 12
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        cid, size = struct.unpack("<4sI", f.read(8))
+        yield cid, pos + 8, size
+        pos += 8 + size + (size & 1)
+
+
+class WavFile:
+    """Memory-mapped PCM WAV: .frames[i] is sample frame i as raw bytes (None without numpy)."""
+
+    COPY_BYTES = 1 << 20    # chunk size of the byte-range copy
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            file_size = f.tell()
+            f.seek(0)
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise WavError(f"{path}: not a RIFF/WAVE file")
+
+            fmt_chunk, data_offset, data_size = None, None, None
+            for cid, offset, size in _chunks(f, file_size):
+                if cid == b"fmt ":
+                    f.seek(offset)
+                    fmt_chunk = f.read(size)
+                elif cid == b"data":
+                    # Streamed writers leave 0 / 0xFFFFFFFF here: trust the file size
+                    data_offset = offset
+                    data_size = min(size, file_size - offset) if size else file_size - offset
+                    break
+        if fmt_chunk is None or data_offset is None:
+            raise WavError(f"{path}: missing fmt or data chunk")
+
+        tag, self.channels, self.sample_rate, _, self.block_align, self.bits = \
+            struct.unpack("<HHIIHH", fmt_chunk[:16])
+        if tag == _FMT_EXTENSIBLE and len(fmt_chunk) >= 26:
+            tag = struct.unpack("<H", fmt_chunk[24:26])[0]
+        if tag not in (_FMT_PCM, _FMT_FLOAT):
+            raise WavError(f"{path}: unsupported WAV format tag 0x{tag:04x}")
+        self.is_float = tag == _FMT_FLOAT
+        self.fmt_chunk = fmt_chunk
+
+        self.nframes = data_size // self.block_align
+        self.data_offset = data_offset
+        self.frames = None
+        if np is not None and self.nframes:
+            self.frames = np.memmap(path, dtype=np.uint8, mode="r", offset=data_offset,
+                                    shape=(self.nframes, self.block_align))
+
+    @property
+    def duration(self):
+        return self.nframes / self.sample_rate
+
+    def close(self):
+        mm = getattr(self.frames, "_mmap", None)
+        self.frames = None
+        if mm is not None:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def frame_index(self, sec):
+        """Nearest sample frame to `sec`, clamped to the file."""
+        return min(max(int(round(sec * self.sample_rate)), 0), self.nframes)
+
+    def _decode(self, raw):
+        """Raw frame bytes -> float64 samples (frames, channels)."""
+        width = self.block_align // self.channels
+        b = np.ascontiguousarray(raw).reshape(len(raw), self.channels, width)
+        if self.is_float:
+            return b.view("<f4" if width == 4 else "<f8")[..., 0].astype(np.float64)
+        if width == 1:
+            return b[..., 0].astype(np.float64) - 128
+        if width == 3:
+            v = b[..., 0].astype(np.int32) | (b[..., 1].astype(np.int32) << 8) | (b[..., 2].astype(np.int32) << 16)
+            return (np.where(v & 0x800000, v - 0x1000000, v)).astype(np.float64)
+        return b.view(f"<i{width}")[..., 0].astype(np.float64)
+
+    def _encode(self, samples, like):
+        """Inverse of _decode, back into raw frame bytes shaped like `like`."""
+        width = self.block_align // self.channels
+        if self.is_float:
+            out = samples.astype("<f4" if width == 4 else "<f8")
+        elif width == 1:
+            out = np.rint(samples + 128).astype(np.uint8)
+        elif width == 3:
+            v = np.rint(samples).astype(np.int32) & 0xFFFFFF
+            out = np.stack([v & 0xFF, (v >> 8) & 0xFF, v >> 16], axis=-1).astype(np.uint8)
+        else:
+            out = np.rint(samples).astype(f"<i{width}")
+        return np.ascontiguousarray(out).view(np.uint8).reshape(like.shape)
+
+    def _copy_frames(self, out, a, b):
+        """Copy the raw bytes of frames [a, b) straight from the data chunk."""
+        left = (b - a) * self.block_align
+        with open(self.path, "rb") as src:
+            src.seek(self.data_offset + a * self.block_align)
+            while left > 0:
+                buf = src.read(min(left, self.COPY_BYTES))
+                if not buf:
+                    raise WavError(f"{self.path}: data chunk ends early")
+                out.write(buf)
+                left -= len(buf)
+
+    def write_slice(self, out_path, start_sec, end_sec, fade_ms=0):
+        """Write frames [start_sec, end_sec) to `out_path`; returns the number of frames written."""
+        a, b = self.frame_index(start_sec), self.frame_index(end_sec)
+        if b <= a:
+            raise WavError(f"{self.path}: empty slice {start_sec:.3f}-{end_sec:.3f}s")
+
+        fade = min(int(self.sample_rate * fade_ms / 1000), (b - a) // 2)
+        head = tail = None
+        if fade > 0:
+            if np is None:
+                raise ImportError("wav_io.WavFile fades need numpy")
+            body = self.frames[a:b]
+            ramp = np.linspace(0.0, 1.0, fade, endpoint=False)[:, None]
+            head = self._encode(self._decode(body[:fade]) * ramp, body[:fade])
+            tail = self._encode(self._decode(body[-fade:]) * ramp[::-1], body[-fade:])
+
+        data_size = (b - a) * self.block_align
+        with open(out_path, "wb") as f:
+            f.write(struct.pack("<4sI4s", b"RIFF",
+                                4 + 8 + len(self.fmt_chunk) + (len(self.fmt_chunk) & 1)
+                                + 8 + data_size + (data_size & 1), b"WAVE"))
+            f.write(struct.pack("<4sI", b"fmt ", len(self.fmt_chunk)) + self.fmt_chunk)
+            if len(self.fmt_chunk) & 1:
+                f.write(b"\0")
+            f.write(struct.pack("<4sI", b"data", data_size))
+            if fade > 0:
+                f.write(head.tobytes())
+                f.write(body[fade:len(body) - fade].tobytes())
+                f.write(tail.tobytes())
+            else:
+                self._copy_frames(f, a, b)
+            if data_size & 1:
+                f.write(b"\0")
+        return b - a
+
+
+# ------------------------------------------------------------------
+# Streaming writer
+# ------------------------------------------------------------------
+def pcm_params(mime_type):
+    """(bits_per_sample, rate) from a raw PCM mime type such as 'audio/L16;codec=pcm;rate=24000'."""
+    bits, rate = None, 24000
+    for param in mime_type.split(";"):
+        param = param.strip()
+        if param.lower().startswith("rate="):
+            try:
+                rate = int(param.split("=", 1)[1])
+            except ValueError:
+                pass
+        elif param.startswith("audio/L"):
+            try:
+                bits = int(param.split("L", 1)[1])
+            except ValueError:
+                pass
+    if bits is None:
+        raise WavError(f"not a raw PCM mime type: {mime_type!r}")
+    return bits, rate
+
+
+class WavSink:
+    """Append raw little-endian PCM chunks to a WAV on disk; finish() patches the header."""
+
+    HEADER_SIZE = 44
+
+    def __init__(self, path, channels=1):
+        self.path = path
+        self.part_path = path + ".part"
+        self.channels = channels
+        self.bits = self.sample_rate = None
+        self.data_size = 0
+        self._f = None
+
+    @property
+    def block_align(self):
+        return self.channels * self.bits // 8
+
+    @property
+    def frames(self):
+        return self.data_size // self.block_align if self.bits else 0
+
+    @property
+    def seconds(self):
+        """Audio written so far, in seconds."""
+        return self.frames / self.sample_rate if self.bits else 0.0
+
+    def _header(self):
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + self.data_size + (self.data_size & 1), b"WAVE", b"fmt ", 16, _FMT_PCM,
+            self.channels, self.sample_rate, self.sample_rate * self.block_align,
+            self.block_align, self.bits, b"data", self.data_size,
+        )
+
+    def write(self, data, mime_type):
+        """Append one streamed part; the format comes from its mime type."""
+        self.write_pcm(data, *pcm_params(mime_type))
+
+    def write_pcm(self, data, bits, rate):
+        """Append raw PCM frames of the given sample width (bits) and rate."""
+        if self._f is None:
+            self.bits, self.sample_rate = bits, rate
+            self._f = open(self.part_path, "wb")
+            self._f.write(self._header())    # placeholder sizes, patched in finish()
+        elif (bits, rate) != (self.bits, self.sample_rate):
+            raise WavError(f"{self.path}: PCM format changed mid-stream ({bits} bit, {rate} Hz)")
+        self._f.write(data)
+        self.data_size += len(data)
+
+    def finish(self):
+        """Patch the sizes and move the file into place; returns seconds written (0 = nothing, no file)."""
+        if self._f is None:
+            return 0.0
+        if self.data_size & 1:
+            self._f.write(b"\0")
+        self._f.seek(0)
+        self._f.write(self._header())
+        self._f.close()
+        self._f = None
+        os.replace(self.part_path, self.path)
+        return self.seconds
+
+    def abort(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.abort()
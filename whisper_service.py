@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+whisper_service.py
+------------------
+One Whisper model per process, shared by every transcription script
+(Unusual_trans.py, tra.py, BOOK_CODE/COMPANY_BIO/comp6.py).
+
+Backends:
+  faster   faster-whisper (CTranslate2): int8 on CPU, VAD-filtered decoding
+           (silence is skipped before the model sees it), several files
+           decoded concurrently on the same model (num_workers)
+  openai   openai-whisper, FP32 on CPU, one file at a time (fallback)
+  auto     faster if it is installed, else openai (default)
+
+transcribe_words() returns Word(start, end, text) tuples; text is the raw
+Whisper token text (leading space included). The two transcript line styles
+in use are kept byte-for-byte:
+
+  hms_line()    00:00:01-00:00:02: word      (Unusual_trans.py, tra.py)
+  arrow_line()  0.00 --> 0.36 :  word        (comp6.py)
+
+Usage:
+    import whisper_service
+    for path, words in whisper_service.transcribe_many(wav_paths):
+        whisper_service.write_transcript(words, out_path, whisper_service.hms_line)
+
+Env:
+  WHISPER_BACKEND    auto | faster | openai (default: auto)
+  WHISPER_MODEL      model size or path (default: base)
+  WHISPER_COMPUTE    CTranslate2 compute type (default: int8)
+  WHISPER_JOBS       files transcribed concurrently (default: 2)
+  WHISPER_THREADS    CPU threads per job (default: CPU count / WHISPER_JOBS)
+  WHISPER_VAD        "0" disables the VAD filter (default 1)
+  WHISPER_BATCH      >0 = batched VAD-chunk decoding with this batch size
+                     (faster-whisper >= 1.1; default 0)
+  WHISPER_BEAM       beam size (default: 1, greedy like openai-whisper)
+  WHISPER_LANGUAGE   e.g. "en"; empty = detect per file (default: empty)
+"""
+
+import os
+import threading
+from datetime import timedelta
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+def _truthy(x):
+    return str(x).strip().lower() in ("1", "true", "yes", "on")
+
+BACKEND  = os.environ.get("WHISPER_BACKEND", "auto").strip().lower()
+MODEL    = os.environ.get("WHISPER_MODEL", "base")
+COMPUTE  = os.environ.get("WHISPER_COMPUTE", "int8")
+JOBS     = max(1, int(os.environ.get("WHISPER_JOBS", "2")))
+THREADS  = max(1, int(os.environ.get("WHISPER_THREADS", "0")) or (os.cpu_count() or 1) // JOBS)
+VAD      = _truthy(os.environ.get("WHISPER_VAD", "1"))
+BATCH    = int(os.environ.get("WHISPER_BATCH", "0"))
+BEAM     = int(os.environ.get("WHISPER_BEAM", "1"))
+LANGUAGE = os.environ.get("WHISPER_LANGUAGE", "").strip() or None
+
+Word = namedtuple("Word", "start end text")
+
+
+# ------------------------------------------------------------------
+# Output formats
+# ------------------------------------------------------------------
+def format_timestamp(seconds):
+    return str(timedelta(seconds=int(seconds))).split('.')[0].zfill(8)[:8]
+
+def hms_line(word):
+    return f"{format_timestamp(word.start)}-{format_timestamp(word.end)}: {word.text.strip()}\n"
+
+def arrow_line(word):
+    return f"{word.start:.2f} --> {word.end:.2f} : {word.text}\n"
+
+def write_transcript(words, path, line=hms_line):
+    with open(path, "w", encoding="utf-8") as f:
+        for word in words:
+            f.write(line(word))
+
+
+# ------------------------------------------------------------------
+# Backends
+# ------------------------------------------------------------------
+class _Faster:
+    name = "faster-whisper"
+
+    def __init__(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(MODEL, device="cpu", compute_type=COMPUTE,
+                                  cpu_threads=THREADS, num_workers=JOBS)
+        self.batched = None
+        if BATCH > 0:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self.batched = BatchedInferencePipeline(model=self.model)
+            except ImportError:
+                print("⚠️ faster-whisper has no BatchedInferencePipeline; WHISPER_BATCH ignored.", flush=True)
+
+    def words(self, path):
+        opts = dict(word_timestamps=True, beam_size=BEAM, language=LANGUAGE)
+        if self.batched is not None:
+            segments, _ = self.batched.transcribe(path, batch_size=BATCH, **opts)
+        else:
+            segments, _ = self.model.transcribe(path, vad_filter=VAD, **opts)
+        return [Word(w.start, w.end, w.word) for seg in segments for w in (seg.words or [])]
+
+
+class _OpenAI:
+    name = "openai-whisper"
+
+    def __init__(self):
+        import whisper
+        self.model = whisper.load_model(MODEL)
+        self.lock = threading.Lock()   # one torch model: no concurrent decoding
+
+    def words(self, path):
+        with self.lock:
+            result = self.model.transcribe(path, word_timestamps=True, fp16=False, language=LANGUAGE)
+        return [Word(w['start'], w['end'], w['word'])
+                for seg in result['segments'] for w in seg.get('words', [])]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def backend():
+    """The process-wide backend; the model is loaded on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if BACKEND == "openai":
+                _backend = _OpenAI()
+            elif BACKEND == "faster":
+                _backend = _Faster()
+            else:
+                try:
+                    _backend = _Faster()
+                except ImportError:
+                    _backend = _OpenAI()
+            print(f"🎙️ Whisper backend: {_backend.name} ({MODEL})", flush=True)
+        return _backend
+
+
+# ------------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------------
+def transcribe_words(path):
+    """[Word(start, end, text), ...] for one audio file."""
+    return backend().words(str(path))
+
+def transcribe_many(paths, jobs=JOBS):
+    """Yield (path, words) as files finish, up to `jobs` at a time on one model."""
+    paths = list(paths)
+    backend()   # load once before the workers start
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        futures = {ex.submit(transcribe_words, p): p for p in paths}
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+youtube_api.py
+--------------
+Shared YouTube Data API access for the Unusual_* stages.
+
+Metadata service:
+  Gathers video IDs from the Links / Relevant_links files, fetches
+  snippet,contentDetails,statistics for them in 50-ID `videos.list` batches
+  over one pooled requests.Session, and stores every video in a local SQLite
+  table. Stale batches are re-requested with If-None-Match so unchanged
+  results come back as 304 (no body). The description, duration and
+  view-count stages read from that table instead of calling the API per
+  video, so 33x12 links cost ~8 calls instead of ~400.
+
+Search cache:
+  `search.list` costs 100 units, and the CATEGORY rotation keeps producing
+  the same gadget names. Results are stored under (normalized query,
+  videoLicense, maxResults) and reused until YOUTUBE_SEARCH_MAX_AGE passes.
+
+Quota ledger:
+  Every Data API call made through this module is recorded with its unit
+  cost against the current quota day (quota resets at midnight Pacific).
+  A call that would push the day past YOUTUBE_DAILY_QUOTA raises
+  QuotaExceeded instead of being sent, so callers can stop and leave the
+  rest for the next run instead of burning the key halfway through.
+
+Usage:
+    from youtube_api import MetadataService, SearchService
+    meta = MetadataService()
+    meta.ensure(video_ids)          # batch-fetch anything missing/stale
+    row = meta.get(video_id)        # dict or None
+
+    search = SearchService()
+    ids = search.search("mini projector", max_results=50)
+
+    python youtube_api.py           # prefetch every ID in Links + Relevant_links
+    python youtube_api.py quota     # show today's quota usage
+
+Env:
+  YOUTUBE_API              API key (required for network calls)
+  YOUTUBE_DB_PATH          (default: Unuusual_memory/CACHE/youtube.sqlite)
+  YOUTUBE_META_MAX_AGE     hours before a row is revalidated (default: 24)
+  YOUTUBE_SEARCH_MAX_AGE   hours a cached search stays fresh (default: 168)
+  YOUTUBE_DAILY_QUOTA      units per quota day (default: 10000)
+  YOUTUBE_QUOTA_RESERVE    units always left unspent (default: 0)
+  VERBOSE                  "1" for extra logs
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import requests
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TZ = timezone(timedelta(hours=-8))
+
+# ------------------------------------------------------------------
+# Config
+# ------------------------------------------------------------------
+API_BASE      = "https://www.googleapis.com/youtube/v3"
+API_KEY       = os.environ.get("YOUTUBE_API")
+DB_PATH       = os.environ.get("YOUTUBE_DB_PATH", "Unuusual_memory/CACHE/youtube.sqlite")
+META_MAX_AGE  = float(os.environ.get("YOUTUBE_META_MAX_AGE", "24")) * 3600
+SEARCH_MAX_AGE = float(os.environ.get("YOUTUBE_SEARCH_MAX_AGE", "168")) * 3600
+DAILY_QUOTA   = int(os.environ.get("YOUTUBE_DAILY_QUOTA", "10000"))
+QUOTA_RESERVE = int(os.environ.get("YOUTUBE_QUOTA_RESERVE", "0"))
+VERBOSE       = os.environ.get("VERBOSE") == "1"
+
+BATCH_SIZE    = 50  # videos.list accepts at most 50 IDs
+META_PARTS    = "snippet,contentDetails,statistics"
+LINK_DIRS     = ["Unuusual_memory/Links", "Unuusual_memory/Relevant_links"]
+
+# Data API v3 unit costs
+QUOTA_COSTS = {
+    "search.list": 100,
+    "videos.list": 1,
+}
+
+def log(msg):
+    print(msg, flush=True)
+
+def vlog(msg):
+    if VERBOSE:
+        log(msg)
+
+def err(msg):
+    print(msg, file=sys.stderr, flush=True)
+
+
+# ------------------------------------------------------------------
+# Link helpers
+# ------------------------------------------------------------------
+_vid_re = re.compile(r'(?:v=|youtu\.be/|/shorts/|/embed/)([A-Za-z0-9_-]{11})')
+
+def extract_video_id(url: str):
+    m = _vid_re.search(url or "")
+    return m.group(1) if m else None
+
+def read_links(path: str):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [s for s in (line.strip() for line in f) if s and not s.startswith("#")]
+
+def collect_video_ids(dirs=LINK_DIRS, per_file=None, names=None):
+    """
+    Every distinct video ID in the .txt link files of `dirs`
+    (only files listed in `names` if given; first `per_file` links of each).
+    """
+    seen = []
+    found = set()
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        for fname in sorted(os.listdir(d)):
+            if not fname.lower().endswith(".txt"):
+                continue
+            if names is not None and fname not in names:
+                continue
+            links = read_links(os.path.join(d, fname))
+            for link in links[:per_file] if per_file else links:
+                vid = extract_video_id(link)
+                if vid and vid not in found:
+                    found.add(vid)
+                    seen.append(vid)
+    return seen
+
+def iso_to_seconds(duration_iso: str):
+    m = re.match(r'^P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$', duration_iso or "")
+    if not m:
+        return None
+    d, h, mi, s = (int(g or 0) for g in m.groups())
+    return d * 86400 + h * 3600 + mi * 60 + s
+
+
+# ------------------------------------------------------------------
+# SQLite store
+# ------------------------------------------------------------------
+def open_db(path=DB_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    db.row_factory = sqlite3.Row
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS videos (
+            video_id     TEXT PRIMARY KEY,
+            title        TEXT,
+            description  TEXT,
+            channel      TEXT,
+            duration_iso TEXT,
+            duration_sec INTEGER,
+            view_count   INTEGER,
+            etag         TEXT,
+            fetched_at   REAL NOT NULL,
+            missing      INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS video_batches (
+            batch_key  TEXT PRIMARY KEY,
+            ids        TEXT NOT NULL,
+            etag       TEXT,
+            fetched_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS searches (
+            search_key    TEXT PRIMARY KEY,
+            query         TEXT NOT NULL,
+            video_license TEXT NOT NULL,
+            max_results   INTEGER NOT NULL,
+            video_ids     TEXT NOT NULL,
+            fetched_at    REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS quota_ledger (
+            id        INTEGER PRIMARY KEY AUTOINCREMENT,
+            day       TEXT NOT NULL,
+            endpoint  TEXT NOT NULL,
+            units     INTEGER NOT NULL,
+            caller    TEXT,
+            at        REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_quota_ledger_day ON quota_ledger(day);
+    """)
+    return db
+
+
+# ------------------------------------------------------------------
+# Quota ledger
+# ------------------------------------------------------------------
+class QuotaExceeded(RuntimeError):
+    """Raised instead of sending a call that would overrun the daily quota."""
+
+
+def quota_day(ts=None):
+    """YouTube quota day (resets at midnight Pacific) as YYYY-MM-DD."""
+    return datetime.fromtimestamp(ts or time.time(), QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+class QuotaLedger:
+    """Per-day record of Data API unit spend, shared by every Unusual_* stage."""
+
+    def __init__(self, db, daily_quota=DAILY_QUOTA, reserve=QUOTA_RESERVE):
+        self.db = db
+        self.daily_quota = daily_quota
+        self.reserve = reserve
+        self.caller = os.path.basename(sys.argv[0] or "") or "python"
+
+    def used(self, day=None):
+        return self.db.execute(
+            "SELECT COALESCE(SUM(units), 0) FROM quota_ledger WHERE day = ?",
+            (day or quota_day(),),
+        ).fetchone()[0]
+
+    def remaining(self):
+        return max(0, self.daily_quota - self.reserve - self.used())
+
+    def can_spend(self, endpoint, calls=1):
+        return QUOTA_COSTS[endpoint] * calls <= self.remaining()
+
+    def charge(self, endpoint):
+        """Record one call to `endpoint`, or raise QuotaExceeded if it doesn't fit."""
+        units = QUOTA_COSTS[endpoint]
+        left = self.remaining()
+        if units > left:
+            raise QuotaExceeded(
+                f"{endpoint} needs {units} units but only {left} left today "
+                f"({self.used()}/{self.daily_quota} used, reserve {self.reserve})"
+            )
+        self.db.execute(
+            "INSERT INTO quota_ledger (day, endpoint, units, caller, at) VALUES (?, ?, ?, ?, ?)",
+            (quota_day(), endpoint, units, self.caller, time.time()),
+        )
+        self.db.commit()
+
+    def summary(self, day=None):
+        """[(caller, endpoint, calls, units)] for one quota day."""
+        return self.db.execute(
+            "SELECT caller, endpoint, COUNT(*), SUM(units) FROM quota_ledger"
+            " WHERE day = ? GROUP BY caller, endpoint ORDER BY SUM(units) DESC",
+            (day or quota_day(),),
+        ).fetchall()
+
+
+# ------------------------------------------------------------------
+# Metadata service
+# ------------------------------------------------------------------
+class MetadataService:
+    """Batched, ETag-revalidated videos.list cache."""
+
+    def __init__(self, api_key=API_KEY, db_path=DB_PATH, max_age=META_MAX_AGE, session=None):
+        self.api_key = api_key
+        self.max_age = max_age
+        self.db = open_db(db_path)
+        self.ledger = QuotaLedger(self.db)
+        self.session = session or requests.Session()
+        self.calls = 0
+
+    # ---------- reads ----------
+    def get(self, video_id):
+        row = self.db.execute(
+            "SELECT * FROM videos WHERE video_id = ? AND missing = 0", (video_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def video_info(self, video_id):
+        """(title, description) or (None, None)."""
+        row = self.get(video_id)
+        return (row["title"], row["description"]) if row else (None, None)
+
+    def duration_iso(self, video_id):
+        row = self.get(video_id)
+        return row["duration_iso"] if row else None
+
+    def view_count(self, video_id):
+        row = self.get(video_id)
+        return row["view_count"] if row else None
+
+    # ---------- fetch ----------
+    def _stale_ids(self, ids):
+        cutoff = time.time() - self.max_age
+        fresh = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            q = ",".join("?" * len(chunk))
+            fresh.update(r[0] for r in self.db.execute(
+                f"SELECT video_id FROM videos WHERE fetched_at >= ? AND video_id IN ({q})",
+                [cutoff, *chunk],
+            ))
+        return [v for v in ids if v not in fresh]
+
+    def ensure(self, video_ids):
+        """Make sure every ID has a fresh row; fetch the rest in 50-ID batches."""
+        ids = list(dict.fromkeys(v for v in video_ids if v))
+        stale = sorted(self._stale_ids(ids))  # stable batches -> reusable batch ETags
+        log(f"[meta] {len(ids)} videos requested, {len(ids) - len(stale)} fresh in table, "
+            f"{len(stale)} to fetch in {(len(stale) + BATCH_SIZE - 1) // BATCH_SIZE} call(s)")
+        if stale and not self.api_key:
+            err("❌ YOUTUBE_API not set; cannot refresh metadata")
+            return
+        for i in range(0, len(stale), BATCH_SIZE):
+            try:
+                self._fetch_batch(stale[i:i + BATCH_SIZE])
+            except QuotaExceeded as e:
+                err(f"⏸️ Deferring {len(stale) - i} video(s) to the next quota day: {e}")
+                return
+
+    def _fetch_batch(self, ids):
+        ids = sorted(ids)
+        batch_key = hashlib.sha1(",".join(ids).encode()).hexdigest()
+        prev = self.db.execute(
+            "SELECT etag FROM video_batches WHERE batch_key = ?", (batch_key,)
+        ).fetchone()
+        headers = {"If-None-Match": prev["etag"]} if prev and prev["etag"] else {}
+        params = {"part": META_PARTS, "id": ",".join(ids), "key": self.api_key, "maxResults": BATCH_SIZE}
+
+        self.ledger.charge("videos.list")  # 304s are billed too
+        try:
+            r = self.session.get(f"{API_BASE}/videos", params=params, headers=headers, timeout=20)
+            self.calls += 1
+            now = time.time()
+            if r.status_code == 304:
+                vlog(f"  [meta] 304 not modified for {len(ids)} ids")
+                q = ",".join("?" * len(ids))
+                self.db.execute(f"UPDATE videos SET fetched_at = ? WHERE video_id IN ({q})", [now, *ids])
+                self.db.execute("UPDATE video_batches SET fetched_at = ? WHERE batch_key = ?", (now, batch_key))
+                self.db.commit()
+                return
+            r.raise_for_status()
+            data = r.json()
+        except Exception as e:
+            err(f"❌ videos.list failed for batch of {len(ids)}: {e}")
+            return
+
+        returned = set()
+        for item in data.get("items", []):
+            snippet = item.get("snippet", {})
+            details = item.get("contentDetails", {})
+            stats = item.get("statistics", {})
+            dur = details.get("duration")
+            views = stats.get("viewCount")
+            returned.add(item["id"])
+            self.db.execute(
+                "INSERT OR REPLACE INTO videos (video_id, title, description, channel, duration_iso,"
+                " duration_sec, view_count, etag, fetched_at, missing)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (item["id"], snippet.get("title"), snippet.get("description"),
+                 snippet.get("channelTitle"), dur, iso_to_seconds(dur),
+                 int(views) if views is not None else None, item.get("etag"), now),
+            )
+        for vid in set(ids) - returned:
+            # Deleted/private videos: remember so we don't ask again until stale
+            self.db.execute(
+                "INSERT OR REPLACE INTO videos (video_id, fetched_at, missing) VALUES (?, ?, 1)",
+                (vid, now),
+            )
+        self.db.execute(
+            "INSERT OR REPLACE INTO video_batches (batch_key, ids, etag, fetched_at) VALUES (?, ?, ?, ?)",
+            (batch_key, json.dumps(ids), data.get("etag"), now),
+        )
+        self.db.commit()
+        vlog(f"  [meta] stored {len(returned)}/{len(ids)} videos")
+
+
+# ------------------------------------------------------------------
+# Search service
+# ------------------------------------------------------------------
+def normalize_query(query: str) -> str:
+    """Case/whitespace/punctuation-insensitive form used as the cache key."""
+    q = (query or "").lower()
+    q = re.sub(r"[^\w\s\-+]", " ", q)
+    return re.sub(r"\s+", " ", q).strip()
+
+
+class SearchService:
+    """search.list with a persistent result cache and quota accounting."""
+
+    def __init__(self, api_key=API_KEY, db_path=DB_PATH, max_age=SEARCH_MAX_AGE, session=None):
+        self.api_key = api_key
+        self.max_age = max_age
+        self.db = open_db(db_path)
+        self.ledger = QuotaLedger(self.db)
+        self.session = session or requests.Session()
+        self.calls = 0
+
+    def cached(self, query, max_results=50, video_license="creativeCommon"):
+        """Fresh cached video IDs for this search, or None."""
+        row = self.db.execute(
+            "SELECT video_ids, fetched_at FROM searches WHERE search_key = ?",
+            (self._key(query, max_results, video_license),),
+        ).fetchone()
+        if row is None or time.time() - row["fetched_at"] > self.max_age:
+            return None
+        return json.loads(row["video_ids"])
+
+    @staticmethod
+    def _key(query, max_results, video_license):
+        return hashlib.sha1(
+            f"{normalize_query(query)}|{video_license}|{max_results}".encode("utf-8")
+        ).hexdigest()
+
+    def search(self, query, max_results=50, video_license="creativeCommon"):
+        """
+        Video IDs for `query`, from cache when fresh. Raises QuotaExceeded
+        when the call would overrun today's quota.
+        """
+        hit = self.cached(query, max_results, video_license)
+        if hit is not None:
+            log(f"💾 Search cache hit: {normalize_query(query)!r} ({len(hit)} videos)")
+            return hit
+
+        self.ledger.charge("search.list")
+        params = {
+            "part": "snippet",
+            "q": query,
+            "maxResults": max_results,
+            "type": "video",
+            "videoLicense": video_license,
+            "key": self.api_key,
+        }
+        r = self.session.get(f"{API_BASE}/search", params=params, timeout=20)
+        self.calls += 1
+        r.raise_for_status()
+        ids = [
+            item["id"]["videoId"]
+            for item in r.json().get("items", [])
+            if item.get("id", {}).get("videoId")
+        ]
+        self.db.execute(
+            "INSERT OR REPLACE INTO searches (search_key, query, video_license, max_results, video_ids, fetched_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (self._key(query, max_results, video_license), normalize_query(query),
+             video_license, max_results, json.dumps(ids), time.time()),
+        )
+        self.db.commit()
+        return ids
+
+
+# ------------------------------------------------------------------
+# Main: prefetch everything the stages will ask for
+# ------------------------------------------------------------------
+def print_quota(ledger):
+    log(f"[quota] {quota_day()}: {ledger.used()}/{ledger.daily_quota} units used, "
+        f"{ledger.remaining()} spendable (reserve {ledger.reserve})")
+    for caller, endpoint, calls, units in ledger.summary():
+        log(f"  {caller:<28} {endpoint:<12} {calls:>4} call(s) {units:>6} units")
+
+def main():
+    if sys.argv[1:] == ["quota"]:
+        print_quota(QuotaLedger(open_db()))
+        return
+    if not API_KEY:
+        err("[✘] YOUTUBE_API environment variable not set.")
+        sys.exit(1)
+    meta = MetadataService()
+    meta.ensure(collect_video_ids())
+    log(f"[✓] Metadata table up to date ({meta.calls} API call(s)).")
+    print_quota(meta.ledger)
+
+if __name__ == "__main__":
+    main()